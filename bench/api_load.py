@@ -0,0 +1,248 @@
+"""
+Mini App va admin API uchun benchmark.
+
+Sun'iy ma'lumot (10k/100k/1M foydalanuvchi va javob) bilan SQLite yoki Postgres'ni
+to'ldiradi, run.main() dagi ilovani aiohttp TestServer'da ko'taradi va aralash
+so'rovlarni yuboradi. Natija endpoint bo'yicha throughput va p50/p90/p99.
+
+    python -m bench.api_load --size 100k --requests 5000 --concurrency 32 --json api.json
+    python -m bench.api_load --size 100k --compare api.json   # oldingi commit bilan solishtirish
+
+--compare bilan p99 --max-regression foizdan ko'p oshsa, chiqish kodi 1 bo'ladi.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+SUBJECTS = ["english", "russian", "math", "physics"]
+ADMIN_ID = 1
+CHUNK = 5000
+
+# (name, weight, method, path builder, needs admin)
+TRAFFIC = [
+    ("user_stats", 35, "GET", lambda users: "/api/user/stats", False),
+    ("rankings_all", 15, "GET", lambda users: "/api/rankings?period=all", False),
+    ("rankings_week", 10, "GET", lambda users: "/api/rankings?period=week", False),
+    ("rankings_month", 5, "GET", lambda users: "/api/rankings?period=month", False),
+    ("exchange_info", 15, "GET", lambda users: "/api/exchange/info", False),
+    ("bootstrap", 15, "GET", lambda users: "/api/bootstrap", False),
+    ("admin_stats", 10, "GET", lambda users: "/api/admin/stats", True),
+    ("admin_search", 10, "GET", lambda users: f"/api/admin/questions/search?q=q{random.randint(0, 999)}", True),
+]
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def _rows(size: int, seed: int):
+    rnd = random.Random(seed)
+    now = datetime.utcnow()
+    users = [(ADMIN_ID + 1 + i, f"user{i}", f"User{i}", None, 0, rnd.randint(0, 5000)) for i in range(size)]
+    sessions_n = max(1, size // 50)
+    sessions = [
+        (i + 1, -1000 - rnd.randint(0, 500), 0, now - timedelta(days=rnd.uniform(0, 60)))
+        for i in range(sessions_n)
+    ]
+    answers = []
+    scores = {}
+    for i in range(size):
+        uid = ADMIN_ID + 1 + rnd.randrange(size)
+        correct = 1 if rnd.random() < 0.6 else 0
+        # question_number = i keeps (session_id, user_id, question_number) unique
+        answers.append((i + 1, rnd.randint(1, sessions_n), uid, i, correct, correct))
+        scores[uid] = scores.get(uid, 0) + correct
+    users = [(u[0], u[1], u[2], u[3], scores.get(u[0], 0), u[5]) for u in users]
+    questions = [
+        (i + 1, SUBJECTS[i % 4], f"q{i} savol matni", "a", "b", "c", "d", rnd.randint(0, 3))
+        for i in range(max(1000, size // 20))
+    ]
+    return users, sessions, answers, questions
+
+
+async def seed(size: int, seed_value: int):
+    import database.db as db
+
+    existing = await db.fetchval("SELECT COUNT(*) FROM users")
+    if existing and existing >= size:
+        print(f"Baza allaqachon to'ldirilgan ({existing} user), seeding o'tkazib yuborildi")
+        return
+
+    users, sessions, answers, questions = _rows(size, seed_value)
+    started = time.monotonic()
+    if db.DB_TYPE == "pg":
+        async with db.pg_pool.acquire() as conn:
+            await conn.copy_records_to_table("users", records=users, columns=["user_id", "username", "first_name", "last_name", "total_score", "coins"])
+            await conn.copy_records_to_table("quiz_sessions", records=sessions, columns=["session_id", "chat_id", "is_active", "created_at"])
+            await conn.copy_records_to_table("user_answers", records=answers, columns=["id", "session_id", "user_id", "question_number", "is_correct", "score"])
+            await conn.copy_records_to_table("questions", records=questions, columns=["id", "subject", "question", "option1", "option2", "option3", "option4", "correct_option_id"])
+            for table, column in (("quiz_sessions", "session_id"), ("user_answers", "id"), ("questions", "id")):
+                await conn.execute(f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), (SELECT MAX({column}) FROM {table}))")
+    else:
+        import aiosqlite
+        sessions = [(s[0], s[1], s[2], s[3].strftime("%Y-%m-%d %H:%M:%S")) for s in sessions]
+        async with aiosqlite.connect(db.sqlite_db) as conn:
+            for sql, rows in (
+                ("INSERT INTO users (user_id, username, first_name, last_name, total_score, coins) VALUES (?, ?, ?, ?, ?, ?)", users),
+                ("INSERT INTO quiz_sessions (session_id, chat_id, is_active, created_at) VALUES (?, ?, ?, ?)", sessions),
+                ("INSERT INTO user_answers (id, session_id, user_id, question_number, is_correct, score) VALUES (?, ?, ?, ?, ?, ?)", answers),
+                ("INSERT INTO questions (id, subject, question, option1, option2, option3, option4, correct_option_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", questions),
+            ):
+                for i in range(0, len(rows), CHUNK):
+                    await conn.executemany(sql, rows[i:i + CHUNK])
+            await conn.commit()
+    await db.add_admin(ADMIN_ID)
+    print(f"Seed: {len(users)} user, {len(answers)} javob, {len(questions)} savol — {time.monotonic() - started:.1f}s")
+
+
+async def replay(base_url: str, users: int, total: int, concurrency: int, seed_value: int) -> dict:
+    import aiohttp
+
+    rnd = random.Random(seed_value)
+    weights = [t[1] for t in TRAFFIC]
+    plan = rnd.choices(TRAFFIC, weights=weights, k=total)
+    latencies = {t[0]: [] for t in TRAFFIC}
+    errors = {t[0]: 0 for t in TRAFFIC}
+    queue = asyncio.Queue()
+    for item in plan:
+        queue.put_nowait(item)
+
+    async def worker(session):
+        while not queue.empty():
+            name, _, method, path, admin = queue.get_nowait()
+            uid = ADMIN_ID if admin else ADMIN_ID + 1 + rnd.randrange(users)
+            started = time.perf_counter()
+            try:
+                async with session.request(method, base_url + path(users), headers={"X-User-ID": str(uid)}) as resp:
+                    await resp.read()
+                    if resp.status >= 400:
+                        errors[name] += 1
+            except aiohttp.ClientError:
+                errors[name] += 1
+            latencies[name].append((time.perf_counter() - started) * 1000)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    started = time.perf_counter()
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*[worker(session) for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    everything = [v for values in latencies.values() for v in values]
+    endpoints = {}
+    for name, values in latencies.items():
+        if not values:
+            continue
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": errors[name],
+            "p50_ms": round(percentile(values, 0.5), 2),
+            "p90_ms": round(percentile(values, 0.9), 2),
+            "p99_ms": round(percentile(values, 0.99), 2),
+        }
+    return {
+        "requests": len(everything),
+        "elapsed_s": round(elapsed, 2),
+        "rps": round(len(everything) / elapsed, 1) if elapsed else 0,
+        "p50_ms": round(percentile(everything, 0.5), 2),
+        "p99_ms": round(percentile(everything, 0.99), 2),
+        "endpoints": endpoints,
+    }
+
+
+async def run(args) -> dict:
+    from aiohttp.test_utils import TestServer
+
+    import database.db as db
+    from database import init_db
+    from run import main as build_app
+
+    if args.db == "sqlite":
+        db.sqlite_db = args.db_path or os.path.join(tempfile.mkdtemp(prefix="apibench-"), "bench.db")
+    await init_db()
+    size = SIZES[args.size]
+    await seed(size, args.seed)
+
+    app = await build_app(start_bot=False)
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        base_url = str(server.make_url("")).rstrip("/")
+        if args.warmup:
+            await replay(base_url, size, args.warmup, args.concurrency, args.seed + 1)
+        report = await replay(base_url, size, args.requests, args.concurrency, args.seed)
+    finally:
+        await server.close()
+
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        commit = None
+    return {"commit": commit, "db": db.DB_TYPE, "size": args.size, "concurrency": args.concurrency, **report}
+
+
+def compare(old: dict, new: dict, max_regression: float) -> bool:
+    """Endpointlar p99 ini solishtiradi; regressiya bo'lsa False"""
+    ok = True
+    print(f"\n{'endpoint':>16} {'old p99':>10} {'new p99':>10} {'delta':>8}")
+    for name, cur in new["endpoints"].items():
+        prev = old.get("endpoints", {}).get(name)
+        if not prev or not prev["p99_ms"]:
+            continue
+        delta = (cur["p99_ms"] - prev["p99_ms"]) / prev["p99_ms"] * 100
+        mark = ""
+        if delta > max_regression:
+            ok = False
+            mark = "  ❌"
+        print(f"{name:>16} {prev['p99_ms']:>10} {cur['p99_ms']:>10} {delta:>7.1f}%{mark}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP API benchmark")
+    parser.add_argument("--size", choices=list(SIZES), default="10k")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", choices=["sqlite", "pg"], default="sqlite")
+    parser.add_argument("--db-path", help="SQLite fayli (qayta ishlatish uchun, seeding bir marta)")
+    parser.add_argument("--json", help="hisobotni JSON faylga yozish")
+    parser.add_argument("--compare", help="oldingi JSON hisobot bilan solishtirish")
+    parser.add_argument("--max-regression", type=float, default=20.0, help="p99 uchun ruxsat etilgan o'sish, %%")
+    args = parser.parse_args()
+
+    os.environ.setdefault("BOT_TOKEN", "123456:BENCH-token")
+    # Benchmark bir nechta user ID dan to'xtovsiz so'raydi: limit/503 natijani buzmasin
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+    if args.db == "sqlite":
+        os.environ["DATABASE_URL"] = ""
+
+    report = asyncio.run(run(args))
+    print(json.dumps({k: v for k, v in report.items() if k != "endpoints"}, indent=2))
+    for name, stats in report["endpoints"].items():
+        print(f"{name:>16}: {stats}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        if not compare(old, report, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Telegram Bot API o'rniga ishlaydigan lokal server (benchmark uchun).
+
+sendPoll, sendMessage, sendPhoto, stopPoll, getUpdates va getMe ni bajaradi,
+har bir yuborilgan poll uchun sun'iy poll_answer update'larini navbatga qo'yadi.
+
+    python -m bench.fake_telegram --port 8081
+
+Boshqaruv (simulyator uchun):
+    POST /_bench/start  {"chats": N, "participants": M, "command": "/quiz 5 5", ...}
+    GET  /_bench/stats
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+
+from aiohttp import web
+
+CHAT_ID_BASE = -1000000000000
+USER_ID_BASE = 7000000000
+
+
+class FakeTelegram:
+    def __init__(self):
+        self.updates = []
+        self.next_update_id = 1
+        self.new_updates = asyncio.Event()
+        self.next_message_id = defaultdict(lambda: 1)
+        self.next_poll_id = 1
+        self.polls = {}
+        # Simulation config, set by /_bench/start
+        self.participants = 0
+        self.answer_ratio = 1.0
+        self.accuracy = 0.7
+        self.answer_window = 0.5
+        self.max_rate = 0.0
+        # Measurements (time.monotonic() is system-wide on Linux, so it compares across processes)
+        self.injected_at = {}
+        self.poll_sent_at = defaultdict(list)
+        self.finished_chats = set()
+        self.calls = defaultdict(int)
+        self._rate_tokens = 0.0
+        self._rate_checked = time.monotonic()
+
+    # --- helpers ---
+    def push_update(self, payload: dict):
+        update_id = self.next_update_id
+        self.next_update_id += 1
+        payload["update_id"] = update_id
+        self.updates.append(payload)
+        self.injected_at[update_id] = time.monotonic()
+        self.new_updates.set()
+        return update_id
+
+    def message(self, chat_id: int, **fields) -> dict:
+        message_id = self.next_message_id[chat_id]
+        self.next_message_id[chat_id] += 1
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "supergroup", "title": f"Bench {chat_id}"},
+            **fields,
+        }
+
+    async def _take_rate_token(self):
+        if not self.max_rate:
+            return
+        while True:
+            now = time.monotonic()
+            self._rate_tokens = min(self.max_rate, self._rate_tokens + (now - self._rate_checked) * self.max_rate)
+            self._rate_checked = now
+            if self._rate_tokens >= 1:
+                self._rate_tokens -= 1
+                return
+            await asyncio.sleep((1 - self._rate_tokens) / self.max_rate)
+
+    async def _answer(self, poll_id: str, chat_id: int, user_id: int, delay: float):
+        await asyncio.sleep(delay)
+        poll = self.polls.get(poll_id)
+        if not poll or poll["is_closed"]:
+            return
+        await self._take_rate_token()
+        correct = poll["correct_option_id"]
+        if random.random() < self.accuracy:
+            option = correct
+        else:
+            option = random.choice([i for i in range(len(poll["options"])) if i != correct] or [correct])
+        self.push_update({
+            "poll_answer": {
+                "poll_id": poll_id,
+                "user": {"id": user_id, "is_bot": False, "first_name": f"U{user_id % 100000}", "username": f"bench{user_id}"},
+                "option_ids": [option],
+            }
+        })
+
+    def schedule_answers(self, poll_id: str, chat_id: int, open_period: int):
+        window = max(0.1, open_period * self.answer_window)
+        for k in range(self.participants):
+            if random.random() > self.answer_ratio:
+                continue
+            user_id = USER_ID_BASE + (abs(chat_id) % 100000) * 1000 + k
+            asyncio.create_task(self._answer(poll_id, chat_id, user_id, random.uniform(0.05, window)))
+
+    # --- Bot API methods ---
+    async def get_me(self, params):
+        return {"id": 1, "is_bot": True, "first_name": "QuizBot", "username": "quiz_bench_bot"}
+
+    async def get_updates(self, params):
+        offset = int(params.get("offset") or 0)
+        timeout = float(params.get("timeout") or 0)
+        if offset:
+            self.updates = [u for u in self.updates if u["update_id"] >= offset]
+        if not self.updates and timeout:
+            self.new_updates.clear()
+            try:
+                await asyncio.wait_for(self.new_updates.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        limit = int(params.get("limit") or 100)
+        return self.updates[:limit]
+
+    async def send_message(self, params):
+        chat_id = int(params["chat_id"])
+        text = str(params.get("text", ""))
+        if text.startswith("🏆") or text.startswith("❌ Test tugadi"):
+            self.finished_chats.add(chat_id)
+        return self.message(chat_id, text=text)
+
+    async def send_photo(self, params):
+        chat_id = int(params["chat_id"])
+        file_id = f"bench-photo-{self.next_poll_id}-{chat_id}"
+        photo = [{"file_id": file_id, "file_unique_id": file_id, "width": 640, "height": 480}]
+        return self.message(chat_id, photo=photo)
+
+    async def send_poll(self, params):
+        chat_id = int(params["chat_id"])
+        options = params.get("options") or []
+        if isinstance(options, str):
+            options = json.loads(options)
+        options = [{"text": o["text"] if isinstance(o, dict) else str(o), "voter_count": 0} for o in options]
+        poll_id = str(self.next_poll_id)
+        self.next_poll_id += 1
+        open_period = int(params.get("open_period") or 15)
+        poll = {
+            "id": poll_id,
+            "question": str(params.get("question", "")),
+            "options": options,
+            "total_voter_count": 0,
+            "is_closed": False,
+            "is_anonymous": False,
+            "type": str(params.get("type", "quiz")),
+            "allows_multiple_answers": False,
+            "correct_option_id": int(params.get("correct_option_id") or 0),
+            "open_period": open_period,
+        }
+        self.polls[poll_id] = poll
+        self.poll_sent_at[chat_id].append(time.monotonic())
+        msg = self.message(chat_id, poll=poll)
+        poll["message"] = (chat_id, msg["message_id"])
+        self.schedule_answers(poll_id, chat_id, open_period)
+        asyncio.get_running_loop().call_later(open_period, self._close_poll, poll_id)
+        return {**msg, "poll": {k: v for k, v in poll.items() if k != "message"}}
+
+    def _close_poll(self, poll_id: str):
+        poll = self.polls.get(poll_id)
+        if poll:
+            poll["is_closed"] = True
+
+    async def stop_poll(self, params):
+        key = (int(params["chat_id"]), int(params["message_id"]))
+        for poll_id, poll in self.polls.items():
+            if poll.get("message") == key:
+                poll["is_closed"] = True
+                return {k: v for k, v in poll.items() if k != "message"}
+        raise web.HTTPBadRequest(text=json.dumps({"ok": False, "error_code": 400, "description": "poll not found"}))
+
+    METHODS = {
+        "getme": get_me,
+        "getupdates": get_updates,
+        "sendmessage": send_message,
+        "sendphoto": send_photo,
+        "sendpoll": send_poll,
+        "stoppoll": stop_poll,
+    }
+
+    async def handle_method(self, request: web.Request):
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        params = {}
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            for key, value in (await request.post()).items():
+                if isinstance(value, str):
+                    try:
+                        value = json.loads(value)
+                    except ValueError:
+                        pass
+                params[key] = value
+
+        impl = self.METHODS.get(method.lower())
+        # deleteWebhook, setWebhook, close, ... -> True
+        result = await impl(self, params) if impl else True
+        return web.json_response({"ok": True, "result": result})
+
+    # --- bench control ---
+    async def handle_start(self, request: web.Request):
+        cfg = await request.json()
+        self.participants = int(cfg.get("participants", 10))
+        self.answer_ratio = float(cfg.get("answer_ratio", 1.0))
+        self.accuracy = float(cfg.get("accuracy", 0.7))
+        self.answer_window = float(cfg.get("answer_window", 0.5))
+        self.max_rate = float(cfg.get("max_rate", 0))
+        command = cfg.get("command", "/quiz 5 5")
+        chats = [CHAT_ID_BASE - n for n in range(int(cfg.get("chats", 1)))]
+        for chat_id in chats:
+            starter = USER_ID_BASE + (abs(chat_id) % 100000) * 1000
+            self.push_update({
+                "message": self.message(
+                    chat_id,
+                    **{"from": {"id": starter, "is_bot": False, "first_name": "Starter"}},
+                    text=command,
+                    entities=[{"type": "bot_command", "offset": 0, "length": len(command.split()[0])}],
+                )
+            })
+        return web.json_response({"chats": chats})
+
+    async def handle_stats(self, request: web.Request):
+        return web.json_response({
+            "injected_at": self.injected_at,
+            "poll_sent_at": self.poll_sent_at,
+            "finished_chats": sorted(self.finished_chats),
+            "calls": self.calls,
+        })
+
+
+def create_app() -> web.Application:
+    fake = FakeTelegram()
+    app = web.Application()
+    app["fake"] = fake
+    app.router.add_post('/bot{token}/{method}', fake.handle_method)
+    app.router.add_get('/bot{token}/{method}', fake.handle_method)
+    app.router.add_post('/_bench/start', fake.handle_start)
+    app.router.add_get('/_bench/stats', fake.handle_stats)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Telegram Bot API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+    web.run_app(create_app(), host=args.host, port=args.port, print=None)
@@ -0,0 +1,189 @@
+"""
+Bir vaqtda nechta quiz ko'tara olishimizni o'lchaydigan simulyator.
+
+bench/fake_telegram.py ni alohida jarayonda ishga tushiradi, botni unga ulab
+N chat x M ishtirokchi bilan haqiqiy quizlarni o'tkazadi va hisobot chiqaradi:
+javob qabul qilish p50/p99, savollar orasidagi drift, quiz boshiga CPU/xotira.
+
+    python -m bench.quiz_load --chats 50 --participants 20 --questions 5 --seconds 5
+    DATABASE_URL=postgres://... python -m bench.quiz_load --db pg
+
+Hammasi lokal, internet kerak emas.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def _wait_for_server(url: str):
+    import aiohttp
+    async with aiohttp.ClientSession() as s:
+        for _ in range(100):
+            try:
+                async with s.get(url + "/_bench/stats"):
+                    return
+            except aiohttp.ClientError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError("fake_telegram ishga tushmadi")
+
+
+async def run(args) -> dict:
+    import aiohttp
+    from aiogram import BaseMiddleware
+
+    # Bot modullari import qilinishidan oldin sozlanadi
+    import database.db as db
+    from bot.loader import bot, dp
+    from bot.handlers import router as main_router
+    from bot.session import active_quizzes
+    from database import init_db
+    from init_questions import init_questions
+
+    if args.db == "sqlite":
+        db.sqlite_db = os.path.join(tempfile.mkdtemp(prefix="quizbench-"), "bench.db")
+    await init_db()
+    await init_questions()
+
+    handled_at = {}
+
+    class IngestProbe(BaseMiddleware):
+        async def __call__(self, handler, event, data):
+            result = await handler(event, data)
+            if event.poll_answer is not None:
+                handled_at[event.update_id] = time.monotonic()
+            return result
+
+    dp.update.outer_middleware(IngestProbe())
+    dp.include_router(main_router)
+
+    cpu_before = resource.getrusage(resource.RUSAGE_SELF)
+    rss_before = _rss_mb()
+    started = time.monotonic()
+
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False))
+    async with aiohttp.ClientSession() as s:
+        async with s.post(args.api_url + "/_bench/start", json={
+            "chats": args.chats,
+            "participants": args.participants,
+            "answer_ratio": args.answer_ratio,
+            "accuracy": args.accuracy,
+            "answer_window": args.answer_window,
+            "max_rate": args.max_rate,
+            "command": f"/quiz {args.questions} {args.seconds}" + (f" {args.fast}" if args.fast else ""),
+        }) as resp:
+            chats = (await resp.json())["chats"]
+
+        rss_peak = rss_before
+        deadline = started + args.questions * (args.seconds + 2) * 3 + 30
+        while True:
+            await asyncio.sleep(1)
+            rss_peak = max(rss_peak, _rss_mb())
+            async with s.get(args.api_url + "/_bench/stats") as resp:
+                stats = await resp.json()
+            if len(stats["finished_chats"]) >= len(chats) and not active_quizzes:
+                break
+            if time.monotonic() > deadline:
+                print("⚠️ Vaqt tugadi, hamma quiz tugamadi", file=sys.stderr)
+                break
+
+    elapsed = time.monotonic() - started
+    cpu_after = resource.getrusage(resource.RUSAGE_SELF)
+    await dp.stop_polling()
+    polling.cancel()
+
+    injected = {int(k): v for k, v in stats["injected_at"].items()}
+    ingest = [(handled_at[u] - injected[u]) * 1000 for u in handled_at if u in injected]
+
+    expected_gap = args.seconds + 2
+    drift = []
+    for sent in stats["poll_sent_at"].values():
+        for a, b in zip(sent, sent[1:]):
+            drift.append((b - a - expected_gap) * 1000)
+
+    cpu = (cpu_after.ru_utime - cpu_before.ru_utime) + (cpu_after.ru_stime - cpu_before.ru_stime)
+    n = max(1, len(chats))
+    return {
+        "db": db.DB_TYPE,
+        "chats": len(chats),
+        "participants": args.participants,
+        "questions": args.questions,
+        "seconds": args.seconds,
+        "finished": len(stats["finished_chats"]),
+        "elapsed_s": round(elapsed, 2),
+        "answers_ingested": len(ingest),
+        "answers_per_s": round(len(ingest) / elapsed, 1) if elapsed else 0,
+        "ingest_p50_ms": round(percentile(ingest, 0.5), 2),
+        "ingest_p99_ms": round(percentile(ingest, 0.99), 2),
+        "pacing_drift_p50_ms": round(percentile(drift, 0.5), 2),
+        "pacing_drift_p99_ms": round(percentile(drift, 0.99), 2),
+        "cpu_ms_per_quiz": round(cpu * 1000 / n, 2),
+        "rss_mb_per_quiz": round((rss_peak - rss_before) / n, 3),
+        "api_calls": stats["calls"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent quiz load simulator")
+    parser.add_argument("--chats", type=int, default=10)
+    parser.add_argument("--participants", type=int, default=10)
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument("--seconds", type=int, default=5)
+    parser.add_argument("--answer-ratio", type=float, default=1.0, help="javob beradigan ishtirokchilar ulushi")
+    parser.add_argument("--accuracy", type=float, default=0.7)
+    parser.add_argument("--answer-window", type=float, default=0.5, help="javoblar open_period ning qancha qismiga tarqaladi")
+    parser.add_argument("--max-rate", type=float, default=0, help="poll_answer/s yuqori chegara (0 = cheksiz)")
+    parser.add_argument("--fast", default="", help="tezkor rejim parametri, masalan 'fast' yoki '80%%'")
+    parser.add_argument("--db", choices=["sqlite", "pg"], default="sqlite")
+    parser.add_argument("--json", help="hisobotni JSON faylga yozish")
+    args = parser.parse_args()
+
+    port = _free_port()
+    args.api_url = f"http://127.0.0.1:{port}"
+    os.environ["TELEGRAM_API_URL"] = args.api_url
+    os.environ.setdefault("BOT_TOKEN", "123456:BENCH-token")
+    if args.db == "sqlite":
+        os.environ["DATABASE_URL"] = ""
+
+    server = subprocess.Popen([sys.executable, "-m", "bench.fake_telegram", "--port", str(port)])
+    try:
+        asyncio.run(_wait_for_server(args.api_url))
+        report = asyncio.run(run(args))
+    finally:
+        server.terminate()
+        server.wait()
+
+    for key, value in report.items():
+        print(f"{key:>22}: {value}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import hashlib
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -23,3 +24,106 @@ if not DATABASE_URL:
     # Fallback for local testing or raise error? Use sqlite path as default? No, migrating to pg directly.
     # But for now let's just warn or default to None if we handle it in db.py
     pass
+
+# Private chat/channel where question images are pre-uploaded to get a file_id (optional)
+MEDIA_CACHE_CHAT_ID_ENV = os.getenv("MEDIA_CACHE_CHAT_ID")
+MEDIA_CACHE_CHAT_ID = int(MEDIA_CACHE_CHAT_ID_ENV) if MEDIA_CACHE_CHAT_ID_ENV else None
+
+# Send "standings after question N" every N questions during a quiz (0 = off)
+QUIZ_STANDINGS_EVERY = int(os.getenv("QUIZ_STANDINGS_EVERY", "0"))
+
+# Update ingestion: "polling" (default, local) or "webhook"
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", WEBAPP_URL)
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+# Telegram allows only A-Z, a-z, 0-9, _ and - in secret_token
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or hashlib.sha256(BOT_TOKEN.encode()).hexdigest()[:32]
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "8"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+
+# Update pipeline (bot/pipeline.py): total handler concurrency, per-class caps, queue depth
+PIPELINE_CONCURRENCY = int(os.getenv("PIPELINE_CONCURRENCY", "32"))
+PIPELINE_LIMITS = {
+    "poll": int(os.getenv("PIPELINE_POLL_LIMIT", "32")),
+    "command": int(os.getenv("PIPELINE_COMMAND_LIMIT", "16")),
+    "admin": int(os.getenv("PIPELINE_ADMIN_LIMIT", "4")),
+}
+PIPELINE_MAX_WAITING = int(os.getenv("PIPELINE_MAX_WAITING", "500"))
+# Per-class queue depth; updates over it are dropped. Poll answers get the deepest
+# queue (losing one costs a score), but one that waits past its question window is useless anyway
+PIPELINE_MAX_DEPTH = {
+    "poll": int(os.getenv("PIPELINE_POLL_MAX_DEPTH", "2000")),
+    "command": int(os.getenv("PIPELINE_COMMAND_MAX_DEPTH", "300")),
+    "admin": int(os.getenv("PIPELINE_ADMIN_MAX_DEPTH", "50")),
+}
+
+# Custom Bot API server (local telegram-bot-api, or bench/fake_telegram.py in benchmarks)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL")
+
+# FSM (admin wizard) state lifetime in seconds and in-memory front cache size
+FSM_TTL = int(os.getenv("FSM_TTL", str(6 * 3600)))
+FSM_CACHE_SIZE = int(os.getenv("FSM_CACHE_SIZE", "1000"))
+
+# Startup cache warmup (bot/warmup.py): total time budget in seconds and parallel DB loads
+WARMUP_BUDGET = float(os.getenv("WARMUP_BUDGET", "10"))
+WARMUP_CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", "4"))
+
+# Graceful shutdown (bot/shutdown.py): seconds to wait for in-flight handlers and pending DB writes
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "10"))
+SHUTDOWN_FLUSH_TIMEOUT = float(os.getenv("SHUTDOWN_FLUSH_TIMEOUT", "5"))
+
+# Job scheduler (bot/scheduler.py). Run it on one instance only when scaled out
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+SCHEDULER_TIMEZONE = os.getenv("SCHEDULER_TIMEZONE", "Asia/Tashkent")
+WEEKLY_RATING_DAY = os.getenv("WEEKLY_RATING_DAY", "mon")
+WEEKLY_RATING_HOUR = int(os.getenv("WEEKLY_RATING_HOUR", "9"))
+COMPACTION_HOUR = int(os.getenv("COMPACTION_HOUR", "4"))
+
+# Tournaments (bot/tournament.py): chats started per second (each start is an image
+# and/or a poll, Telegram allows ~30 messages/s per bot), preparation lead time in seconds
+TOURNAMENT_SEND_RATE = float(os.getenv("TOURNAMENT_SEND_RATE", "12"))
+TOURNAMENT_PREPARE_LEAD = int(os.getenv("TOURNAMENT_PREPARE_LEAD", "60"))
+# Warn when the expected start skew (chats / rate) exceeds this many seconds
+TOURNAMENT_MAX_SKEW = float(os.getenv("TOURNAMENT_MAX_SKEW", "15"))
+
+# Mini App static files (bot/static.py); STATIC_DEV=1 re-reads changed files from disk
+WEB_ROOT = os.getenv("WEB_ROOT", "./web")
+STATIC_DEV = os.getenv("STATIC_DEV", "0") == "1"
+
+# Live push (bot/live.py): max concurrent SSE connections, keepalive comment interval in seconds
+LIVE_MAX_CONNECTIONS = int(os.getenv("LIVE_MAX_CONNECTIONS", "5000"))
+LIVE_KEEPALIVE = float(os.getenv("LIVE_KEEPALIVE", "25"))
+
+# Keyset pagination (bot/pagination.py): default page sizes and the largest ?limit= accepted
+ADMIN_PAGE_SIZE = int(os.getenv("ADMIN_PAGE_SIZE", "50"))
+RANKINGS_PAGE_SIZE = int(os.getenv("RANKINGS_PAGE_SIZE", "20"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
+
+# Prometheus /metrics (bot/metrics.py); when set, scrapers must send Authorization: Bearer <token>
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Event loop monitor (bot/profiler.py): a wakeup this many seconds late is logged as a stall
+# with the blocking stack; admin profiles (/api/admin/profile) run at most PROFILE_MAX_SECONDS
+LOOP_STALL_THRESHOLD = float(os.getenv("LOOP_STALL_THRESHOLD", "0.1"))
+PROFILE_MAX_SECONDS = int(os.getenv("PROFILE_MAX_SECONDS", "60"))
+
+# API rate limiting (bot/ratelimit.py): token bucket per user (or IP) and route class, (rate/s, burst)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMITS = {
+    "user": (float(os.getenv("RATE_USER_PER_SEC", "1")), int(os.getenv("RATE_USER_BURST", "10"))),
+    "write": (float(os.getenv("RATE_WRITE_PER_SEC", "0.1")), int(os.getenv("RATE_WRITE_BURST", "3"))),
+    "read": (float(os.getenv("RATE_READ_PER_SEC", "5")), int(os.getenv("RATE_READ_BURST", "30"))),
+    "admin": (float(os.getenv("RATE_ADMIN_PER_SEC", "10")), int(os.getenv("RATE_ADMIN_BURST", "40"))),
+}
+# Where the client IP comes from: "forwarded" (last X-Forwarded-For hop, behind a trusted proxy
+# such as Railway's router) or "remote" (socket peer, app exposed directly). Unset: the IP is
+# unknown (behind a router the peer is the router for everyone), so buckets are per X-User-ID only
+# and anonymous requests are not rate limited. With a client IP every IP also has a shared bucket
+# of RATE_IP_SCALE x the per-user limits, so rotating X-User-ID does not reset the limit.
+# At most RATE_MAX_BUCKETS buckets are kept; new clients beyond that get 503
+RATE_CLIENT_IP = os.getenv("RATE_CLIENT_IP", "").lower()
+RATE_IP_SCALE = float(os.getenv("RATE_IP_SCALE", "10"))
+RATE_MAX_BUCKETS = int(os.getenv("RATE_MAX_BUCKETS", "100000"))
+# Load shedding: above this loop lag or pool wait (seconds) non-critical API routes get 503
+ADMISSION_MAX_LAG = float(os.getenv("ADMISSION_MAX_LAG", "0.2"))
+ADMISSION_MAX_POOL_WAIT = float(os.getenv("ADMISSION_MAX_POOL_WAIT", "0.5"))
@@ -0,0 +1,121 @@
+import asyncio
+import csv
+import io
+import json
+import logging
+import re
+import time
+from contextlib import aclosing
+from datetime import datetime, timedelta
+
+from aiohttp import web
+
+from database import export_questions, export_answers, export_rankings, export_withdrawals
+
+logger = logging.getLogger(__name__)
+
+# Har eksport bitta DB ulanishini oxirigacha band qiladi: pool ni bo'shatmaslik uchun cheklangan
+MAX_CONCURRENT = 2
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# CSV sarlavhasi: bo'sh eksportda ham yoziladi (database.export_* SELECT ustunlari bilan bir xil)
+COLUMNS = {
+    "questions": ("id", "subject", "question", "option1", "option2", "option3", "option4",
+                  "correct_option_id", "image_url", "created_by", "created_at"),
+    "answers": ("id", "session_id", "chat_id", "session_started", "user_id", "question_number",
+                "question_id", "is_correct", "score", "answer_ms"),
+    "rankings": ("rank", "user_id", "username", "first_name", "last_name", "total_score", "coins"),
+    "withdrawals": ("id", "user_id", "username", "amount_coins", "amount_money", "status", "created_at"),
+}
+UNSAFE_NAME = re.compile(r"[^A-Za-z0-9_-]")
+
+_slots = asyncio.Semaphore(MAX_CONCURRENT)
+
+
+def _parse_date(value: str | None, default: datetime) -> datetime:
+    if not value:
+        return default
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def _safe(value: str | None) -> str:
+    """Content-Disposition fayl nomi uchun: faqat [A-Za-z0-9_-]"""
+    return UNSAFE_NAME.sub("", value or "") or "all"
+
+
+def _source(kind: str, query):
+    """kind + query -> (fayl nomi, batch generator)"""
+    if kind == "questions":
+        subject = query.get("subject")
+        return f"questions-{_safe(subject)}", export_questions(subject)
+    if kind == "answers":
+        # to= kuni ham kiradi
+        until = _parse_date(query.get("to"), datetime.utcnow()) + timedelta(days=1)
+        since = _parse_date(query.get("from"), until - timedelta(days=31))
+        return f"answers-{since:%Y%m%d}-{until:%Y%m%d}", export_answers(since, until)
+    if kind == "rankings":
+        return "rankings", export_rankings()
+    if kind == "withdrawals":
+        status = query.get("status")
+        return f"withdrawals-{_safe(status)}", export_withdrawals(status)
+    return None, None
+
+
+def _encode_csv(rows, header: tuple = ()) -> bytes:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header:
+        writer.writerow(header)
+    writer.writerows(tuple(row) for row in rows)
+    return buf.getvalue().encode("utf-8")
+
+
+def _encode_ndjson(rows) -> bytes:
+    return "".join(
+        json.dumps(dict(row), ensure_ascii=False, default=str) + "\n" for row in rows
+    ).encode("utf-8")
+
+
+async def handle_export(request: web.Request) -> web.StreamResponse:
+    """
+    GET /api/admin/export/{kind}?format=csv|ndjson
+      questions: &subject=   answers: &from=YYYY-MM-DD&to=YYYY-MM-DD   withdrawals: &status=
+    Qatorlar DB dan batch'lab o'qiladi va chunked javob sifatida darhol yoziladi;
+    resp.write() sekin klientda kutadi, shuning uchun xotirada bitta batch turadi.
+    """
+    fmt = request.query.get("format", "csv")
+    if fmt not in FORMATS:
+        return web.json_response({"error": "format: csv | ndjson"}, status=400)
+    try:
+        name, batches = _source(request.match_info["kind"], request.query)
+    except ValueError:
+        return web.json_response({"error": "Sana formati: YYYY-MM-DD"}, status=400)
+    if batches is None:
+        return web.json_response({"error": "Not found"}, status=404)
+    if _slots.locked():
+        return web.json_response({"error": "Boshqa eksport ketmoqda, keyinroq urinib ko'ring"}, status=429)
+
+    async with _slots:
+        resp = web.StreamResponse(headers={
+            "Content-Type": f"{FORMATS[fmt]}; charset=utf-8",
+            "Content-Disposition": f'attachment; filename="{name}.{fmt}"',
+            "Cache-Control": "no-store",
+        })
+        resp.enable_chunked_encoding()
+        await resp.prepare(request)
+
+        started = time.monotonic()
+        total = 0
+        if fmt == "csv":
+            await resp.write(_encode_csv((), header=COLUMNS[request.match_info["kind"]]))
+        async with aclosing(batches):
+            async for rows in batches:
+                chunk = _encode_csv(rows) if fmt == "csv" else _encode_ndjson(rows)
+                total += len(rows)
+                await resp.write(chunk)
+        await resp.write_eof()
+        logger.info(f"📤 Eksport {name}.{fmt}: {total} qator, {round(time.monotonic() - started, 1)} s")
+        return resp
@@ -0,0 +1,108 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from bot.config import FSM_TTL, FSM_CACHE_SIZE
+from database import fsm_get, fsm_set, fsm_delete, fsm_purge_expired
+
+logger = logging.getLogger(__name__)
+
+# Eskirgan yozuvlar bazadan har shuncha yozuvda bir marta tozalanadi
+PURGE_EVERY = 200
+# Bazada yo'q kalit shuncha soniya keshda turadi; keyin qayta o'qiladi
+# (boshqa worker/instansiya yozgan holat shu vaqt ichida ko'rinadi)
+MISS_TTL = 5  # seconds
+
+
+def _key(key: StorageKey) -> str:
+    return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:{key.business_connection_id or ''}:{key.destiny}"
+
+
+class DbStorage(BaseStorage):
+    """
+    Bazada saqlanadigan FSM storage (SQLite/Postgres, database helperlari orqali).
+    Har bir kalitning TTL i bor va har yozuvda yangilanadi; eskirgan kalit o'qilganda
+    o'chiriladi (lazy). Oldida cheklangan hajmli LRU kesh turadi, shuning uchun
+    xotira vaqt o'tishi bilan o'smaydi, restartdan keyin esa holat bazadan tiklanadi.
+    Bazada yo'q kalit ham MISS_TTL ga keshlanadi (holatsiz foydalanuvchining
+    har update'i SELECT qilmasligi uchun).
+    """
+
+    def __init__(self, ttl: int = FSM_TTL, cache_size: int = FSM_CACHE_SIZE):
+        self.ttl = ttl
+        self.cache_size = cache_size
+        # key -> (state, data, expires_at)
+        self._cache: OrderedDict = OrderedDict()
+        self._writes = 0
+
+    def _remember(self, key: str, record: tuple):
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _miss(now: float) -> tuple:
+        return None, {}, now + MISS_TTL
+
+    async def _load(self, key: str) -> tuple:
+        now = time.time()
+        record = self._cache.get(key)
+        if record is not None and record[2] < now and record[0] is None and not record[1]:
+            # "Yo'q" yozuvi eskirdi: bazadan qayta o'qiladi
+            record = None
+        if record is None:
+            row = await fsm_get(key)
+            if row is not None:
+                record = (row['state'], json.loads(row['data'] or '{}'), row['expires_at'] or 0)
+            else:
+                record = self._miss(now)
+        if record[2] < now:
+            # Holat TTL i tugagan
+            await fsm_delete(key)
+            record = self._miss(now)
+        self._remember(key, record)
+        return record[0], record[1]
+
+    async def _save(self, key: str, state: Optional[str], data: Dict[str, Any]):
+        if state is None and not data:
+            await fsm_delete(key)
+            self._remember(key, self._miss(time.time()))
+            return
+
+        expires_at = time.time() + self.ttl
+        await fsm_set(key, state, json.dumps(data, default=str), expires_at)
+        self._remember(key, (state, data, expires_at))
+
+        self._writes += 1
+        if self._writes % PURGE_EVERY == 0:
+            try:
+                await fsm_purge_expired(time.time())
+            except Exception as e:
+                logger.warning("FSM tozalashda xato: %s", e)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        k = _key(key)
+        _, data = await self._load(k)
+        await self._save(k, state.state if isinstance(state, State) else state, data)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _ = await self._load(_key(key))
+        return state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        k = _key(key)
+        state, _ = await self._load(k)
+        await self._save(k, state, data.copy())
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, data = await self._load(_key(key))
+        return data.copy()
+
+    async def close(self) -> None:
+        self._cache.clear()
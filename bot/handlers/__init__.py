@@ -2,9 +2,11 @@ from aiogram import Router
 from .admin import router as admin_router
 from .quiz import router as quiz_router
 from .user import router as user_router
+from .tournament import router as tournament_router
 
 router = Router()
 
 router.include_router(admin_router)
 router.include_router(quiz_router)
 router.include_router(user_router)
+router.include_router(tournament_router)
@@ -11,15 +11,19 @@ from bot.states import (
     DeleteQuestionStates, DeleteProjectStates, AdminAuthStates
 )
 from bot.utils import get_all_subjects
+from bot.question_bank import invalidate_index
 from database import (
     set_exchange_rate, get_pending_withdrawals, update_withdrawal_status,
     get_custom_subjects_list, add_custom_subject, remove_custom_subject,
-    check_is_admin_db
+    check_is_admin_db, rebuild_chat_scores, add_question, search_questions, delete_question
 )
 
 router = Router()
 logger = logging.getLogger(__name__)
 
+# Telegram xabari 4096 belgidan oshmasligi uchun
+WITHDRAWALS_PER_MESSAGE = 20
+
 # ==== EXCHANGE ADMIN ====
 @router.message(Command("setrate"))
 async def cmd_set_rate(message: types.Message):
@@ -43,17 +47,20 @@ async def cmd_withdrawals(message: types.Message):
     if str(message.from_user.id) not in ADMIN_IDS:
         return
     
-    pendings = await get_pending_withdrawals()
+    pendings = await get_pending_withdrawals(limit=WITHDRAWALS_PER_MESSAGE + 1)
     if not pendings:
         await message.answer("✅ To'lov so'rovlari yo'q.")
         return
     
     text = "📋 <b>Kutilayotgan to'lovlar:</b>\n\n"
-    for w in pendings:
+    more = len(pendings) > WITHDRAWALS_PER_MESSAGE
+    for w in pendings[:WITHDRAWALS_PER_MESSAGE]:
         # id, user_id, username, amount_coins, amount_money, created_at
         wid, uid, uname, coins, money, date = w
         text += f"🆔 #{wid} | 👤 @{uname or uid}\n💰 {coins} tanga -> 💵 {money:.2f}\n📅 {date}\n"
         text += f"Tasdiqlash: /approve_{wid}\nBekor qilish: /reject_{wid}\n\n"
+    if more:
+        text += "…yana bor: ko'rib chiqilganlaridan keyin /withdrawals ni qayta yuboring yoki admin panelni oching."
     
     await message.answer(text, parse_mode="HTML")
 
@@ -79,6 +86,21 @@ async def process_withdrawal_decision(message: types.Message):
     # For now, simplistic.
     # For now, simplistic.
 
+# ==== GROUP LEADERBOARD BACKFILL ====
+@router.message(Command("rebuildgroupscores"))
+async def cmd_rebuild_group_scores(message: types.Message):
+    if str(message.from_user.id) not in ADMIN_IDS:
+        return
+
+    await message.answer("⏳ Guruh reytinglari qayta hisoblanmoqda...")
+    try:
+        count = await rebuild_chat_scores()
+    except Exception as e:
+        logger.exception("rebuild_chat_scores xato")
+        await message.answer(f"❌ Xatolik: {e}")
+        return
+    await message.answer(f"✅ Tayyor: {count} ta chat/foydalanuvchi yozuvi.")
+
 # ==== ADMIN AUTH ====
 @router.message(Command("adminpanel"))
 async def cmd_admin_panel_auth(message: types.Message, state: FSMContext):
@@ -203,6 +225,7 @@ async def process_correct_option(message: types.Message, state: FSMContext):
     image_url = data.get("image_url", None)
     correct_option = correct_option - 1
     await add_question(subject, question, options, correct_option, message.from_user.id, image_url=image_url)
+    invalidate_index(subject)
     await message.answer(f"✅ Savol '{subject}' faniga qo‘shildi!")
     await state.clear()
 
@@ -262,6 +285,8 @@ async def process_questions_bulk(message: types.Message, state: FSMContext):
             logger.exception("add_question xato")
             errors += 1
 
+    if success:
+        invalidate_index(subject)
     await message.answer(f"✅ {success} ta savol qo‘shildi.\n⚠️ {errors} ta savolda xato bor.")
     await state.clear()
 
@@ -278,7 +303,7 @@ async def cmd_delete_question(message: types.Message, state: FSMContext):
 async def process_question_to_delete(message: types.Message, state: FSMContext):
     qtxt = message.text.strip()
 
-    rows = await search_questions(qtxt)
+    rows = await search_questions(qtxt, limit=20)
     if not rows:
         await message.answer("❌ Bunday savol topilmadi.")
         await state.clear()
@@ -288,11 +313,12 @@ async def process_question_to_delete(message: types.Message, state: FSMContext):
         for r in rows:
             text += f"ID:{r[0]} | Fan:{r[1]} | {r[2][:50]}...\n"
         text += "\nAniq ID raqamini yuboring yoki bekor qilish uchun 'cancel' deb yozing."
-        await state.update_data(found_questions=rows)
+        # Faqat id lar saqlanadi: FSM holati bazada JSON bo'lib turadi
+        await state.update_data(found_questions=[r[0] for r in rows])
         await state.set_state(DeleteQuestionStates.confirm_delete)
         await message.answer(text)
         return
-    qid, subj, qshort = rows[0]
+    qid, _, qshort = rows[0][0], rows[0][1], rows[0][2]
     await state.update_data(question_id=qid)
     await message.answer(f"🗑 Savol:\n<b>{qshort}</b>\n\nAniq o‘chirmoqchimisiz? (ha/yo‘q)", parse_mode="HTML")
     await state.set_state(DeleteQuestionStates.confirm_delete)
@@ -305,6 +331,7 @@ async def confirm_delete_question(message: types.Message, state: FSMContext):
     if txt.isdigit():
         qid = int(txt)
         await delete_question(qid)
+        invalidate_index()
         await message.answer("✅ Savol muvaffaqiyatli o‘chirildi!")
         await state.clear()
         return
@@ -316,6 +343,7 @@ async def confirm_delete_question(message: types.Message, state: FSMContext):
             await state.clear()
             return
         await delete_question(qid)
+        invalidate_index()
         await message.answer("✅ Savol muvaffaqiyatli o‘chirildi!")
         await state.clear()
         return
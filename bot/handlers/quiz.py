@@ -1,19 +1,62 @@
 import asyncio
 import logging
+import math
+import re
+import time
 from aiogram import Router, types, F, Bot
 from aiogram.filters import Command
 from aiogram.types import PollAnswer
 from bot.loader import bot
-from bot.session import active_quizzes
+from bot.session import active_quizzes, quiz_tasks, track_write
+from bot.live import live_hub
+from bot.outbound import chat_lock, release_chat
+from bot.media import send_question_image, prewarm
+from bot.scoreboard import mark_question_sent, record_answer, render_results, render_standings
+from bot.config import QUIZ_STANDINGS_EVERY
+from bot.metrics import PACING_DRIFT, POLL_ANSWER_ACCEPTED, POLL_ANSWER_DUPLICATE, POLL_ANSWER_UNKNOWN
+from bot.question_bank import pick_questions, parse_difficulty
 from database import get_custom_subjects_list
 from database import (
-    get_questions, create_quiz_session, save_user_answer,
-    get_session_results, close_session, get_or_create_user
+    create_quiz_session, save_user_answer, record_question_asked,
+    close_session, get_or_create_user
 )
 
 router = Router()
 logger = logging.getLogger(__name__)
 
+def parse_fast_mode(token: str | None):
+    """
+    Tezkor rejim parametri: "fast" -> hamma javob berganda keyingi savol,
+    "70%" -> ishtirokchilarning 70% javob berganda. Aks holda None.
+    """
+    if not token:
+        return None
+    token = token.lower()
+    if token in ("fast", "tez"):
+        return 1.0
+    if token.endswith("%") and token[:-1].isdigit():
+        percent = max(1, min(100, int(token[:-1])))
+        return percent / 100
+    return None
+
+def parse_quiz_options(tokens: list):
+    """Raqamlardan keyingi parametrlar: tezkor rejim va qiyinlik (istalgan tartibda)"""
+    quorum = None
+    mix = None
+    for token in tokens:
+        if quorum is None:
+            quorum = parse_fast_mode(token)
+        if mix is None:
+            mix = parse_difficulty(token)
+    return quorum, mix
+
+def fast_mode_label(quorum: float | None) -> str:
+    if quorum is None:
+        return ""
+    if quorum >= 1.0:
+        return "\n⚡ Tezkor rejim: hamma javob bersa keyingi savol"
+    return f"\n⚡ Tezkor rejim: {int(quorum * 100)}% javob bersa keyingi savol"
+
 # ==== QUIZ START ====
 @router.message(Command("quiz"))
 async def cmd_quiz(message: types.Message):
@@ -24,7 +67,8 @@ async def cmd_quiz(message: types.Message):
         if tokens[1].isdigit() and tokens[2].isdigit():
             limit = max(1, min(50, int(tokens[1])))
             seconds = max(5, min(600, int(tokens[2])))
-    await start_quiz(message, None, limit=limit, seconds=seconds)
+    quorum, mix = parse_quiz_options(tokens[1:])
+    await start_quiz(message, None, limit=limit, seconds=seconds, quorum=quorum, mix=mix)
 
 @router.message(Command("quizeng"))
 async def cmd_quiz_eng(message: types.Message):
@@ -42,7 +86,7 @@ async def cmd_quiz_math(message: types.Message):
 async def cmd_quiz_fiz(message: types.Message):
     await start_quiz(message, "physics")
 
-@router.message(F.text.regexp(r'^/quiz\w*(?:@\w+)?(?:\s+\d+(?:\s+\d+)?)?$'))
+@router.message(F.text.regexp(r'^/quiz\w*(?:@\w+)?(?:\s+\d+(?:\s+\d+)?)?(?:\s+(?:fast|tez|\d{1,3}%|easy|medium|hard|mix|oson|orta|qiyin|aralash)){0,2}$', flags=re.IGNORECASE))
 async def handle_dynamic_quiz(message: types.Message):
     parts = message.text.strip().lower().split()
     cmd = parts[0].split('@')[0]
@@ -72,19 +116,24 @@ async def handle_dynamic_quiz(message: types.Message):
     
     if len(parts) >= 3 and parts[2].isdigit():
         seconds = max(5, min(300, int(parts[2])))
+
+    quorum, mix = parse_quiz_options(parts[1:])
     
     await message.answer(
         f"🎯 Test parametrlari:\nFan: {subject or 'Barcha fanlar'}\nSavollar soni: {limit}\nHar bir savol uchun vaqt: {seconds} soniya"
+        + fast_mode_label(quorum)
     )
-    await start_quiz(message, subject, limit=limit, seconds=seconds)
+    await start_quiz(message, subject, limit=limit, seconds=seconds, quorum=quorum, mix=mix)
 
-async def start_quiz(message: types.Message, subject: str | None, *, limit: int = 20, seconds: int = 15):
+async def start_quiz(message: types.Message, subject: str | None, *, limit: int = 20, seconds: int = 15,
+                     quorum: float | None = None, mix: dict | None = None):
     chat_id = message.chat.id
     if chat_id in active_quizzes and active_quizzes[chat_id]["active"]:
         await message.answer("❌ Test allaqachon boshlangan!")
         return
 
-    questions = await get_questions(subject=subject, limit=limit)
+    # Chatda avval berilmagan savollar
+    questions = await pick_questions(chat_id, subject, limit, mix=mix)
     if not questions:
         await message.answer("❌ Bu fan uchun savollar topilmadi.")
         return
@@ -96,14 +145,36 @@ async def start_quiz(message: types.Message, subject: str | None, *, limit: int
         "current_question": 0,
         "questions": questions,
         "poll_ids": {},
-        "seconds": seconds
+        "seconds": seconds,
+        "scores": {},
+        # Tezkor rejim (None = o'chiq)
+        "quorum": quorum,
+        "participants": set(),
+        "expected": set(),
+        "answered": set(),
+        "advance": asyncio.Event()
     }
 
     await message.answer(
-        f"🎯 Test boshlandi!\nFan: {subject or 'Barcha fanlar'}\nSavollar soni: {len(questions)}\n⏱ Har biriga {seconds} soniya",
+        f"🎯 Test boshlandi!\nFan: {subject or 'Barcha fanlar'}\nSavollar soni: {len(questions)}\n⏱ Har biriga {seconds} soniya" + fast_mode_label(quorum),
         parse_mode="HTML"
     )
-    await send_next_question(chat_id)
+    prewarm(questions[:2])
+    run_quiz_loop(chat_id)
+
+def run_quiz_loop(chat_id: int):
+    """
+    Quiz sikli alohida task'da: /quiz handleri darhol qaytadi va pipeline
+    slotini butun test davomida band qilmaydi. Task shutdown'da to'xtatiladi.
+    """
+    task = asyncio.create_task(send_next_question(chat_id))
+    quiz_tasks[chat_id] = task
+
+    def _done(t):
+        if quiz_tasks.get(chat_id) is t:
+            quiz_tasks.pop(chat_id, None)
+    task.add_done_callback(_done)
+    return task
 
 async def send_next_question(chat_id: int):
     quiz = active_quizzes.get(chat_id)
@@ -117,21 +188,56 @@ async def send_next_question(chat_id: int):
         await finish_quiz(chat_id)
         return
 
-    q = questions[i]
+    if quiz.get("quorum") is not None:
+        # Oldingi savollarda javob berganlar shu savolda ham kutiladi
+        quiz["expected"] = set(quiz["participants"])
+        quiz["answered"] = set()
+        quiz["advance"].clear()
+    # Oddiy rejimda savol oldingisining oynasi (seconds + 2) tugashi bilan chiqishi kerak
+    due = None
+    if quiz.get("quorum") is None and quiz.get("question_sent_at"):
+        due = quiz["question_sent_at"] + quiz.get("seconds", 15) + 2
     try:
-        image = q.get("image_url") or q.get("image")
-        if image:
-            try:
-                await bot.send_photo(chat_id=chat_id, photo=image)
-                await asyncio.sleep(0.6)
-            except Exception as e:
-                logger.warning("Rasm yuborishda xato: %s", e)
+        poll = await send_question(chat_id, quiz, i)
+    except Exception as e:
+        logger.exception("Poll yuborishda xato (savol #%s): %s", i, e)
+        quiz["current_question"] += 1
+        await asyncio.sleep(1)
+        await send_next_question(chat_id)
+        return
 
-        raw_question = q.get("question") or ""
-        if raw_question.strip() == "" or raw_question.strip().lower() in ("❓rasmdagi savol", "rasmdagi savol"):
-            question_text = "Rasmda nima aks etilgan?"
-        else:
-            question_text = raw_question
+    if due is not None:
+        PACING_DRIFT.observe(max(0.0, quiz["question_sent_at"] - due))
+
+    # Savol ochiq turganda keyingi savol rasmini yuklab qo'yamiz
+    prewarm(questions[i + 1:i + 2])
+
+    await wait_for_answers(chat_id, quiz, poll.message_id)
+    if not quiz.get("active", False):
+        return
+    quiz["current_question"] += 1
+    await send_standings(chat_id, quiz)
+    await send_next_question(chat_id)
+
+async def send_question(chat_id: int, quiz: dict, i: int, record_stats: bool = True):
+    """
+    i-savolni (rasm + quiz poll) yuboradi va poll_ids ga yozadi.
+    Turnirda ham ishlatiladi (bot/tournament.py); xatoni chaqiruvchi ushlaydi.
+    """
+    questions = quiz["questions"]
+    q = questions[i]
+    raw_question = q.get("question") or ""
+    if raw_question.strip() == "" or raw_question.strip().lower() in ("❓rasmdagi savol", "rasmdagi savol"):
+        question_text = "Rasmda nima aks etilgan?"
+    else:
+        question_text = raw_question
+
+    # Rasm va poll bitta lock ostida ketma-ket yuboriladi, sleep kerak emas
+    async with chat_lock(chat_id):
+        try:
+            await send_question_image(chat_id, q)
+        except Exception as e:
+            logger.warning("Rasm yuborishda xato: %s", e)
 
         poll = await bot.send_poll(
             chat_id=chat_id,
@@ -142,21 +248,64 @@ async def send_next_question(chat_id: int):
             is_anonymous=False,
             open_period=quiz.get("seconds", 15)
         )
+
+    mark_question_sent(quiz)
+    live_hub.quiz_progress(chat_id, quiz)
+    if poll.poll:
+        quiz["poll_ids"][poll.poll.id] = {
+            "question_num": i,
+            "question_id": q.get("id"),
+            "correct": q["correct_option_id"],
+            "message_id": poll.message_id
+        }
+    if record_stats and q.get("id"):
+        track_write(record_question_asked(q["id"]))
+    return poll
+
+async def send_standings(chat_id: int, quiz: dict):
+    done = quiz["current_question"]
+    if not QUIZ_STANDINGS_EVERY or done % QUIZ_STANDINGS_EVERY != 0 or done >= len(quiz["questions"]):
+        return
+    text = render_standings(quiz, done)
+    if not text:
+        return
+    try:
+        async with chat_lock(chat_id):
+            await bot.send_message(chat_id, text, parse_mode="HTML")
     except Exception as e:
-        logger.exception("Poll yuborishda xato (savol #%s): %s", i, e)
-        quiz["current_question"] += 1
-        await asyncio.sleep(1)
-        await send_next_question(chat_id)
+        logger.warning("Oraliq natijani yuborishda xato: %s", e)
+
+async def wait_for_answers(chat_id: int, quiz: dict, message_id: int):
+    """Savol vaqti tugashini yoki (tezkor rejimda) kerakli javoblar yig'ilishini kutadi"""
+    timeout = quiz.get("seconds", 15) + 2
+    if quiz.get("quorum") is None or not quiz["expected"]:
+        await asyncio.sleep(timeout)
         return
 
-    if poll.poll:
-        quiz["poll_ids"][poll.poll.id] = {"question_num": i, "correct": q["correct_option_id"]}
+    try:
+        await asyncio.wait_for(quiz["advance"].wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        return
 
-    await asyncio.sleep(quiz.get("seconds", 15) + 2)
     if not quiz.get("active", False):
         return
-    quiz["current_question"] += 1
-    await send_next_question(chat_id)
+    try:
+        await bot.stop_poll(chat_id=chat_id, message_id=message_id)
+    except Exception as e:
+        logger.warning("Pollni yopishda xato: %s", e)
+
+def _count_fast_answer(quiz: dict, user_id: int, question_num: int):
+    quiz["participants"].add(user_id)
+    if question_num != quiz["current_question"]:
+        return
+    quiz["answered"].add(user_id)
+
+    expected = quiz["expected"]
+    if not expected:
+        return
+    needed = max(1, math.ceil(len(expected) * quiz["quorum"]))
+    if len(quiz["answered"] & expected) >= needed:
+        quiz["advance"].set()
 
 @router.poll_answer()
 async def handle_poll_answer(poll_answer: PollAnswer):
@@ -173,8 +322,25 @@ async def handle_poll_answer(poll_answer: PollAnswer):
         if poll_id in quiz["poll_ids"]:
             q_info = quiz["poll_ids"][poll_id]
             is_correct = option == q_info["correct"]
-            await save_user_answer(quiz["session_id"], user.id, q_info["question_num"], is_correct)
+            answer_ms = None
+            if q_info["question_num"] == quiz["current_question"] and quiz.get("question_sent_at"):
+                answer_ms = int((time.monotonic() - quiz["question_sent_at"]) * 1000)
+            if not record_answer(quiz, user, q_info["question_num"], is_correct):
+                POLL_ANSWER_DUPLICATE.inc()
+                break
+            POLL_ANSWER_ACCEPTED.inc()
+            if quiz.get("quorum") is not None:
+                _count_fast_answer(quiz, user.id, q_info["question_num"])
+            score_diff = await save_user_answer(
+                quiz["session_id"], user.id, q_info["question_num"], is_correct,
+                question_id=q_info.get("question_id"), answer_ms=answer_ms, chat_id=chat_id
+            )
+            live_hub.user_score(user.id, score_diff)
+            live_hub.quiz_progress(chat_id, quiz)
             break
+    else:
+        # Tugagan yoki boshqa jarayondagi quiz polli
+        POLL_ANSWER_UNKNOWN.inc()
 
 async def finish_quiz(chat_id: int):
     quiz = active_quizzes.get(chat_id)
@@ -182,31 +348,27 @@ async def finish_quiz(chat_id: int):
         return
 
     session_id = quiz["session_id"]
-    results = await get_session_results(session_id)
+    # Natijalar xotiradagi jadvaldan olinadi, bazaga qayta so'rov yo'q
+    text = render_results(quiz)
     active_quizzes[chat_id]["active"] = False
+    live_hub.quiz_progress(chat_id, quiz, finished=True)
 
-    if not results:
-        try:
-            await bot.send_message(chat_id, "❌ Test tugadi, hech kim javob bermadi.")
-        except Exception:
-            pass
-        await close_session(session_id)
-        active_quizzes.pop(chat_id, None)
-        return
-
-    text = "🏆 <b>Natijalar:</b>\n\n"
-    for i, (uid, username, fname, score) in enumerate(results, 1):
-        name = f"@{username}" if username else (fname or str(uid))
-        medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else "▫️"
-        text += f"{medal} {i}. {name} — {score} 🪙tanga\n"
-
-    try:
-        await bot.send_message(chat_id, text, parse_mode="HTML")
-    except Exception as e:
-        logger.exception("Natijani yuborishda xato: %s", e)
+    # Natija ham savollar kabi chat lock orqali: turnir yoki keyingi quiz xabari orasiga tushmaydi
+    async with chat_lock(chat_id):
+        if not text:
+            try:
+                await bot.send_message(chat_id, "❌ Test tugadi, hech kim javob bermadi.")
+            except Exception:
+                pass
+        else:
+            try:
+                await bot.send_message(chat_id, text, parse_mode="HTML")
+            except Exception as e:
+                logger.exception("Natijani yuborishda xato: %s", e)
 
-    await close_session(session_id)
+    track_write(close_session(session_id))
     active_quizzes.pop(chat_id, None)
+    release_chat(chat_id)
 
 @router.message(Command("cancel"))
 async def cmd_cancel(message: types.Message):
@@ -217,5 +379,7 @@ async def cmd_cancel(message: types.Message):
         return
 
     active_quizzes[chat_id]["active"] = False
+    if "advance" in quiz:
+        quiz["advance"].set()
     await message.answer("❗ Test bekor qilinyapti... Natijalar hisoblanadi.", parse_mode="HTML")
     await finish_quiz(chat_id)
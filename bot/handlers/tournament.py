@@ -0,0 +1,126 @@
+import logging
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from aiogram import Router, types
+from aiogram.filters import Command
+
+from bot.config import ADMIN_IDS, SCHEDULER_TIMEZONE, TOURNAMENT_MAX_SKEW
+from bot.loader import bot
+from bot.scheduler import schedule_tournament, unschedule_tournament
+from bot.tournament import expected_skew
+from database import (
+    register_tournament_chat, unregister_tournament_chat, get_tournament_chats,
+    create_tournament, get_tournament, get_scheduled_tournaments, set_tournament_status
+)
+
+router = Router()
+logger = logging.getLogger(__name__)
+
+
+async def _is_chat_admin(message: types.Message) -> bool:
+    if message.from_user is None:
+        # Anonim guruh admini guruh nomidan yozadi (sender_chat = shu chat); kanal postlari emas
+        return message.sender_chat is not None and message.sender_chat.id == message.chat.id
+    if str(message.from_user.id) in ADMIN_IDS:
+        return True
+    try:
+        member = await bot.get_chat_member(message.chat.id, message.from_user.id)
+    except Exception:
+        return False
+    return member.status in ("creator", "administrator")
+
+
+# ==== CHAT REGISTRATION (guruh adminlari) ====
+@router.message(Command("tournamentjoin"))
+async def cmd_tournament_join(message: types.Message):
+    if message.chat.type not in ("group", "supergroup"):
+        await message.answer("❌ Bu buyruq faqat guruhlarda ishlaydi.")
+        return
+    if not await _is_chat_admin(message):
+        return
+    await register_tournament_chat(message.chat.id, message.chat.title)
+    await message.answer("✅ Guruh turnirlarga qo'shildi. Turnir boshlanganda savollar shu yerga keladi.")
+
+
+@router.message(Command("tournamentleave"))
+async def cmd_tournament_leave(message: types.Message):
+    if message.chat.type not in ("group", "supergroup") or not await _is_chat_admin(message):
+        return
+    await unregister_tournament_chat(message.chat.id)
+    await message.answer("✅ Guruh turnirlardan chiqarildi.")
+
+
+# ==== SCHEDULING (ADMIN_IDS) ====
+@router.message(Command("tournament"))
+async def cmd_tournament(message: types.Message):
+    if not message.from_user or str(message.from_user.id) not in ADMIN_IDS:
+        return
+
+    # /tournament 2026-10-20 18:00 [savollar] [soniya] [fan]
+    parts = (message.text or "").split()
+    try:
+        start = datetime.strptime(f"{parts[1]} {parts[2]}", "%Y-%m-%d %H:%M").replace(tzinfo=ZoneInfo(SCHEDULER_TIMEZONE))
+    except (IndexError, ValueError):
+        await message.answer(
+            "Foydalanish: /tournament YYYY-MM-DD HH:MM [savollar] [soniya] [fan]\n"
+            f"Vaqt zonasi: {SCHEDULER_TIMEZONE}"
+        )
+        return
+    count = max(1, min(50, int(parts[3]))) if len(parts) > 3 and parts[3].isdigit() else 20
+    seconds = max(5, min(300, int(parts[4]))) if len(parts) > 4 and parts[4].isdigit() else 15
+    subject = parts[5] if len(parts) > 5 else None
+
+    start_at = start.timestamp()
+    if start_at <= datetime.now().timestamp():
+        await message.answer("❌ Vaqt o'tib ketgan.")
+        return
+
+    tournament_id = await create_tournament(start_at, subject, count, seconds, message.from_user.id)
+    schedule_tournament(tournament_id, start_at)
+
+    chats = len(await get_tournament_chats())
+    skew = expected_skew(chats)
+    text = (
+        f"✅ Turnir #{tournament_id} rejalashtirildi: {start:%Y-%m-%d %H:%M}\n"
+        f"Fan: {subject or 'Barcha fanlar'}, {count} savol x {seconds} s\n"
+        f"Guruhlar: {chats}, kutilayotgan start skew: ~{skew:.1f} s"
+    )
+    if skew > TOURNAMENT_MAX_SKEW:
+        text += f"\n⚠️ Skew {TOURNAMENT_MAX_SKEW:.0f} s dan katta: TOURNAMENT_SEND_RATE ni oshiring yoki guruhlarni kamaytiring"
+    await message.answer(text)
+
+
+@router.message(Command("tournaments"))
+async def cmd_tournaments(message: types.Message):
+    if not message.from_user or str(message.from_user.id) not in ADMIN_IDS:
+        return
+    rows = await get_scheduled_tournaments()
+    if not rows:
+        await message.answer("📭 Rejalashtirilgan turnirlar yo'q.")
+        return
+    tz = ZoneInfo(SCHEDULER_TIMEZONE)
+    lines = ["🏆 <b>Rejalashtirilgan turnirlar:</b>"]
+    for t in rows:
+        start = datetime.fromtimestamp(t['start_at'], tz)
+        lines.append(f"#{t['id']} — {start:%Y-%m-%d %H:%M}, {t['subject'] or 'barcha fanlar'}, {t['questions_count']} x {t['seconds']} s")
+    lines.append("\nBekor qilish: /canceltournament ID")
+    await message.answer("\n".join(lines), parse_mode="HTML")
+
+
+@router.message(Command("canceltournament"))
+async def cmd_cancel_tournament(message: types.Message):
+    if not message.from_user or str(message.from_user.id) not in ADMIN_IDS:
+        return
+    parts = (message.text or "").split()
+    if len(parts) < 2 or not parts[1].isdigit():
+        await message.answer("Foydalanish: /canceltournament ID")
+        return
+    tournament_id = int(parts[1])
+    t = await get_tournament(tournament_id)
+    if not t or t['status'] != 'scheduled':
+        await message.answer("❌ Rejalashtirilgan turnir topilmadi.")
+        return
+    unschedule_tournament(tournament_id)
+    await set_tournament_status(tournament_id, 'cancelled')
+    await message.answer(f"✅ Turnir #{tournament_id} bekor qilindi.")
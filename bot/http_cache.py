@@ -0,0 +1,106 @@
+import hashlib
+import logging
+
+from aiohttp import web
+
+from database.cache import TTLCache, subscribe
+
+logger = logging.getLogger(__name__)
+
+# Tez-tez keladigan o'zgarishlarda kesh ko'pi bilan shuncha soniyada bir marta tozalanadi
+INVALIDATE_INTERVAL = {"answers": 5}
+
+
+# web.Response bularni body dan o'zi qo'yadi
+_OWN_HEADERS = {"content-type", "content-length"}
+
+
+class CachedResponse:
+    __slots__ = ("status", "body", "content_type", "headers", "etag")
+
+    def __init__(self, status: int, body: bytes, content_type: str, headers=None):
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+        # Handler headerlari; faqat xato javobni qayta qurishda ishlatiladi
+        self.headers = {k: v for k, v in (headers or {}).items() if k.lower() not in _OWN_HEADERS}
+        self.etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match zaif solishtirish bilan tekshiriladi (RFC 9110)
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """
+    Faqat o'qiladigan GET endpointlar uchun javob keshi (aiohttp middleware).
+    Javob tayyor baytlar holida saqlanadi, kuchli ETag bilan qaytadi,
+    If-None-Match mos kelsa 304. Bir xil kalitdagi parallel so'rovlar bitta
+    hisoblashni kutadi (TTLCache.get_or_load). Kalit: path + query (+ user).
+    """
+
+    def __init__(self):
+        # route handler -> spec
+        self.specs: dict = {}
+
+    def cached(self, ttl: float, *, tags: tuple = (), per_user: bool = False, guard=None,
+               private: bool = False, max_age: int = 0, max_size: int = 256):
+        """
+        tags: database.cache.changed() topiclari, o'zgarganda kesh tozalanadi.
+        guard: async (request) -> bool; False bo'lsa handler keshsiz chaqiriladi (masalan 403).
+        max_age: brauzer qayta so'ramasdan ishlatadigan vaqt; 0 = har safar ETag bilan tekshirish.
+        """
+        def decorator(handler):
+            cache = TTLCache(ttl, max_size)
+            for tag in tags:
+                subscribe(tag, cache.invalidate, min_interval=INVALIDATE_INTERVAL.get(tag, 0))
+            scope = "private" if private or per_user else "public"
+            self.specs[handler] = {
+                "cache": cache,
+                "per_user": per_user,
+                "guard": guard,
+                "cache_control": f"{scope}, max-age={max_age}" + (", must-revalidate" if not max_age else ""),
+            }
+            return handler
+        return decorator
+
+    def invalidate_all(self):
+        for spec in self.specs.values():
+            spec["cache"].invalidate()
+
+    @staticmethod
+    async def _render(handler, request) -> CachedResponse:
+        resp = await handler(request)
+        return CachedResponse(resp.status, resp.body, resp.content_type, resp.headers)
+
+    @web.middleware
+    async def middleware(self, request: web.Request, handler):
+        spec = self.specs.get(request.match_info.handler) if request.method == "GET" else None
+        if spec is None:
+            return await handler(request)
+        if spec["guard"] is not None and not await spec["guard"](request):
+            return await handler(request)
+
+        key = (request.path, tuple(sorted(request.query.items())))
+        if spec["per_user"]:
+            key += (request.headers.get("X-User-ID"),)
+        cache = spec["cache"]
+        entry = await cache.get_or_load(key, lambda: self._render(handler, request))
+        if entry.status != 200:
+            # Xato javoblar keshlanmaydi (kutib turganlar shu javobni oladi)
+            cache.discard(key)
+            return web.Response(status=entry.status, body=entry.body, content_type=entry.content_type,
+                                headers=entry.headers)
+
+        headers = {"ETag": entry.etag, "Cache-Control": spec["cache_control"]}
+        if etag_matches(request.headers.get("If-None-Match", ""), entry.etag):
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=entry.body, content_type=entry.content_type, headers=headers)
+
+
+response_cache = ResponseCache()
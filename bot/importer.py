@@ -0,0 +1,265 @@
+import asyncio
+import json
+import logging
+import re
+import time
+import uuid
+from collections import OrderedDict
+
+from aiohttp import web
+
+from bot.question_bank import invalidate_index
+from database import add_question, add_questions_batch
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+BATCH_SIZE = 500
+MAX_LINE = 64 * 1024
+MAX_ERRORS = 1000  # shundan keyingi xatolar faqat sanaladi
+KEEP_JOBS = 20
+JOB_ID = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+class ImportJob:
+    def __init__(self, job_id: str, subject: str | None):
+        self.id = job_id
+        self.subject = subject
+        self.status = "running"
+        self.lines = 0
+        self.bytes = 0
+        self.added = 0
+        self.failed = 0
+        self.errors: list = []  # [{"line": n, "error": str, "text": str}]
+        self.started = time.time()
+        self.finished = None
+        self.changed = asyncio.Event()
+
+    def error(self, line_no: int, message: str, text: str):
+        self.failed += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"line": line_no, "error": message, "text": text[:80]})
+
+    def as_dict(self, with_errors: bool = True) -> dict:
+        data = {
+            "id": self.id,
+            "subject": self.subject,
+            "status": self.status,
+            "lines": self.lines,
+            "bytes": self.bytes,
+            "added": self.added,
+            "failed": self.failed,
+            "elapsed_s": round((self.finished or time.time()) - self.started, 2),
+        }
+        if with_errors:
+            data["errors"] = self.errors
+        return data
+
+
+# job_id -> ImportJob (oxirgi KEEP_JOBS tasi)
+jobs: OrderedDict = OrderedDict()
+
+
+def _register(job: ImportJob):
+    jobs[job.id] = job
+    while len(jobs) > KEEP_JOBS:
+        oldest = next(iter(jobs))
+        if jobs[oldest].status == "running":
+            break
+        jobs.pop(oldest)
+
+
+# --- incremental parsing ---
+async def iter_lines(read_chunk, job: ImportJob):
+    """read_chunk() dan baytlarni o'qib, qatorlarga bo'ladi; xotirada faqat bitta chunk + qoldiq"""
+    rest = b""
+    while True:
+        chunk = await read_chunk()
+        if not chunk:
+            break
+        job.bytes += len(chunk)
+        rest += chunk
+        *lines, rest = rest.split(b"\n")
+        for line in lines:
+            yield line
+        if len(rest) > MAX_LINE:
+            # Juda uzun qator: tashlab yuboriladi, keyingi \n gacha o'tkaziladi
+            yield None
+            rest = b""
+            while True:
+                chunk = await read_chunk()
+                if not chunk:
+                    return
+                job.bytes += len(chunk)
+                if b"\n" in chunk:
+                    *lines, rest = chunk.split(b"\n", 1)[1].split(b"\n")
+                    for line in lines:
+                        yield line
+                    break
+    if rest:
+        yield rest
+
+
+def parse_txt_line(line: str, subject: str | None):
+    """Savol | v1, v2, v3, v4 | javob (1-4)"""
+    parts = [p.strip() for p in line.split("|")]
+    if len(parts) < 3:
+        raise ValueError("format: Savol | v1, v2, v3, v4 | javob")
+    options = [o.strip() for o in parts[1].split(",")]
+    if len(options) != 4:
+        raise ValueError("4 ta variant bo'lishi kerak")
+    if not parts[2].isdigit() or not 1 <= int(parts[2]) <= 4:
+        raise ValueError("javob 1-4 oralig'ida bo'lishi kerak")
+    if not subject:
+        raise ValueError("fan ko'rsatilmagan")
+    return subject, parts[0], options, int(parts[2]) - 1
+
+
+def parse_ndjson_line(line: str, subject: str | None):
+    """{"question": ..., "options": [4], "correct_option": 0-3 | "answer": 1-4, "subject"?: ...}"""
+    item = json.loads(line)
+    if not isinstance(item, dict):
+        raise ValueError("JSON obyekt kutilgan")
+    subject = item.get("subject") or subject
+    options = item.get("options")
+    if "correct_option" in item:
+        correct = item["correct_option"]
+    else:
+        correct = int(item.get("answer", 0)) - 1
+    if not subject or not item.get("question"):
+        raise ValueError("subject va question majburiy")
+    if not isinstance(options, list) or len(options) != 4:
+        raise ValueError("4 ta variant bo'lishi kerak")
+    if not isinstance(correct, int) or not 0 <= correct <= 3:
+        raise ValueError("to'g'ri javob 0-3 (yoki answer 1-4)")
+    return subject.strip().lower(), str(item["question"]), [str(o) for o in options], correct
+
+
+async def run_import(job: ImportJob, read_chunk, fmt: str, created_by: int | None):
+    parse = parse_ndjson_line if fmt == "ndjson" else parse_txt_line
+    batch = []
+    subjects = set()
+
+    async def flush():
+        try:
+            await add_questions_batch(batch, created_by)
+            job.added += len(batch)
+        except Exception as e:
+            # Batch bitta tranzaksiya: bitta yomon qator hammasini rad etadi,
+            # shuning uchun qatorma-qator qayta yoziladi (bulk_txt kabi)
+            logger.warning("Import %s batch xato (%s), qatorma-qator yoziladi", job.id, e)
+            for row, (line_no, line) in zip(batch, batch_lines):
+                try:
+                    await add_question(*row, created_by)
+                    job.added += 1
+                except Exception as row_error:
+                    job.error(line_no, f"DB: {row_error}", line)
+        batch.clear()
+        batch_lines.clear()
+        job.changed.set()
+
+    batch_lines = []
+    async for raw in iter_lines(read_chunk, job):
+        job.lines += 1
+        if raw is None:
+            job.error(job.lines, f"qator {MAX_LINE} baytdan uzun", "")
+            continue
+        line = raw.decode("utf-8", errors="replace").strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            row = parse(line, job.subject)
+        except (ValueError, TypeError, json.JSONDecodeError) as e:
+            job.error(job.lines, str(e), line)
+            continue
+        batch.append(row)
+        batch_lines.append((job.lines, line))
+        subjects.add(row[0])
+        if len(batch) >= BATCH_SIZE:
+            await flush()
+    if batch:
+        await flush()
+
+    for subject in subjects:
+        invalidate_index(subject)
+
+
+async def handle_import(request: web.Request, created_by: int | None) -> web.Response:
+    """
+    POST /api/admin/questions/import?subject=math&format=txt|ndjson&job=<id>
+    Body: text/plain, application/x-ndjson yoki multipart (file + ixtiyoriy subject/format maydonlari).
+    Body oqim sifatida o'qiladi; jarayonni job=<id> bo'yicha status/SSE endpointidan kuzatish mumkin.
+    """
+    job_id = request.query.get("job") or uuid.uuid4().hex
+    if not JOB_ID.match(job_id) or job_id in jobs:
+        return web.json_response({"error": "Invalid job id"}, status=400)
+
+    job = ImportJob(job_id, None)
+    # id birinchi await'dan oldin band qilinadi: shu job=<id> bilan parallel so'rov 400 oladi
+    _register(job)
+    try:
+        subject = request.query.get("subject")
+        fmt = request.query.get("format")
+        content_type = request.content_type
+
+        if content_type.startswith("multipart/"):
+            reader = await request.multipart()
+            part = await reader.next()
+            # Fayldan oldingi oddiy maydonlar (subject, format)
+            while part is not None and part.filename is None:
+                value = (await part.text()).strip()
+                if part.name == "subject":
+                    subject = value
+                elif part.name == "format":
+                    fmt = value
+                part = await reader.next()
+            if part is None:
+                job.status = "failed"
+                job.error(0, "file part missing", "")
+                return web.json_response({"error": "file part missing"}, status=400)
+            if fmt is None and (part.filename or "").endswith((".ndjson", ".jsonl")):
+                fmt = "ndjson"
+            read_chunk = lambda: part.read_chunk(CHUNK_SIZE)
+        else:
+            if fmt is None and content_type in ("application/x-ndjson", "application/jsonl"):
+                fmt = "ndjson"
+            read_chunk = lambda: request.content.read(CHUNK_SIZE)
+
+        job.subject = subject.strip().lower() if subject else None
+        await run_import(job, read_chunk, fmt or "txt", created_by)
+        job.status = "done"
+    except Exception as e:
+        logger.exception("Import %s xato", job_id)
+        job.status = "failed"
+        job.error(job.lines, str(e), "")
+    finally:
+        job.finished = time.time()
+        job.changed.set()
+    logger.info(f"📥 Import {job_id}: +{job.added}, xato {job.failed}, {job.bytes // 1024} KB")
+    return web.json_response(job.as_dict())
+
+
+async def handle_status(request: web.Request) -> web.Response:
+    job = jobs.get(request.match_info["job_id"])
+    if job is None:
+        return web.json_response({"error": "Not found"}, status=404)
+    return web.json_response(job.as_dict(with_errors=request.query.get("errors") == "1"))
+
+
+async def handle_events(request: web.Request) -> web.StreamResponse:
+    """SSE: har batch'dan keyin jarayon, oxirida xatolar bilan to'liq hisobot"""
+    job = jobs.get(request.match_info["job_id"])
+    if job is None:
+        return web.json_response({"error": "Not found"}, status=404)
+
+    resp = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+    await resp.prepare(request)
+    while job.status == "running":
+        job.changed.clear()
+        await resp.write(b"event: progress\ndata: " + json.dumps(job.as_dict(with_errors=False)).encode() + b"\n\n")
+        try:
+            await asyncio.wait_for(job.changed.wait(), timeout=15)
+        except asyncio.TimeoutError:
+            pass
+    await resp.write(b"event: done\ndata: " + json.dumps(job.as_dict()).encode() + b"\n\n")
+    return resp
@@ -0,0 +1,248 @@
+import asyncio
+import json
+import logging
+
+from aiohttp import web
+
+from bot.config import LIVE_MAX_CONNECTIONS, LIVE_KEEPALIVE
+from bot.scoreboard import ranking
+from database import get_user_score
+from database.cache import subscribe
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD = "leaderboard"
+
+
+def _encode(payload) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class Subscriber:
+    """
+    Bitta SSE ulanish. Har topic uchun faqat oxirgi yuborilmagan xabar saqlanadi:
+    sekin klient navbat yig'maydi, yozish tugagach eng so'nggi holatni oladi.
+    """
+    __slots__ = ("topics", "pending", "wakeup")
+
+    def __init__(self, topics: set):
+        self.topics = topics
+        self.pending: dict = {}
+        self.wakeup = asyncio.Event()
+
+    def push(self, topic: str, data: bytes, full: bytes | None = None):
+        # Yuborilmagan delta ustiga yangi delta kelsa, ikkalasi o'rniga to'liq holat ketadi
+        self.pending[topic] = full if full is not None and topic in self.pending else data
+        self.wakeup.set()
+
+
+class LiveHub:
+    """
+    Server-sent events: reyting o'zgarishlari (leaderboard), foydalanuvchining
+    o'z bali (me -> user:<id>) va chatdagi quiz jarayoni (chat:<id>).
+    Xabar bir marta JSON qilinadi va obunachilarga bayt sifatida tarqatiladi.
+    """
+
+    def __init__(self):
+        self.subscribers: dict = {}  # topic -> set[Subscriber]
+        self.connections = 0
+        self.closed = False
+        self.board: list = []
+        self.board_version = 0
+        self.user_scores: dict = {}  # user_id -> total_score (faqat obunachisi borlar)
+        # run.py ulaydi: async () -> [{"name", "score"}, ...]
+        self.leaderboard_loader = None
+        self._refreshing = False
+
+    def has(self, topic: str) -> bool:
+        return bool(self.subscribers.get(topic))
+
+    def publish(self, topic: str, payload, full=None):
+        subs = self.subscribers.get(topic)
+        if not subs:
+            return
+        data = _encode(payload)
+        full_data = _encode(full) if full is not None else None
+        for sub in subs:
+            sub.push(topic, data, full_data)
+
+    # --- leaderboard ---
+    def _board_snapshot(self) -> dict:
+        return {"type": "snapshot", "version": self.board_version, "rows": self.board}
+
+    def refresh_leaderboard(self):
+        """database.cache "rankings" hooki chaqiradi (rankings_cache tozalangandan keyin)"""
+        if self.has(LEADERBOARD) and not self._refreshing and self.leaderboard_loader:
+            asyncio.create_task(self._refresh_leaderboard())
+
+    async def _refresh_leaderboard(self):
+        self._refreshing = True
+        try:
+            rows = await self.leaderboard_loader()
+        except Exception as e:
+            logger.warning("Live leaderboard yangilashda xato: %s", e)
+            return
+        finally:
+            self._refreshing = False
+
+        changes = [
+            {"rank": i + 1, **row} for i, row in enumerate(rows)
+            if i >= len(self.board) or self.board[i] != row
+        ]
+        if not changes and len(rows) == len(self.board):
+            return
+        self.board = rows
+        self.board_version += 1
+        delta = {"type": "delta", "version": self.board_version, "size": len(rows), "rows": changes}
+        self.publish(LEADERBOARD, delta, full=self._board_snapshot())
+
+    # --- answer ingest (bot/handlers/quiz.py) ---
+    def user_score(self, user_id: int, score_diff: int):
+        topic = f"user:{user_id}"
+        if not score_diff or not self.has(topic) or user_id not in self.user_scores:
+            return
+        self.user_scores[user_id] += score_diff
+        self.publish(topic, {"score": self.user_scores[user_id]})
+
+    def quiz_progress(self, chat_id: int, quiz: dict, finished: bool = False):
+        topic = f"chat:{chat_id}"
+        if not self.has(topic):
+            return
+        self.publish(topic, self._progress(quiz, finished))
+
+    @staticmethod
+    def _progress(quiz: dict, finished: bool = False) -> dict:
+        current = quiz.get("current_question", 0)
+        scores = quiz.get("scores", {})
+        return {
+            "question": min(current + 1, len(quiz.get("questions", ()))),
+            "total": len(quiz.get("questions", ())),
+            "answered": sum(1 for e in scores.values() if current in e["answered"]),
+            "players": len(scores),
+            "top": [{"name": e["name"], "correct": e["correct"]} for _, e in ranking(quiz)[:3]],
+            "finished": finished,
+        }
+
+    @staticmethod
+    def _plays_in(chat_id: int, user_id: int) -> bool:
+        from bot.session import active_quizzes
+
+        quiz = active_quizzes.get(chat_id)
+        return bool(quiz and quiz.get("active") and user_id in quiz.get("scores", {}))
+
+    # --- connections ---
+    async def _attach(self, sub: Subscriber, user_id: int | None):
+        from bot.session import active_quizzes
+
+        # Obunachi bo'lmaganda reyting yangilanmaydi, birinchi obunachi uchun qayta o'qiladi
+        stale_board = not self.has(LEADERBOARD)
+        for topic in sub.topics:
+            self.subscribers.setdefault(topic, set()).add(sub)
+
+        if LEADERBOARD in sub.topics:
+            if stale_board and self.leaderboard_loader:
+                try:
+                    self.board = await self.leaderboard_loader()
+                    self.board_version += 1
+                except Exception as e:
+                    # Eski holat yuboriladi, keyingi "rankings" hooki yangilaydi
+                    logger.warning("Live leaderboard o'qishda xato: %s", e)
+            sub.push(LEADERBOARD, _encode(self._board_snapshot()))
+        if user_id is not None:
+            topic = f"user:{user_id}"
+            if user_id not in self.user_scores:
+                score = await get_user_score(user_id)
+                if score is None:
+                    # Noma'lum foydalanuvchi (yoki DB xatosi): "me" ga obuna qilinmaydi
+                    sub.topics.discard(topic)
+                    self._unsubscribe(sub, topic)
+                else:
+                    self.user_scores[user_id] = score
+            if topic in sub.topics:
+                sub.push(topic, _encode({"score": self.user_scores[user_id]}))
+        for topic in sub.topics:
+            if topic.startswith("chat:"):
+                quiz = active_quizzes.get(int(topic[5:]))
+                if quiz and quiz.get("active"):
+                    sub.push(topic, _encode(self._progress(quiz)))
+
+    def _unsubscribe(self, sub: Subscriber, topic: str):
+        subs = self.subscribers.get(topic)
+        if subs is None:
+            return
+        subs.discard(sub)
+        if not subs:
+            del self.subscribers[topic]
+            if topic.startswith("user:"):
+                self.user_scores.pop(int(topic[5:]), None)
+
+    def _detach(self, sub: Subscriber):
+        for topic in sub.topics:
+            self._unsubscribe(sub, topic)
+
+    def close(self):
+        """Shutdown: barcha ulanishlarni yopadi"""
+        self.closed = True
+        for subs in self.subscribers.values():
+            for sub in subs:
+                sub.wakeup.set()
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        """
+        GET /api/live?topics=leaderboard,me,chat:<id>&uid=<user_id> (EventSource header qo'ya olmaydi).
+        chat:<id> faqat uid shu chatdagi faol quizda javob bergan bo'lsa beriladi.
+        """
+        if self.closed or self.connections >= LIVE_MAX_CONNECTIONS:
+            return web.json_response({"error": "Busy"}, status=503)
+
+        uid = request.query.get("uid") or request.headers.get("X-User-ID")
+        user_id = int(uid) if uid and uid.isdigit() else None
+        topics = set()
+        for topic in request.query.get("topics", LEADERBOARD).split(","):
+            topic = topic.strip()
+            if topic == LEADERBOARD:
+                topics.add(topic)
+            elif topic == "me" and user_id is not None:
+                topics.add(f"user:{user_id}")
+            elif topic.startswith("chat:") and topic[5:].lstrip("-").isdigit():
+                # Quiz jarayonida ishtirokchilar ismi bor: faqat shu quizda o'ynayotganlarga
+                if user_id is not None and self._plays_in(int(topic[5:]), user_id):
+                    topics.add(topic)
+        if not topics:
+            return web.json_response({"error": "No topics"}, status=400)
+        if f"user:{user_id}" not in topics:
+            user_id = None
+
+        resp = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        })
+        await resp.prepare(request)
+
+        sub = Subscriber(topics)
+        self.connections += 1
+        try:
+            await self._attach(sub, user_id)
+            while not self.closed:
+                try:
+                    await asyncio.wait_for(sub.wakeup.wait(), timeout=LIVE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    await resp.write(b": ping\n\n")
+                    continue
+                sub.wakeup.clear()
+                pending, sub.pending = sub.pending, {}
+                for topic, data in pending.items():
+                    # write() drain qiladi: sekin klientda shu yerda kutamiz, yangi xabarlar esa pending da birlashadi
+                    await resp.write(b"event: " + topic.encode() + b"\ndata: " + data + b"\n\n")
+        except ConnectionResetError:
+            pass
+        finally:
+            self._detach(sub)
+            self.connections -= 1
+        return resp
+
+
+live_hub = LiveHub()
+# database/db.py "answers" ni throttle qilib, rankings_cache tozalangach "rankings" ni chaqiradi
+subscribe("rankings", live_hub.refresh_leaderboard)
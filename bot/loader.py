@@ -1,6 +1,16 @@
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
-from .config import BOT_TOKEN
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from .config import BOT_TOKEN, TELEGRAM_API_URL
+from .pipeline import pipeline
+from .fsm_storage import DbStorage
+from .metrics import TelegramMetrics
 
-bot = Bot(token=BOT_TOKEN)
-dp = Dispatcher(storage=MemoryStorage())
+session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL)) if TELEGRAM_API_URL else None
+bot = Bot(token=BOT_TOKEN, session=session)
+# Bot API chaqiruvlari soni, vaqti va 429 lar (/metrics)
+bot.session.middleware(TelegramMetrics())
+# FSM state lives in the database (TTL + LRU front cache), so wizards survive restarts
+dp = Dispatcher(storage=DbStorage())
+# Registered after the built-in FSM middleware, so raw_state is available for classification
+dp.update.outer_middleware(pipeline)
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import os
+
+from aiogram.types import FSInputFile
+
+from bot.config import MEDIA_CACHE_CHAT_ID
+from bot.loader import bot
+from database import set_question_file_id
+
+logger = logging.getLogger(__name__)
+
+# Image source (URL / local path) -> Telegram file_id
+# Structure:
+# {
+#   "https://.../img.png": "AgACAgIAAxkBAAI...",
+# }
+file_ids: dict = {}
+
+# Sources currently being uploaded, so prewarm and send don't upload twice
+_uploads: dict = {}
+
+
+def _source(question: dict):
+    return question.get("image_url") or question.get("image")
+
+
+def _needs_upload(source: str) -> bool:
+    # Admin bot orqali yuklangan rasmlar image_url ga to'g'ridan-to'g'ri file_id bo'lib saqlanadi
+    return source.startswith(("http://", "https://")) or os.path.isfile(source)
+
+
+def _input_file(source: str):
+    if source.startswith(("http://", "https://")):
+        return source
+    return FSInputFile(source)
+
+
+def resolve(question: dict):
+    """Savol rasmi uchun yuboriladigan qiymat: file_id bo'lsa o'sha, bo'lmasa manba"""
+    if question.get("image_file_id"):
+        return question["image_file_id"]
+    source = _source(question)
+    if not source:
+        return None
+    if source in file_ids:
+        question["image_file_id"] = file_ids[source]
+        return file_ids[source]
+    if _needs_upload(source):
+        return _input_file(source)
+    return source
+
+
+async def _remember(question: dict, source: str, message):
+    if not message or not message.photo:
+        return
+    file_id = message.photo[-1].file_id
+    file_ids[source] = file_id
+    question["image_file_id"] = file_id
+    if question.get("id"):
+        try:
+            await set_question_file_id(question["id"], file_id)
+        except Exception as e:
+            logger.warning("file_id saqlashda xato: %s", e)
+
+
+async def send_question_image(chat_id: int, question: dict):
+    """Savol rasmini yuboradi va birinchi yuklashda file_id ni eslab qoladi"""
+    source = _source(question)
+    if not source:
+        return None
+
+    pending = _uploads.get(source)
+    if pending is not None:
+        # Prewarm hali tugamagan bo'lsa, qayta yuklamasdan kutamiz
+        try:
+            await asyncio.shield(pending)
+        except Exception:
+            pass
+
+    photo = resolve(question)
+    message = await bot.send_photo(chat_id=chat_id, photo=photo)
+    if not question.get("image_file_id") and _needs_upload(source):
+        await _remember(question, source, message)
+    return message
+
+
+async def _upload(question: dict, source: str):
+    try:
+        message = await bot.send_photo(chat_id=MEDIA_CACHE_CHAT_ID, photo=_input_file(source), disable_notification=True)
+        await _remember(question, source, message)
+    except Exception as e:
+        logger.warning("Rasmni oldindan yuklashda xato (%s): %s", source, e)
+    finally:
+        _uploads.pop(source, None)
+
+
+def prewarm(questions: list):
+    """
+    Keyingi savollarning rasmlarini MEDIA_CACHE_CHAT_ID ga oldindan yuklaydi.
+    Chaqiruvchini kutdirmaydi; MEDIA_CACHE_CHAT_ID sozlanmagan bo'lsa hech narsa qilmaydi.
+    """
+    if MEDIA_CACHE_CHAT_ID is None:
+        return
+    for q in questions:
+        source = _source(q)
+        if not source or q.get("image_file_id") or source in _uploads:
+            continue
+        if source in file_ids:
+            q["image_file_id"] = file_ids[source]
+            continue
+        if not _needs_upload(source):
+            continue
+        _uploads[source] = asyncio.create_task(_upload(q, source))
@@ -0,0 +1,331 @@
+import logging
+import time
+from bisect import bisect_left
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter
+from aiohttp import web
+
+from bot.config import METRICS_TOKEN
+
+logger = logging.getLogger(__name__)
+
+# Prometheus text formati (0.0.4). Tashqi kutubxonasiz: hisoblagichlar oddiy
+# obyekt atributlari, label kombinatsiyalari oldindan bog'lanadi (labels() bir
+# marta chaqirilib, natija saqlanadi), issiq yo'lda faqat += va bisect.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+DRIFT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+STREAM_BUCKETS = (1.0, 10.0, 60.0, 300.0, 900.0, 3600.0, 14400.0)
+
+registry: list = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _num(value: float) -> str:
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labelnames: tuple = ()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = labelnames
+        self.children: dict = {}
+        registry.append(self)
+
+    def labels(self, *values):
+        """Bir marta chaqirib natijani saqlang: qaytgan obyekt issiq yo'lda ishlatiladi"""
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = self._child()
+        return child
+
+    def _child(self):
+        raise NotImplementedError
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self.children.items():
+            lines += child.render(self.name, self.labelnames, values)
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+    def render(self, name, labelnames, values):
+        return [f"{name}{_label_str(labelnames, values)} {_num(self.value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _child(self):
+        return _CounterChild()
+
+
+class _GaugeChild:
+    __slots__ = ("value", "fn")
+
+    def __init__(self, fn=None):
+        self.value = 0
+        self.fn = fn
+
+    def set(self, value: float):
+        self.value = value
+
+    def render(self, name, labelnames, values):
+        value = self.fn() if self.fn is not None else self.value
+        return [f"{name}{_label_str(labelnames, values)} {_num(value)}"]
+
+
+class Gauge(_Metric):
+    """fn berilsa qiymat scrape paytida hisoblanadi (issiq yo'lga hech narsa qo'shilmaydi)"""
+    kind = "gauge"
+
+    def __init__(self, name: str, doc: str, labelnames: tuple = (), fn=None):
+        super().__init__(name, doc, labelnames)
+        self.fn = fn
+
+    def _child(self):
+        return _GaugeChild(self.fn)
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # oxirgisi +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def render(self, name, labelnames, values):
+        lines = []
+        total = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            le = 'le="%s"' % bound
+            lines.append(f"{name}_bucket{_label_str(labelnames, values, le)} {total}")
+        lines.append(f"{name}_sum{_label_str(labelnames, values)} {self.sum!r}")
+        lines.append(f"{name}_count{_label_str(labelnames, values)} {total}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, doc, labelnames)
+        self.buckets = buckets
+
+    def _child(self):
+        return _HistogramChild(self.buckets)
+
+
+def render() -> bytes:
+    lines = []
+    for metric in registry:
+        try:
+            lines += metric.render()
+        except Exception as e:
+            logger.warning("Metrika %s ni chiqarishda xato: %s", metric.name, e)
+    return ("\n".join(lines) + "\n").encode()
+
+
+# --- HTTP ---
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route, method and status.",
+                        ("route", "method", "status"))
+HTTP_SECONDS = Histogram("http_request_duration_seconds", "HTTP request handling time.", ("route", "method"))
+# SSE va chunked eksport ulanish davomida ochiq turadi: latency gistogrammasini buzmasligi uchun alohida
+HTTP_STREAM_SECONDS = Histogram("http_stream_duration_seconds", "Lifetime of streamed (SSE, chunked) responses.",
+                                ("route", "method"), buckets=STREAM_BUCKETS)
+
+
+class _RouteMetrics:
+    __slots__ = ("route", "method", "seconds", "stream_seconds", "statuses")
+
+    def __init__(self, route: str, method: str):
+        self.route = route
+        self.method = method
+        self.seconds = HTTP_SECONDS.labels(route, method)
+        self.stream_seconds = None  # faqat stream qaytargan routelar uchun yaratiladi
+        self.statuses: dict = {}  # status -> counter child
+
+    def observe(self, status: int, elapsed: float, stream: bool = False):
+        child = self.statuses.get(status)
+        if child is None:
+            child = self.statuses[status] = HTTP_REQUESTS.labels(self.route, self.method, status)
+        child.inc()
+        if not stream:
+            self.seconds.observe(elapsed)
+            return
+        if self.stream_seconds is None:
+            self.stream_seconds = HTTP_STREAM_SECONDS.labels(self.route, self.method)
+        self.stream_seconds.observe(elapsed)
+
+
+# aiohttp route -> _RouteMetrics; bind_routes() barcha routelar qo'shilgach to'ldiradi
+_routes: dict = {}
+_unmatched = None
+_STREAMED = "metrics.streamed"
+
+
+async def _on_response_prepare(request: web.Request, response: web.StreamResponse):
+    # Handler ichida prepare() qilingan javob (SSE, chunked eksport) middleware'ga
+    # yetguncha belgilanadi; oddiy web.Response handler qaytgandan keyin tayyorlanadi.
+    # Klient uzilib handler xato bilan chiqsa ham belgi saqlanadi
+    request[_STREAMED] = True
+
+
+def bind_routes(app: web.Application):
+    global _unmatched
+    for route in app.router.routes():
+        if route.method == "OPTIONS" or route.method == "*":
+            continue
+        resource = route.resource
+        path = resource.canonical if resource is not None else "unknown"
+        _routes[route] = _RouteMetrics(path, route.method)
+    _unmatched = _RouteMetrics("unmatched", "-")
+    app.on_response_prepare.append(_on_response_prepare)
+
+
+@web.middleware
+async def http_middleware(request: web.Request, handler):
+    started = time.perf_counter()
+    status = 500
+    try:
+        resp = await handler(request)
+        status = resp.status
+        return resp
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        metrics = _routes.get(request.match_info.route) or _unmatched
+        if metrics is not None:
+            metrics.observe(status, time.perf_counter() - started, _STREAMED in request)
+
+
+# --- Database (database/db.py) ---
+DB_QUERIES = Counter("db_queries_total", "Database helper calls by backend and operation.", ("backend", "op"))
+DB_SECONDS = Histogram("db_query_duration_seconds", "Database helper call time.", ("backend", "op"))
+DB_POOL_WAIT = Histogram("db_pool_wait_seconds", "Time waited for a PostgreSQL pool connection.",
+                         buckets=LAG_BUCKETS).labels()
+
+
+# --- Telegram Bot API ---
+TG_REQUESTS = Counter("telegram_requests_total", "Bot API calls by method.", ("method",))
+TG_SECONDS = Histogram("telegram_request_duration_seconds", "Bot API call time.", ("method",))
+TG_ERRORS = Counter("telegram_request_errors_total", "Failed Bot API calls by method and kind.",
+                    ("method", "kind"))
+
+
+class _MethodMetrics:
+    __slots__ = ("calls", "seconds", "retry_after", "network", "api")
+
+    def __init__(self, method: str):
+        self.calls = TG_REQUESTS.labels(method)
+        self.seconds = TG_SECONDS.labels(method)
+        self.retry_after = TG_ERRORS.labels(method, "retry_after")  # 429
+        self.network = TG_ERRORS.labels(method, "network")
+        self.api = TG_ERRORS.labels(method, "api")
+
+
+class TelegramMetrics(BaseRequestMiddleware):
+    """bot.session middleware: har Bot API chaqiruvi soni, vaqti va xatolari"""
+
+    def __init__(self):
+        self.methods: dict = {}  # TelegramMethod klassi -> _MethodMetrics
+
+    async def __call__(self, make_request, bot, method):
+        cls = type(method)
+        m = self.methods.get(cls)
+        if m is None:
+            m = self.methods[cls] = _MethodMetrics(cls.__name__)
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except TelegramRetryAfter:
+            m.retry_after.inc()
+            raise
+        except TelegramNetworkError:
+            m.network.inc()
+            raise
+        except Exception:
+            m.api.inc()
+            raise
+        finally:
+            m.calls.inc()
+            m.seconds.observe(time.perf_counter() - started)
+
+
+# --- Quiz engine ---
+_POLL_ANSWERS = Counter("quiz_poll_answers_total", "Poll answers received, by outcome.", ("result",))
+POLL_ANSWER_ACCEPTED = _POLL_ANSWERS.labels("accepted")
+POLL_ANSWER_DUPLICATE = _POLL_ANSWERS.labels("duplicate")
+POLL_ANSWER_UNKNOWN = _POLL_ANSWERS.labels("unknown_poll")
+
+PACING_DRIFT = Histogram(
+    "quiz_pacing_drift_seconds",
+    "How late a question was sent compared to the end of the previous question's window.",
+    buckets=DRIFT_BUCKETS,
+).labels()
+
+
+def _active_quizzes() -> int:
+    from bot.session import active_quizzes
+    return sum(1 for q in active_quizzes.values() if q.get("active"))
+
+
+def _pipeline(attr: str):
+    def read():
+        from bot.pipeline import pipeline
+        return getattr(pipeline, attr)
+    return read
+
+
+Gauge("quiz_active", "Quizzes currently running.", fn=_active_quizzes).labels()
+Gauge("bot_updates_running", "Updates being handled.", fn=_pipeline("total_running")).labels()
+Gauge("bot_updates_waiting", "Updates queued in the pipeline.", fn=_pipeline("total_waiting")).labels()
+
+
+# --- Event loop (bot/profiler.py LoopMonitor to'ldiradi) ---
+LOOP_LAG = Histogram("event_loop_lag_seconds", "Extra delay of a periodic event loop wakeup.",
+                     buckets=LAG_BUCKETS).labels()
+LOOP_LAG_LAST = Gauge("event_loop_lag_last_seconds", "Most recent event loop lag sample.").labels()
+
+LOOP_STALLS = Counter("event_loop_stalls_total", "Event loop stalls over LOOP_STALL_THRESHOLD.").labels()
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    """GET /metrics; METRICS_TOKEN berilgan bo'lsa Authorization: Bearer <token> kerak"""
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return web.Response(status=401)
+    return web.Response(body=render(), headers={
+        "Content-Type": "text/plain; version=0.0.4; charset=utf-8",
+        "Cache-Control": "no-store",
+    })
@@ -0,0 +1,20 @@
+import asyncio
+
+# Per-chat send locks.
+# Everything a quiz sends into one chat (image, poll, results) goes through the
+# chat's lock, so messages arrive in order without sleeping between them.
+_chat_locks: dict = {}
+
+
+def chat_lock(chat_id: int) -> asyncio.Lock:
+    lock = _chat_locks.get(chat_id)
+    if lock is None:
+        lock = _chat_locks[chat_id] = asyncio.Lock()
+    return lock
+
+
+def release_chat(chat_id: int):
+    """Quiz tugagach lockni tashlab yuborish (xotira o'smasligi uchun)"""
+    lock = _chat_locks.get(chat_id)
+    if lock is not None and not lock.locked():
+        _chat_locks.pop(chat_id, None)
@@ -0,0 +1,42 @@
+import base64
+import json
+
+from bot.config import MAX_PAGE_SIZE
+
+
+def encode_cursor(*key) -> str:
+    """Oxirgi qatorning tartib kaliti -> URL uchun xavfsiz, klientga shaffof bo'lmagan satr"""
+    raw = json.dumps(key, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str | None, *types) -> tuple | None:
+    """types: kalit elementlarining turlari (masalan int, int). Buzilgan cursor -> ValueError"""
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(key, list) or len(key) != len(types) or \
+            not all(isinstance(v, t) and not isinstance(v, bool) for v, t in zip(key, types)):
+        raise ValueError("Invalid cursor")
+    return tuple(key)
+
+
+def page_limit(query, default: int) -> int:
+    value = query.get("limit", "")
+    if not value.isdigit():
+        return default
+    return max(1, min(int(value), MAX_PAGE_SIZE))
+
+
+def page(rows: list, limit: int, key) -> tuple:
+    """
+    rows limit+1 ta so'ralgan bo'ladi: ortiqchasi keyingi sahifa borligini bildiradi.
+    -> (shu sahifa qatorlari, keyingi cursor yoki None)
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from bot.config import PIPELINE_CONCURRENCY, PIPELINE_LIMITS, PIPELINE_MAX_WAITING, PIPELINE_MAX_DEPTH
+
+logger = logging.getLogger(__name__)
+
+# Priority order: earlier classes are granted free slots first
+CLASSES = ("poll", "command", "admin")
+# Classes that are also dropped when the whole queue is over PIPELINE_MAX_WAITING;
+# every class is dropped when its own queue reaches PIPELINE_MAX_DEPTH
+DROPPABLE = {"command"}
+
+
+def classify(update: Update, data: Dict[str, Any]) -> str:
+    if update.poll_answer is not None:
+        return "poll"
+    # FSM middleware runs before us, so raw_state is already known
+    if data.get("raw_state"):
+        return "admin"
+    return "command"
+
+
+class UpdatePipeline(BaseMiddleware):
+    """
+    Dispatcher va handlerlar orasidagi navbat.
+    Umumiy va har bir sinf uchun alohida parallel limit, navbat chuqurligi limiti
+    (umumiy va har sinf uchun), navbatda kutish vaqti statistikasi.
+    Uzoq ishlar (quiz sikli) handler ichida emas, alohida task'da ketadi.
+    """
+
+    def __init__(self, concurrency: int, limits: dict, max_waiting: int, max_depth: dict):
+        self.concurrency = concurrency
+        self.limits = limits
+        self.max_waiting = max_waiting
+        self.max_depth = max_depth
+        self.running = {c: 0 for c in CLASSES}
+        self.waiting = {c: deque() for c in CLASSES}
+        self.stats = {
+            c: {"handled": 0, "dropped": 0, "wait_total": 0.0, "wait_max": 0.0, "recent": deque(maxlen=1000)}
+            for c in CLASSES
+        }
+
+    @property
+    def total_running(self) -> int:
+        return sum(self.running.values())
+
+    @property
+    def total_waiting(self) -> int:
+        return sum(len(q) for q in self.waiting.values())
+
+    def _has_room(self, cls: str) -> bool:
+        return self.total_running < self.concurrency and self.running[cls] < self.limits.get(cls, self.concurrency)
+
+    def _grant_waiting(self):
+        for cls in CLASSES:
+            queue = self.waiting[cls]
+            while queue and self._has_room(cls):
+                fut = queue.popleft()
+                if fut.done():
+                    continue
+                self.running[cls] += 1
+                fut.set_result(True)
+
+    async def _acquire(self, cls: str) -> bool:
+        higher_waiting = any(self.waiting[c] for c in CLASSES[:CLASSES.index(cls) + 1])
+        if not higher_waiting and self._has_room(cls):
+            self.running[cls] += 1
+            return True
+
+        if len(self.waiting[cls]) >= self.max_depth.get(cls, self.max_waiting):
+            return False
+        if cls in DROPPABLE and self.total_waiting >= self.max_waiting:
+            return False
+
+        fut = asyncio.get_running_loop().create_future()
+        self.waiting[cls].append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Slot berilgan edi, lekin task bekor qilindi
+                self._release(cls)
+            else:
+                try:
+                    self.waiting[cls].remove(fut)
+                except ValueError:
+                    pass
+            raise
+        return True
+
+    def _release(self, cls: str):
+        self.running[cls] -= 1
+        self._grant_waiting()
+
+    def _record(self, cls: str, waited: float):
+        s = self.stats[cls]
+        s["handled"] += 1
+        s["wait_total"] += waited
+        s["recent"].append(waited)
+        if waited > s["wait_max"]:
+            s["wait_max"] = waited
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        cls = classify(event, data)
+        enqueued = time.monotonic()
+        if not await self._acquire(cls):
+            self.stats[cls]["dropped"] += 1
+            logger.warning("Pipeline to'lgan (%s kutmoqda): %s update tashlab yuborildi", self.total_waiting, cls)
+            return None
+
+        self._record(cls, time.monotonic() - enqueued)
+        try:
+            return await handler(event, data)
+        finally:
+            self._release(cls)
+
+    def snapshot(self) -> dict:
+        """Navbat holati va kutish vaqti (ms) statistikasi"""
+        res = {"running": dict(self.running), "waiting": {c: len(q) for c, q in self.waiting.items()}, "classes": {}}
+        for cls, s in self.stats.items():
+            recent = sorted(s["recent"])
+            def pct(p):
+                return round(recent[min(len(recent) - 1, int(len(recent) * p))] * 1000, 2) if recent else 0.0
+            res["classes"][cls] = {
+                "handled": s["handled"],
+                "dropped": s["dropped"],
+                "wait_avg_ms": round(s["wait_total"] / s["handled"] * 1000, 2) if s["handled"] else 0.0,
+                "wait_p50_ms": pct(0.5),
+                "wait_p99_ms": pct(0.99),
+                "wait_max_ms": round(s["wait_max"] * 1000, 2),
+            }
+        return res
+
+
+pipeline = UpdatePipeline(PIPELINE_CONCURRENCY, PIPELINE_LIMITS, PIPELINE_MAX_WAITING, PIPELINE_MAX_DEPTH)
@@ -0,0 +1,197 @@
+import asyncio
+import cProfile
+import io
+import logging
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+
+from aiohttp import web
+
+from bot.config import LOOP_STALL_THRESHOLD, PROFILE_MAX_SECONDS
+from bot.metrics import LOOP_LAG, LOOP_LAG_LAST, LOOP_STALLS
+
+logger = logging.getLogger(__name__)
+
+STACK_LIMIT = 30  # stall stekidan saqlanadigan kadrlar
+SAMPLE_INTERVAL = 0.005  # statistik profil: 200 namuna/s
+
+
+def _task_name(task) -> str | None:
+    if task is None:
+        return None
+    coro = task.get_coro()
+    return f"{task.get_name()} ({getattr(coro, '__qualname__', coro)})"
+
+
+class LoopMonitor:
+    """
+    Loop ichidagi task har `interval` da uyg'onib kechikishni o'lchaydi (/metrics).
+    Alohida watchdog thread loop uyg'onmay qolganini ko'rsa, o'sha paytdagi loop
+    thread stekini oladi: bu aynan loop'ni bloklab turgan kod. Loop qaytgach
+    stall (kechikish, stek, task) `stalls` ga yoziladi va log qilinadi.
+    """
+
+    def __init__(self, interval: float = 0.05, threshold: float = LOOP_STALL_THRESHOLD, keep: int = 50):
+        self.interval = interval
+        self.threshold = threshold
+        self.stalls: deque = deque(maxlen=keep)
+        self.loop = None
+        self.thread_id = None
+        self.last_tick = 0.0
+        self.lag = 0.0  # eksponensial o'rtacha, bot/ratelimit.py admission uchun
+        self._captured = None  # (last_tick, stack, task) — watchdog yozadi
+        self._task = None
+        self._stop = threading.Event()
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.thread_id = threading.get_ident()
+        self.last_tick = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._tick())
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _tick(self):
+        while True:
+            self.last_tick = tick = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - tick - self.interval)
+            LOOP_LAG.observe(lag)
+            LOOP_LAG_LAST.set(lag)
+            self.lag += (lag - self.lag) * 0.2
+            if lag >= self.threshold:
+                self._record(tick, lag)
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            tick = self.last_tick
+            captured = self._captured
+            if captured is not None and captured[0] == tick:
+                continue  # shu stall allaqachon olingan
+            if time.monotonic() - tick < self.interval + self.threshold:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = [f"{f.filename}:{f.lineno} {f.name}" for f in traceback.extract_stack(frame)[-STACK_LIMIT:]]
+            try:
+                task = asyncio.current_task(self.loop)
+            except RuntimeError:
+                task = None
+            self._captured = (tick, stack, _task_name(task))
+
+    def _record(self, tick: float, lag: float):
+        captured, self._captured = self._captured, None
+        stack, task = (captured[1], captured[2]) if captured and captured[0] == tick else (None, None)
+        LOOP_STALLS.inc()
+        self.stalls.append({
+            "at": time.time(),
+            "lag_ms": round(lag * 1000, 1),
+            "task": task,
+            "stack": stack,
+        })
+        where = stack[-1] if stack else "?"
+        logger.warning(f"🐢 Event loop {round(lag * 1000)} ms bloklandi: {task or '-'} @ {where}")
+
+    def snapshot(self) -> list:
+        return list(reversed(self.stalls))
+
+
+loop_monitor = LoopMonitor()
+
+
+# --- on-demand profiling ---
+_profiling = asyncio.Lock()
+
+
+def _sample_stacks(thread_id: int, seconds: float, interval: float = SAMPLE_INTERVAL) -> Counter:
+    """Executor thread'da: loop thread stekini davriy o'qiydi (folded: "a;b;c" -> soni)"""
+    counts = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        if stack:
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return counts
+
+
+async def _sample_profile(seconds: float) -> bytes:
+    loop = asyncio.get_running_loop()
+    counts = await loop.run_in_executor(None, _sample_stacks, threading.get_ident(), seconds)
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common()).encode()
+
+
+async def _cprofile(seconds: float, raw: bool) -> bytes:
+    # cProfile faqat chaqirgan thread'ni, ya'ni loop'ni o'lchaydi; overhead sezilarli
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        prof.disable()
+    if raw:
+        # pstats.Stats(fayl) / snakeviz o'qiy oladigan format (dump_stats bilan bir xil)
+        prof.create_stats()
+        return marshal.dumps(prof.stats)
+    out = io.StringIO()
+    pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(80)
+    return out.getvalue().encode()
+
+
+async def handle_profile(request: web.Request) -> web.Response:
+    """
+    GET /api/admin/profile?seconds=10&mode=sample|cprofile&format=text|pstats
+    sample: loop thread steklari (folded, flamegraph.pl / speedscope uchun), overhead kam.
+    cprofile: funksiyalar bo'yicha vaqt, text jadval yoki pstats fayli.
+    Bir vaqtda bittasi; javob profil tugagach qaytadi.
+    """
+    seconds = request.query.get("seconds", "10")
+    if not seconds.isdigit() or not 1 <= int(seconds) <= PROFILE_MAX_SECONDS:
+        return web.json_response({"error": f"seconds: 1-{PROFILE_MAX_SECONDS}"}, status=400)
+    mode = request.query.get("mode", "sample")
+    if mode not in ("sample", "cprofile"):
+        return web.json_response({"error": "mode: sample | cprofile"}, status=400)
+    if _profiling.locked():
+        return web.json_response({"error": "Profil allaqachon yozilmoqda"}, status=409)
+
+    raw = mode == "cprofile" and request.query.get("format") == "pstats"
+    async with _profiling:
+        logger.info(f"🔬 Profil boshlandi: {mode}, {seconds} s")
+        try:
+            body = await (_sample_profile(int(seconds)) if mode == "sample" else _cprofile(int(seconds), raw))
+        except ValueError as e:
+            # Boshqa profiler (masalan, tashqi) allaqachon ulangan
+            return web.json_response({"error": str(e)}, status=409)
+
+    ext = "prof" if raw else ("folded" if mode == "sample" else "txt")
+    name = f"profile-{time.strftime('%Y%m%d-%H%M%S')}.{ext}"
+    return web.Response(body=body, headers={
+        "Content-Type": "application/octet-stream" if raw else "text/plain; charset=utf-8",
+        "Content-Disposition": f'attachment; filename="{name}"',
+        "Cache-Control": "no-store",
+    })
+
+
+async def handle_stalls(request: web.Request) -> web.Response:
+    """GET /api/admin/loop/stalls: oxirgi stall'lar, yangisi birinchi"""
+    return web.json_response({
+        "threshold_ms": round(loop_monitor.threshold * 1000),
+        "stalls": loop_monitor.snapshot(),
+    })
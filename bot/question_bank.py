@@ -0,0 +1,181 @@
+import logging
+import random
+import time
+import zlib
+from array import array
+
+from database import get_question_ids, get_questions_by_ids, get_seen_bits, save_seen_bits, get_question_difficulty
+
+logger = logging.getLogger(__name__)
+
+ALL_SUBJECTS = "*"
+INDEX_TTL = 60  # seconds
+DIFFICULTY_TTL = 300  # seconds
+
+# Savollar indeksi: subject (yoki "*") -> (yuklangan vaqt, saralangan id lar)
+_index: dict = {}
+
+# Qiyinlik bo'yicha guruhlar: subject (yoki "*") -> (yuklangan vaqt, {"easy": array, "medium": array, "hard": array})
+_buckets: dict = {}
+
+DIFFICULTIES = ("easy", "medium", "hard")
+# Kamida shuncha javob bo'lmasa savol "medium" hisoblanadi
+MIN_ANSWERS = 5
+EASY_RATE = 0.75
+HARD_RATE = 0.4
+
+# /quiz parametri -> qiyinlik ulushlari
+DIFFICULTY_MIXES = {
+    "easy": {"easy": 0.6, "medium": 0.3, "hard": 0.1},
+    "medium": {"easy": 0.2, "medium": 0.6, "hard": 0.2},
+    "hard": {"easy": 0.1, "medium": 0.3, "hard": 0.6},
+    "mix": {"easy": 1 / 3, "medium": 1 / 3, "hard": 1 / 3},
+}
+DIFFICULTY_ALIASES = {"oson": "easy", "orta": "medium", "qiyin": "hard", "aralash": "mix"}
+
+
+def invalidate_index(subject: str | None = None):
+    """Savol qo'shilgan/o'chirilganda chaqiriladi"""
+    if subject is None:
+        _index.clear()
+        _buckets.clear()
+    else:
+        for cache in (_index, _buckets):
+            cache.pop(subject, None)
+            cache.pop(ALL_SUBJECTS, None)
+
+
+async def question_ids(subject: str | None) -> array:
+    key = subject or ALL_SUBJECTS
+    cached = _index.get(key)
+    if cached and time.monotonic() - cached[0] < INDEX_TTL:
+        return cached[1]
+    ids = array('l', await get_question_ids(subject))
+    _index[key] = (time.monotonic(), ids)
+    return ids
+
+
+def parse_difficulty(token: str | None) -> dict | None:
+    if not token:
+        return None
+    token = DIFFICULTY_ALIASES.get(token.lower(), token.lower())
+    return DIFFICULTY_MIXES.get(token)
+
+
+def difficulty_of(answered: int, correct: int) -> str:
+    if answered < MIN_ANSWERS:
+        return "medium"
+    rate = correct / answered
+    if rate >= EASY_RATE:
+        return "easy"
+    if rate < HARD_RATE:
+        return "hard"
+    return "medium"
+
+
+async def difficulty_buckets(subject: str | None) -> dict:
+    """question_stats hisoblagichlaridan oldindan hisoblangan guruhlar"""
+    key = subject or ALL_SUBJECTS
+    cached = _buckets.get(key)
+    if cached and time.monotonic() - cached[0] < DIFFICULTY_TTL:
+        return cached[1]
+    buckets = {d: array('l') for d in DIFFICULTIES}
+    for row in await get_question_difficulty(subject):
+        buckets[difficulty_of(row['answered'], row['correct'])].append(row['id'])
+    _buckets[key] = (time.monotonic(), buckets)
+    return buckets
+
+
+class SeenSet:
+    """Savol id lari bo'yicha bitmap. Bazada zlib bilan siqilgan holda saqlanadi"""
+
+    def __init__(self, bits: bytearray | None = None):
+        self.bits = bits if bits is not None else bytearray()
+
+    @classmethod
+    def load(cls, blob: bytes | None) -> "SeenSet":
+        if not blob:
+            return cls()
+        try:
+            return cls(bytearray(zlib.decompress(blob)))
+        except zlib.error:
+            logger.warning("Buzilgan seen bitmap, yangidan boshlanadi")
+            return cls()
+
+    def dump(self) -> bytes:
+        return zlib.compress(bytes(self.bits), 9)
+
+    def __contains__(self, qid: int) -> bool:
+        byte = qid >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] & (1 << (qid & 7)))
+
+    def add(self, qid: int):
+        byte = qid >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(b"\0" * (byte + 1 - len(self.bits)))
+        self.bits[byte] |= 1 << (qid & 7)
+
+    def clear(self):
+        self.bits = bytearray()
+
+
+def _sample_unseen(ids: array, seen: SeenSet, limit: int, exclude: set) -> list:
+    """
+    Ko'rilmagan id lardan tasodifiy `limit` tasini tanlaydi.
+    Odatda O(limit) urinish; bank deyarli tugagan bo'lsa ko'rilmaganlar ro'yxatiga o'tadi.
+    """
+    picked = []
+    chosen = set(exclude)
+    attempts = limit * 8
+    while len(picked) < limit and attempts > 0:
+        attempts -= 1
+        qid = ids[random.randrange(len(ids))]
+        if qid in chosen or qid in seen:
+            continue
+        chosen.add(qid)
+        picked.append(qid)
+
+    if len(picked) < limit:
+        rest = [qid for qid in ids if qid not in chosen and qid not in seen]
+        picked.extend(random.sample(rest, min(limit - len(picked), len(rest))))
+    return picked
+
+
+async def _sample_mix(subject: str | None, seen: SeenSet, limit: int, mix: dict) -> list:
+    buckets = await difficulty_buckets(subject)
+    picked = []
+    for difficulty, share in mix.items():
+        want = min(round(limit * share), limit - len(picked))
+        ids = buckets.get(difficulty)
+        if want > 0 and ids:
+            picked += _sample_unseen(ids, seen, want, set(picked))
+    return picked
+
+
+async def pick_questions(chat_id: int, subject: str | None, limit: int, mix: dict | None = None) -> list:
+    """
+    Chatda hali berilmagan savollarni tanlaydi va ularni ko'rilgan deb belgilaydi.
+    mix berilsa ({"easy": 0.3, ...}) savollar qiyinlik guruhlaridan shu ulushda olinadi,
+    yetmagani umumiy bankdan to'ldiriladi.
+    Fan bo'yicha savollar tugasa, bitmap tozalanadi va aylanish qaytadan boshlanadi.
+    """
+    ids = await question_ids(subject)
+    if not ids:
+        return []
+    key = subject or ALL_SUBJECTS
+    seen = SeenSet.load(await get_seen_bits(chat_id, key))
+
+    picked = await _sample_mix(subject, seen, limit, mix) if mix else []
+    picked += _sample_unseen(ids, seen, limit - len(picked), set(picked))
+    if len(picked) < limit:
+        logger.info(f"♻️ Chat {chat_id}: '{key}' savollari tugadi, qaytadan boshlanadi")
+        seen.clear()
+        picked += _sample_unseen(ids, seen, limit - len(picked), set(picked))
+
+    for qid in picked:
+        seen.add(qid)
+    await save_seen_bits(chat_id, key, seen.dump())
+
+    questions = await get_questions_by_ids(picked)
+    random.shuffle(questions)
+    return questions
@@ -0,0 +1,187 @@
+import logging
+import math
+import time
+
+from aiohttp import web
+
+from bot.config import (
+    RATE_LIMITS, RATE_CLIENT_IP, RATE_IP_SCALE, RATE_MAX_BUCKETS,
+    ADMISSION_MAX_LAG, ADMISSION_MAX_POOL_WAIT, PIPELINE_MAX_WAITING, WEBHOOK_PATH
+)
+from bot.metrics import Counter
+from bot.pipeline import pipeline
+from bot.profiler import loop_monitor
+from database import pool_pressure
+
+logger = logging.getLogger(__name__)
+
+# Route sinflari. None: cheklanmaydi va tashlab yuborilmaydi (health, metrics,
+# Telegram webhook, xotiradagi statik fayllar)
+EXACT = {
+    "/api/exchange/request": "write",
+    "/api/user/stats": "user",
+    "/api/bootstrap": "user",
+    "/health/live": None,
+    "/health/ready": None,
+    "/metrics": None,
+    WEBHOOK_PATH: None,
+}
+# Yuklama oshganda 503 oladigan sinflar; admin panel ishlayveradi
+SHEDDABLE = {"user", "write", "read"}
+
+SWEEP_INTERVAL = 60  # seconds
+FULL_SWEEP_INTERVAL = 1  # bucketlar to'lganda sweep ko'pi bilan shuncha soniyada bir marta
+
+REJECTED = Counter("http_rejected_total", "API requests turned away by route class and reason.", ("class", "reason"))
+
+
+def route_class(path: str) -> str | None:
+    if path in EXACT:
+        return EXACT[path]
+    if path.startswith("/api/admin"):
+        return "admin"
+    if path.startswith("/api/"):
+        return "read"
+    return None
+
+
+def client_ip(request: web.Request) -> str | None:
+    """RATE_CLIENT_IP sozlanmagan bo'lsa None: router ortida request.remote hamma uchun bir xil"""
+    if RATE_CLIENT_IP == "forwarded":
+        # Oxirgi hop ni ishonchli proxy qo'shgan; oldingilarini klient yozishi mumkin
+        forwarded = request.headers.get("X-Forwarded-For")
+        if forwarded:
+            return forwarded.rsplit(",", 1)[-1].strip()
+        return None
+    if RATE_CLIENT_IP == "remote":
+        return request.remote
+    return None
+
+
+def client_keys(request: web.Request) -> list:
+    """
+    [(kalit, limit ko'paytmasi)]. X-User-ID ni klient o'zi yozadi, shuning uchun
+    IP ma'lum bo'lsa foydalanuvchi kaliti IP ga bog'lanadi va IP ning umumiy bucketi
+    ham tekshiriladi. IP noma'lum bo'lsa faqat X-User-ID bo'yicha; anonim so'rov cheklanmaydi.
+    """
+    ip = client_ip(request)
+    uid = request.headers.get("X-User-ID")
+    if not (uid and uid.isdigit()):
+        uid = None
+    if ip is None:
+        return [(f"uid:{uid}", 1)] if uid else []
+    if uid:
+        return [(ip, RATE_IP_SCALE), (f"{ip}:{uid}", 1)]
+    return [(f"{ip}:-", 1)]
+
+
+class RateLimiter:
+    """
+    Har (IP + foydalanuvchi, route sinfi) uchun xotiradagi token bucket: sekundiga `rate`
+    token qo'shiladi, `burst` tagacha yig'iladi; token bo'lmasa 429 + Retry-After.
+    IP ma'lum bo'lsa (RATE_CLIENT_IP) uning umumiy bucketi (RATE_IP_SCALE marta katta)
+    ham tekshiriladi; bucketlar soni RATE_MAX_BUCKETS bilan cheklangan, to'lsa
+    yangi klientlar 503 oladi.
+    Admission: event loop kechikishi, pool kutish vaqti yoki update navbati
+    chegaradan oshsa, SHEDDABLE sinflar darhol 503 oladi; shu bilan quiz
+    (poll javoblari, savol yuborish) o'z vaqt byudjetini saqlaydi.
+    """
+
+    def __init__(self, limits: dict = RATE_LIMITS, max_buckets: int = RATE_MAX_BUCKETS):
+        self.limits = limits
+        self.max_buckets = max_buckets
+        self.buckets = {cls: {} for cls in limits}  # cls -> key -> [tokens, updated]
+        self.size = 0  # barcha sinflardagi bucketlar soni
+        self.classes: dict = {}  # aiohttp route -> cls (bind_routes)
+        self.rejected = {
+            (cls, reason): REJECTED.labels(cls, reason)
+            for cls in limits for reason in ("rate_limit", "loop_lag", "pool_wait", "updates", "buckets")
+        }
+        self.next_sweep = time.monotonic() + SWEEP_INTERVAL
+        self.last_full_sweep = 0.0
+
+    def bind_routes(self, app: web.Application):
+        for route in app.router.routes():
+            resource = route.resource
+            if resource is not None:
+                self.classes[route] = route_class(resource.canonical)
+
+    @staticmethod
+    def overload() -> str | None:
+        if loop_monitor.lag > ADMISSION_MAX_LAG:
+            return "loop_lag"
+        if pool_pressure() > ADMISSION_MAX_POOL_WAIT:
+            return "pool_wait"
+        if pipeline.total_waiting > PIPELINE_MAX_WAITING // 2:
+            return "updates"
+        return None
+
+    def _make_room(self, now: float) -> bool:
+        if now - self.last_full_sweep >= FULL_SWEEP_INTERVAL:
+            self.last_full_sweep = now
+            self.sweep(now)
+        return self.size < self.max_buckets
+
+    def take(self, cls: str, key: str, now: float, scale: float = 1) -> float | None:
+        """
+        Token oladi; 0 = ruxsat, aks holda keyingi token gacha soniyalar.
+        None: bucketlar soni max_buckets ga yetgan, yangi kalit uchun joy yo'q.
+        """
+        rate, burst = self.limits[cls]
+        rate, burst = rate * scale, burst * scale
+        buckets = self.buckets[cls]
+        bucket = buckets.get(key)
+        if bucket is None:
+            if self.size >= self.max_buckets and not self._make_room(now):
+                return None
+            buckets[key] = [burst - 1, now]
+            self.size += 1
+            return 0.0
+        tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return 0.0
+        bucket[0] = tokens
+        return (1 - tokens) / rate
+
+    def sweep(self, now: float):
+        """To'lib bo'lgan bucketlar o'chiriladi: ular yangisidan farq qilmaydi"""
+        self.next_sweep = now + SWEEP_INTERVAL
+        for cls, buckets in self.buckets.items():
+            rate, burst = self.limits[cls]
+            idle = burst / rate  # IP bucketida ham shu: burst va rate bir xil ko'paytiriladi
+            for key in [k for k, (_, updated) in buckets.items() if now - updated >= idle]:
+                del buckets[key]
+                self.size -= 1
+
+    @web.middleware
+    async def middleware(self, request: web.Request, handler):
+        cls = self.classes.get(request.match_info.route)
+        if cls is None or request.method == "OPTIONS":
+            return await handler(request)
+
+        if cls in SHEDDABLE:
+            reason = self.overload()
+            if reason is not None:
+                self.rejected[(cls, reason)].inc()
+                return web.json_response({"error": "Server band, birozdan keyin urinib ko'ring"},
+                                         status=503, headers={"Retry-After": "1"})
+
+        now = time.monotonic()
+        if now >= self.next_sweep:
+            self.sweep(now)
+        for key, scale in client_keys(request):
+            wait = self.take(cls, key, now, scale)
+            if wait is None:
+                self.rejected[(cls, "buckets")].inc()
+                return web.json_response({"error": "Server band, birozdan keyin urinib ko'ring"},
+                                         status=503, headers={"Retry-After": "1"})
+            if wait:
+                self.rejected[(cls, "rate_limit")].inc()
+                return web.json_response({"error": "Juda ko'p so'rov"}, status=429,
+                                         headers={"Retry-After": str(math.ceil(wait))})
+        return await handler(request)
+
+
+rate_limiter = RateLimiter()
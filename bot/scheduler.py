@@ -0,0 +1,83 @@
+import logging
+import time
+from datetime import datetime, timezone
+
+from apscheduler.jobstores.base import JobLookupError
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+
+from bot.config import (
+    SCHEDULER_ENABLED, SCHEDULER_TIMEZONE, WEEKLY_RATING_DAY, WEEKLY_RATING_HOUR,
+    COMPACTION_HOUR, TOURNAMENT_PREPARE_LEAD
+)
+from bot.tournament import run_tournament
+from database import compact_rollups, get_scheduled_tournaments, set_tournament_status
+
+logger = logging.getLogger(__name__)
+
+# Takroriy ishlar kodda, turnirlar `tournaments` jadvalida saqlanadi va har
+# ishga tushishda qayta rejalashtiriladi, shuning uchun restartda yo'qolmaydi
+scheduler = AsyncIOScheduler(timezone=SCHEDULER_TIMEZONE)
+
+# Shundan ko'proq kechikkan turnir boshlanmaydi ('missed')
+MISFIRE_GRACE = 300  # seconds
+
+
+async def weekly_rating():
+    # bot.handlers bu modulni import qiladi, shuning uchun ichkarida
+    from bot.handlers.user import send_weekly_rating
+    await send_weekly_rating()
+
+
+async def compact():
+    started = time.monotonic()
+    await compact_rollups(time.time())
+    logger.info(f"🧹 Compaction tugadi ({round((time.monotonic() - started) * 1000)} ms)")
+
+
+def schedule_tournament(tournament_id: int, start_at: float):
+    # Tayyorgarlik (savollar, sessiyalar, e'lon) start_at dan oldin boshlanadi
+    run_at = datetime.fromtimestamp(max(time.time(), start_at - TOURNAMENT_PREPARE_LEAD), tz=timezone.utc)
+    scheduler.add_job(
+        run_tournament, DateTrigger(run_date=run_at), args=[tournament_id],
+        id=f"tournament:{tournament_id}", replace_existing=True, misfire_grace_time=MISFIRE_GRACE
+    )
+
+
+def unschedule_tournament(tournament_id: int):
+    try:
+        scheduler.remove_job(f"tournament:{tournament_id}")
+    except JobLookupError:
+        pass
+
+
+async def start_scheduler():
+    if not SCHEDULER_ENABLED:
+        logger.info("Scheduler o'chirilgan (SCHEDULER_ENABLED=0)")
+        return
+
+    scheduler.add_job(
+        weekly_rating, CronTrigger(day_of_week=WEEKLY_RATING_DAY, hour=WEEKLY_RATING_HOUR, minute=0),
+        id="weekly_rating", replace_existing=True, coalesce=True, misfire_grace_time=3600
+    )
+    scheduler.add_job(
+        compact, CronTrigger(hour=COMPACTION_HOUR, minute=0),
+        id="compaction", replace_existing=True, coalesce=True, misfire_grace_time=3600
+    )
+
+    now = time.time()
+    for t in await get_scheduled_tournaments():
+        if t['start_at'] < now - MISFIRE_GRACE:
+            await set_tournament_status(t['id'], 'missed')
+            logger.warning(f"🏆 Turnir #{t['id']} o'tkazib yuborildi (bot o'chiq edi)")
+            continue
+        schedule_tournament(t['id'], t['start_at'])
+
+    scheduler.start()
+    logger.info(f"⏰ Scheduler ishga tushdi: {len(scheduler.get_jobs())} ta ish")
+
+
+def stop_scheduler():
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
@@ -0,0 +1,78 @@
+import html
+import time
+
+# Live per-quiz scoreboard, kept in active_quizzes[chat_id]["scores"].
+# Structure:
+# {
+#   user_id: {
+#       "name": str,
+#       "correct": int,
+#       "answered": set,        # question numbers already counted
+#       "latency": float        # sum of answer latencies, seconds
+#   }
+# }
+
+
+def display_name(user) -> str:
+    if user.username:
+        return f"@{user.username}"
+    return user.first_name or str(user.id)
+
+
+def mark_question_sent(quiz: dict):
+    quiz["question_sent_at"] = time.monotonic()
+
+
+def record_answer(quiz: dict, user, question_num: int, is_correct: bool) -> bool:
+    """Javobni hisobga oladi. Shu savolga avval javob hisoblangan bo'lsa False"""
+    scores = quiz.setdefault("scores", {})
+    entry = scores.get(user.id)
+    if entry is None:
+        entry = scores[user.id] = {"name": display_name(user), "correct": 0, "answered": set(), "latency": 0.0}
+    else:
+        entry["name"] = display_name(user)
+
+    if question_num in entry["answered"]:
+        return False
+    entry["answered"].add(question_num)
+    if is_correct:
+        entry["correct"] += 1
+    sent_at = quiz.get("question_sent_at")
+    if sent_at is not None and question_num == quiz.get("current_question"):
+        entry["latency"] += time.monotonic() - sent_at
+    return True
+
+
+def ranking(quiz: dict) -> list:
+    """(user_id, entry) ro'yxati: ko'p to'g'ri javob, teng bo'lsa tezroq javob bergan oldinda"""
+    def key(item):
+        entry = item[1]
+        answered = len(entry["answered"]) or 1
+        return (-entry["correct"], entry["latency"] / answered)
+    return sorted(quiz.get("scores", {}).items(), key=key)
+
+
+def _medal(i: int) -> str:
+    return "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else "▫️"
+
+
+# Matnlar parse_mode="HTML" bilan ketadi: ismlar escape qilinadi ("<", "&" xabarni buzmasin)
+def render_results(quiz: dict) -> str | None:
+    rows = ranking(quiz)
+    if not rows:
+        return None
+    text = "🏆 <b>Natijalar:</b>\n\n"
+    for i, (uid, entry) in enumerate(rows, 1):
+        text += f"{_medal(i)} {i}. {html.escape(entry['name'])} — {entry['correct']} 🪙tanga\n"
+    return text
+
+
+def render_standings(quiz: dict, question_count: int, top: int = 5) -> str | None:
+    rows = ranking(quiz)[:top]
+    if not rows:
+        return None
+    text = f"📊 <b>{question_count}-savoldan keyingi holat:</b>\n\n"
+    for i, (uid, entry) in enumerate(rows, 1):
+        answered = len(entry["answered"]) or 1
+        text += f"{_medal(i)} {i}. {html.escape(entry['name'])} — {entry['correct']} ✅ ({entry['latency'] / answered:.1f}s)\n"
+    return text
@@ -1,3 +1,8 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
 # Holds the active quizzes state
 # Structure:
 # {
@@ -7,7 +12,34 @@
 #       "current_question": int,
 #       "questions": list,
 #       "poll_ids": {poll_id: {"question_num": int, "correct": int}},
-#       "seconds": int
+#       "seconds": int,
+#       "scores": {user_id: {...}},  # live scoreboard, see bot/scoreboard.py
+#       "question_sent_at": float,   # time.monotonic() of the current poll
+#       "quorum": float | None,     # fast-advance share of participants, None = off
+#       "participants": set,        # user_ids that answered anything in this quiz
+#       "expected": set,            # participants snapshot when the question was sent
+#       "answered": set,            # who answered the current question
+#       "advance": asyncio.Event    # set once enough of "expected" answered
+#       "tournament_id": int        # only for chats started by bot/tournament.py
 #   }
 # }
 active_quizzes: dict = {}
+
+# chat_id -> asyncio.Task running the quiz loop (send_next_question)
+quiz_tasks: dict = {}
+
+# Fire-and-forget DB writes; bot/shutdown.py waits for them before closing the pool
+pending_writes: set = set()
+
+
+def _write_done(task: asyncio.Task):
+    pending_writes.discard(task)
+    if not task.cancelled() and task.exception():
+        logger.warning("Fon yozuvida xato: %s", task.exception())
+
+
+def track_write(coro):
+    task = asyncio.create_task(coro)
+    pending_writes.add(task)
+    task.add_done_callback(_write_done)
+    return task
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import logging
+import time
+
+from bot.config import BOT_MODE, SHUTDOWN_DRAIN_TIMEOUT, SHUTDOWN_FLUSH_TIMEOUT
+from bot.loader import bot, dp
+from bot.pipeline import pipeline
+from bot.session import active_quizzes, quiz_tasks, pending_writes
+from bot.startup import PhaseReport
+from bot.scheduler import stop_scheduler
+from bot import webhook
+from bot.live import live_hub
+from bot.tournament import tournament_tasks
+from database import close_db, save_quiz_snapshots, pop_quiz_snapshots
+
+logger = logging.getLogger(__name__)
+
+# Bundan eski snapshot tiklanmaydi (bot uzoq o'chiq turgan bo'lsa test eskirgan)
+RESUME_MAX_AGE = 3600  # seconds
+
+# Snapshotga yoziladigan quiz kalitlari; Event va monotonic vaqt jarayonga bog'liq
+SNAPSHOT_KEYS = ("session_id", "current_question", "questions", "poll_ids", "seconds", "quorum")
+
+
+async def stop_updates():
+    stop_scheduler()
+    live_hub.close()
+    if BOT_MODE == "webhook":
+        webhook.stop_accepting()
+        return
+    try:
+        await dp.stop_polling()
+    except RuntimeError:
+        # Polling ishga tushmagan (masalan, start_bot=False)
+        pass
+
+
+async def drain_handlers(timeout: float = SHUTDOWN_DRAIN_TIMEOUT) -> bool:
+    """Navbatdagi va ishlayotgan handlerlar tugashini kutadi; vaqt tugasa False"""
+    deadline = time.monotonic() + timeout
+    while pipeline.total_running or pipeline.total_waiting or webhook.queue_size():
+        if time.monotonic() >= deadline:
+            logger.warning(
+                "Handlerlar tugashi kutilmadi: %s ishlayapti, %s kutmoqda, navbatda %s",
+                pipeline.total_running, pipeline.total_waiting, webhook.queue_size()
+            )
+            return False
+        await asyncio.sleep(0.05)
+    return True
+
+
+def _quiz_snapshot(quiz: dict) -> dict:
+    data = {key: quiz.get(key) for key in SNAPSHOT_KEYS}
+    data["participants"] = list(quiz.get("participants", ()))
+    data["scores"] = {
+        str(uid): {**entry, "answered": sorted(entry["answered"])}
+        for uid, entry in quiz.get("scores", {}).items()
+    }
+    data["saved_at"] = time.time()
+    return data
+
+
+async def stop_tournaments(timeout: float = SHUTDOWN_FLUSH_TIMEOUT):
+    """Turnir tasklarini bekor qiladi; ular statusni 'interrupted' qilib ulgurishi kutiladi"""
+    tasks = set(tournament_tasks)
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.wait(tasks, timeout=timeout)
+
+
+async def snapshot_quizzes() -> int:
+    """
+    Faol quizlarni to'xtatadi va keyingi ishga tushishda davom ettirish uchun saqlaydi.
+    Turnir quizlari saqlanmaydi: ularni turnir task'i boshqaradi, u esa tiklanmaydi.
+    """
+    snapshots = {}
+    for chat_id, quiz in active_quizzes.items():
+        if not quiz.get("active"):
+            continue
+        quiz["active"] = False
+        task = quiz_tasks.pop(chat_id, None)
+        if task:
+            task.cancel()
+        if quiz.get("tournament_id") is None:
+            snapshots[chat_id] = json.dumps(_quiz_snapshot(quiz))
+    if snapshots:
+        await save_quiz_snapshots(snapshots)
+    return len(snapshots)
+
+
+async def flush_writes(timeout: float = SHUTDOWN_FLUSH_TIMEOUT) -> bool:
+    """Fon yozuvlari va natijasini yuborayotgan quizlarni kutadi"""
+    pending = set(pending_writes) | set(quiz_tasks.values())
+    if not pending:
+        return True
+    _, not_done = await asyncio.wait(pending, timeout=timeout)
+    for task in not_done:
+        task.cancel()
+    if not_done:
+        logger.warning("%s ta yozuv/quiz o'z vaqtida tugamadi va bekor qilindi", len(not_done))
+    return not not_done
+
+
+async def close_pools():
+    if BOT_MODE == "webhook":
+        await webhook.stop_webhook()
+    await close_db()
+    await dp.storage.close()
+    await bot.session.close()
+
+
+async def shutdown() -> PhaseReport:
+    """
+    SIGTERM dagi to'xtash ketma-ketligi. Har bosqich vaqti o'lchanadi;
+    bitta bosqich xatosi keyingilarini to'xtatmaydi.
+    """
+    report = PhaseReport(title="Shutdown")
+    logger.info("🛑 Shutdown boshlandi")
+
+    async with report.phase("stop_updates", critical=False):
+        await stop_updates()
+    async with report.phase("drain_handlers", critical=False):
+        await drain_handlers()
+    async with report.phase("stop_tournaments", critical=False):
+        await stop_tournaments()
+    async with report.phase("snapshot_quizzes", critical=False):
+        saved = await snapshot_quizzes()
+        if saved:
+            logger.info(f"💾 {saved} ta faol quiz saqlandi")
+    async with report.phase("flush_writes", critical=False):
+        await flush_writes()
+    async with report.phase("close_pools", critical=False):
+        await close_pools()
+
+    report.log()
+    return report
+
+
+def _restore(chat_id: int, data: dict) -> dict:
+    scores = {}
+    for uid, entry in data.get("scores", {}).items():
+        scores[int(uid)] = {**entry, "answered": set(entry["answered"])}
+
+    current = data["current_question"]
+    # Joriy savol pollini yuborib ulgurgan bo'lsak keyingisidan davom etamiz;
+    # eski poll ochiq tursa, unga javoblar poll_ids orqali baribir hisoblanadi
+    if any(p["question_num"] == current for p in data["poll_ids"].values()):
+        current += 1
+
+    return {
+        "active": True,
+        "session_id": data["session_id"],
+        "current_question": current,
+        "questions": data["questions"],
+        "poll_ids": data["poll_ids"],
+        "seconds": data["seconds"],
+        "scores": scores,
+        "quorum": data.get("quorum"),
+        "participants": set(data.get("participants", ())),
+        "expected": set(),
+        "answered": set(),
+        "advance": asyncio.Event()
+    }
+
+
+async def resume_quizzes() -> int:
+    """Oldingi jarayon saqlagan quizlarni davom ettiradi"""
+    from bot.handlers.quiz import run_quiz_loop
+
+    resumed = 0
+    for row in await pop_quiz_snapshots():
+        chat_id = row['chat_id']
+        try:
+            data = json.loads(row['data'])
+        except (TypeError, ValueError):
+            continue
+        if time.time() - data.get("saved_at", 0) > RESUME_MAX_AGE or chat_id in active_quizzes:
+            continue
+
+        active_quizzes[chat_id] = _restore(chat_id, data)
+        try:
+            await bot.send_message(chat_id, "♻️ Bot qayta ishga tushdi, test davom etadi.")
+        except Exception as e:
+            logger.warning("Chat %s: davom etish xabarida xato: %s", chat_id, e)
+        run_quiz_loop(chat_id)
+        resumed += 1
+
+    if resumed:
+        logger.info(f"♻️ {resumed} ta quiz davom ettirildi")
+    return resumed
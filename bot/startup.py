@@ -0,0 +1,65 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class PhaseReport:
+    """
+    Ishga tushish / to'xtash bosqichlari va ularning vaqti.
+    Kritik bosqich xatosi jarayonni to'xtatadi, qolganlari faqat logga yoziladi.
+    """
+
+    def __init__(self, started: float | None = None, title: str = "Startup"):
+        self.title = title
+        self.started = started or time.monotonic()
+        self.phases = []  # (name, ms, status, background)
+        self.tasks = []
+
+    def add(self, name: str, seconds: float, status: str = "ok", background: bool = False):
+        self.phases.append((name, round(seconds * 1000, 1), status, background))
+
+    @asynccontextmanager
+    async def phase(self, name: str, critical: bool = True, background: bool = False):
+        started = time.monotonic()
+        status = "ok"
+        try:
+            yield
+        except Exception:
+            status = "failed"
+            logger.exception("%s bosqichi xato: %s", self.title, name)
+            if critical:
+                raise
+        finally:
+            self.add(name, time.monotonic() - started, status, background=background)
+
+    def background(self, name: str, coro):
+        """Trafik qabul qilinishini kutdirmaydigan bosqich"""
+        async def run():
+            async with self.phase(name, critical=False, background=True):
+                await coro
+            logger.info(f"⏱ Fon bosqichi '{name}' tugadi ({self.phases[-1][1]} ms, {self.phases[-1][2]})")
+        task = asyncio.create_task(run())
+        self.tasks.append(task)
+        return task
+
+    def as_dict(self) -> dict:
+        return {
+            "ready_ms": round((time.monotonic() - self.started) * 1000, 1),
+            "phases": [
+                {"name": n, "ms": ms, "status": st, "background": bg}
+                for n, ms, st, bg in self.phases
+            ],
+            "pending": sum(1 for t in self.tasks if not t.done()),
+        }
+
+    def log(self):
+        lines = [f"⏱ {self.title}: {round((time.monotonic() - self.started) * 1000)} ms"]
+        for name, ms, status, bg in self.phases:
+            lines.append(f"   {name:<20} {ms:>9} ms  {status}{' (fon)' if bg else ''}")
+        pending = sum(1 for t in self.tasks if not t.done())
+        if pending:
+            lines.append(f"   ... {pending} ta fon bosqichi davom etmoqda")
+        logger.info("\n".join(lines))
@@ -0,0 +1,127 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+
+from aiohttp import web
+
+from bot.http_cache import etag_matches
+
+try:
+    import brotli
+except ImportError:  # ixtiyoriy: o'rnatilmagan bo'lsa faqat gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+class Asset:
+    __slots__ = ("name", "content_type", "digest", "variants", "mtime")
+
+    def __init__(self, name: str, body: bytes, mtime: float):
+        self.name = name
+        self.mtime = mtime
+        self.content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        self.digest = hashlib.sha256(body).hexdigest()[:12]
+        # encoding -> (body, etag); faqat kichraygan bo'lsa siqilgan variant saqlanadi
+        self.variants = {"identity": (body, f'"{self.digest}"')}
+        compressed = gzip.compress(body, 9)
+        if len(compressed) < len(body):
+            self.variants["gzip"] = (compressed, f'"{self.digest}-gz"')
+        if brotli is not None:
+            compressed = brotli.compress(body, quality=11)
+            if len(compressed) < len(body):
+                self.variants["br"] = (compressed, f'"{self.digest}-br"')
+
+    def pick(self, accept_encoding: str) -> str:
+        accepted = {e.split(";")[0].strip() for e in accept_encoding.lower().split(",")}
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in self.variants:
+                return encoding
+        return "identity"
+
+
+class StaticAssets:
+    """
+    web/ fayllari ishga tushishda xotiraga o'qiladi va oldindan siqiladi (gzip, brotli bo'lsa br).
+    Har faylning kontent hashi bor: /web/<fayl>?v=<hash> URL lari immutable keshlanadi,
+    sahifalar (/, /admin) esa ETag bilan qayta tekshiriladi.
+    dev=True: har so'rovda fayl o'zgargan-o'zgarmaganini tekshirib, diskdan qayta o'qiydi.
+    """
+
+    def __init__(self, root: str, dev: bool = False):
+        self.root = root
+        self.dev = dev
+        self.assets: dict = {}
+
+    def load(self):
+        total = 0
+        names = sorted(os.listdir(self.root))
+        # HTML oxirida: ichidagi /web/... havolalar versiyali URL ga almashtiriladi
+        for name in sorted(names, key=lambda n: n.endswith(".html")):
+            path = os.path.join(self.root, name)
+            if os.path.isfile(path):
+                self._load_file(name)
+                total += len(self.assets[name].variants["identity"][0])
+        logger.info(f"📦 Static: {len(self.assets)} fayl, {total // 1024} KB ({'br+gzip' if brotli else 'gzip'})")
+
+    def _load_file(self, name: str):
+        path = os.path.join(self.root, name)
+        with open(path, "rb") as f:
+            body = f.read()
+        if name.endswith(".html"):
+            text = body.decode("utf-8")
+            for other, asset in self.assets.items():
+                if not other.endswith(".html"):
+                    text = text.replace(f"/web/{other}", self.url(other))
+            body = text.encode("utf-8")
+        self.assets[name] = Asset(name, body, os.path.getmtime(path))
+
+    def _reload_if_changed(self, name: str):
+        path = os.path.join(self.root, name)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            self.assets.pop(name, None)
+            return
+        asset = self.assets.get(name)
+        if asset is None or asset.mtime != mtime:
+            self._load_file(name)
+
+    def url(self, name: str) -> str:
+        asset = self.assets.get(name)
+        return f"/web/{name}?v={asset.digest}" if asset else f"/web/{name}"
+
+    def response(self, request: web.Request, name: str, immutable: bool = False) -> web.Response:
+        if self.dev:
+            self._reload_if_changed(name)
+        asset = self.assets.get(name)
+        if asset is None:
+            raise web.HTTPNotFound()
+
+        encoding = asset.pick(request.headers.get("Accept-Encoding", ""))
+        body, etag = asset.variants[encoding]
+        headers = {
+            "ETag": etag,
+            "Cache-Control": IMMUTABLE if immutable and not self.dev else REVALIDATE,
+            "Vary": "Accept-Encoding",
+        }
+        if etag_matches(request.headers.get("If-None-Match", ""), etag):
+            return web.Response(status=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return web.Response(body=body, headers=headers, content_type=asset.content_type,
+                            charset="utf-8" if asset.content_type.startswith("text/") else None)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """/web/{name}: ?v= joriy hashga teng bo'lsa immutable"""
+        name = request.match_info["name"]
+        if "/" in name or name.startswith("."):
+            raise web.HTTPNotFound()
+        asset = self.assets.get(name)
+        versioned = asset is not None and request.query.get("v") == asset.digest
+        return self.response(request, name, immutable=versioned)
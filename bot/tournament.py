@@ -0,0 +1,195 @@
+import asyncio
+import json
+import logging
+import random
+import time
+
+from aiogram.exceptions import TelegramRetryAfter
+
+from bot.config import ADMIN_IDS, TOURNAMENT_SEND_RATE
+from bot.loader import bot
+from bot.media import prewarm
+from bot.question_bank import question_ids
+from bot.session import active_quizzes, track_write
+from database import (
+    get_tournament, get_tournament_chats, set_tournament_status, get_questions_by_ids,
+    create_quiz_session, record_question_asked
+)
+
+logger = logging.getLogger(__name__)
+
+# Ishlayotgan turnir tasklari; shutdown ularni bekor qiladi (bot/shutdown.py)
+tournament_tasks: set = set()
+
+
+def expected_skew(chats: int, rate: float = TOURNAMENT_SEND_RATE) -> float:
+    """Bitta savolni hamma chatga yuborish oynasi, soniya (start skew chegarasi)"""
+    return chats / rate if chats else 0.0
+
+
+async def stagger(chat_ids: list, send, rate: float = TOURNAMENT_SEND_RATE) -> dict:
+    """
+    send(chat_id) ni chatlarga rate/s tezlikda tarqatadi (k-chat t0 + k/rate da).
+    429 bo'lsa retry_after kutib qayta uriniladi. chat_id -> yuborilgan vaqt (monotonic) yoki None.
+    """
+    t0 = time.monotonic()
+    interval = 1 / rate
+
+    async def one(k: int, chat_id: int):
+        delay = t0 + k * interval - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        for _ in range(3):
+            try:
+                await send(chat_id)
+                return chat_id, time.monotonic()
+            except TelegramRetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+            except Exception as e:
+                logger.warning("Turnir: chat %s ga yuborishda xato: %s", chat_id, e)
+                return chat_id, None
+        return chat_id, None
+
+    return dict(await asyncio.gather(*(one(k, c) for k, c in enumerate(chat_ids))))
+
+
+async def _sleep_until(ts: float):
+    delay = ts - time.time()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+async def _shared_questions(subject: str | None, count: int) -> list:
+    """Hamma chat uchun bitta savollar to'plami, bitta so'rov bilan"""
+    ids = await question_ids(subject)
+    picked = random.sample(list(ids), min(count, len(ids)))
+    questions = await get_questions_by_ids(picked)
+    random.shuffle(questions)
+    return questions
+
+
+def _new_quiz(session_id: int, questions: list, seconds: int, tournament_id: int) -> dict:
+    return {
+        "active": True,
+        "session_id": session_id,
+        "current_question": 0,
+        "questions": questions,
+        "poll_ids": {},
+        "seconds": seconds,
+        "scores": {},
+        "quorum": None,
+        "participants": set(),
+        "expected": set(),
+        "answered": set(),
+        "advance": asyncio.Event(),
+        "tournament_id": tournament_id
+    }
+
+
+def _live(chats: list) -> list:
+    """/cancel yoki shutdown bilan to'xtatilgan chatlar tushib qoladi"""
+    return [c for c in chats if (active_quizzes.get(c) or {}).get("active")]
+
+
+async def _run(t) -> dict:
+    from bot.handlers.quiz import send_question, finish_quiz
+
+    tournament_id = t['id']
+    seconds = t['seconds']
+    questions = await _shared_questions(t['subject'], t['questions_count'])
+    if not questions:
+        raise RuntimeError("savollar topilmadi")
+    # Rasmlar bir marta yuklanadi, chatlarga file_id bilan ketadi
+    prewarm(questions)
+
+    busy = []
+    chats = []
+    for chat_id in await get_tournament_chats():
+        (busy if (active_quizzes.get(chat_id) or {}).get("active") else chats).append(chat_id)
+    if not chats:
+        raise RuntimeError("ro'yxatdan o'tgan bo'sh chat yo'q")
+
+    sessions = await asyncio.gather(*(create_quiz_session(c) for c in chats))
+    for chat_id, session_id in zip(chats, sessions):
+        active_quizzes[chat_id] = _new_quiz(session_id, questions, seconds, tournament_id)
+
+    announce = (
+        f"🏆 <b>Turnir #{tournament_id}</b> tez orada boshlanadi!\n"
+        f"Fan: {t['subject'] or 'Barcha fanlar'}\nSavollar soni: {len(questions)}\n⏱ Har biriga {seconds} soniya"
+    )
+    await stagger(chats, lambda c: bot.send_message(c, announce, parse_mode="HTML"))
+
+    # Savollar umumiy soat bo'yicha ochiladi: i-savol start_at + i * slot da,
+    # shuning uchun kechikish savoldan savolga yig'ilmaydi
+    window = expected_skew(len(chats))
+    slot = seconds + 2 + window
+    skews = []
+    failed = 0
+    await _sleep_until(t['start_at'])
+    for i in range(len(questions)):
+        await _sleep_until(t['start_at'] + i * slot)
+        live = _live(chats)
+        if not live:
+            break
+        for chat_id in live:
+            active_quizzes[chat_id]["current_question"] = i
+        sent = await stagger(live, lambda c, i=i: send_question(c, active_quizzes[c], i, record_stats=False))
+        times = [v for v in sent.values() if v is not None]
+        failed += len(sent) - len(times)
+        if times:
+            skews.append(max(times) - min(times))
+            if questions[i].get("id"):
+                track_write(record_question_asked(questions[i]["id"], times=len(times)))
+    await asyncio.sleep(seconds + 2)
+
+    players = {uid for c in _live(chats) for uid in active_quizzes[c]["scores"]}
+    await stagger(_live(chats), finish_quiz)
+
+    start_skew = skews[0] if skews else None
+    skews.sort()
+    return {
+        "chats": len(chats),
+        "busy_chats": len(busy),
+        "questions": len(questions),
+        "players": len(players),
+        "failed_sends": failed,
+        "start_skew_ms": round(start_skew * 1000) if skews else None,
+        "skew_p50_ms": round(skews[len(skews) // 2] * 1000) if skews else None,
+        "skew_max_ms": round(skews[-1] * 1000) if skews else None,
+        "skew_bound_ms": round(window * 1000),
+    }
+
+
+async def run_tournament(tournament_id: int):
+    """Scheduler chaqiradi (start_at - TOURNAMENT_PREPARE_LEAD da)"""
+    t = await get_tournament(tournament_id)
+    if not t or t['status'] != 'scheduled':
+        return
+    await set_tournament_status(tournament_id, 'running')
+    logger.info(f"🏆 Turnir #{tournament_id} tayyorlanmoqda")
+
+    task = asyncio.current_task()
+    tournament_tasks.add(task)
+    try:
+        report = await _run(t)
+        status = 'finished'
+    except asyncio.CancelledError:
+        # Shutdown: turnir davom ettirilmaydi (umumiy soat qayta ishga tushishda buziladi)
+        await set_tournament_status(tournament_id, 'interrupted', json.dumps({"error": "shutdown"}))
+        logger.warning(f"🏆 Turnir #{tournament_id} shutdown sababli to'xtatildi")
+        raise
+    except Exception as e:
+        logger.exception("Turnir #%s xato: %s", tournament_id, e)
+        report = {"error": str(e)}
+        status = 'failed'
+    finally:
+        tournament_tasks.discard(task)
+    await set_tournament_status(tournament_id, status, json.dumps(report))
+    logger.info(f"🏆 Turnir #{tournament_id}: {status} {report}")
+
+    text = f"🏆 Turnir #{tournament_id}: {status}\n" + "\n".join(f"{k}: {v}" for k, v in report.items())
+    for admin_id in ADMIN_IDS:
+        try:
+            await bot.send_message(admin_id, text)
+        except Exception:
+            pass
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import time
+
+from bot.config import WARMUP_BUDGET, WARMUP_CONCURRENCY, RANKINGS_PAGE_SIZE
+from bot.question_bank import question_ids, difficulty_buckets
+from bot.utils import get_all_subjects
+from database import get_setting, get_exchange_rate, get_ranking_by_period, get_admins_list
+
+logger = logging.getLogger(__name__)
+
+# Reyting: (period, limit) — /api/rankings (sahifa + 1, keyingisi bormi) va haftalik post ishlatadiganlari
+RANKINGS = [(p, RANKINGS_PAGE_SIZE + 1) for p in ("all", "week", "month")] + [("week", 10)]
+SETTINGS = ["min_withdrawal"]
+
+
+async def _jobs():
+    """(nom, coroutine funksiya) ro'yxati; fanlar ro'yxati birinchi yuklanadi"""
+    subjects = await get_all_subjects()
+    jobs = [
+        ("exchange_rate", get_exchange_rate),
+        ("admins", get_admins_list),
+        ("question_index:*", lambda: question_ids(None)),
+    ]
+    jobs += [(f"setting:{key}", lambda key=key: get_setting(key)) for key in SETTINGS]
+    jobs += [(f"ranking:{p}:{n}", lambda p=p, n=n: get_ranking_by_period(p, limit=n)) for p, n in RANKINGS]
+    for subject in subjects:
+        jobs.append((f"question_index:{subject}", lambda s=subject: question_ids(s)))
+        jobs.append((f"difficulty:{subject}", lambda s=subject: difficulty_buckets(s)))
+    return jobs
+
+
+async def warmup(budget: float = WARMUP_BUDGET, concurrency: int = WARMUP_CONCURRENCY) -> dict:
+    """
+    Xotiradagi keshlarni oldindan to'ldiradi. Bir vaqtda `concurrency` tadan ortiq
+    yuklash bo'lmaydi (pool to'lib qolmasin); `budget` soniyadan keyin qolganlari
+    tashlab ketiladi va keshlar odatdagidek birinchi so'rovda to'ladi.
+    """
+    started = time.monotonic()
+    semaphore = asyncio.Semaphore(concurrency)
+    done = []
+    failed = []
+
+    async def run(name, load):
+        async with semaphore:
+            try:
+                await load()
+                done.append(name)
+            except Exception as e:
+                failed.append(name)
+                logger.warning("Warmup '%s' xato: %s", name, e)
+
+    async def run_all():
+        jobs = await _jobs()
+        done.append("subjects")
+        await asyncio.gather(*[run(name, load) for name, load in jobs])
+
+    try:
+        await asyncio.wait_for(run_all(), timeout=budget)
+    except asyncio.TimeoutError:
+        logger.warning(f"⚠️ Warmup {budget}s budjetga sig'madi, qolganlari tashlab ketildi")
+
+    result = {
+        "ms": round((time.monotonic() - started) * 1000, 1),
+        "loaded": len(done),
+        "failed": failed,
+    }
+    logger.info(f"🔥 Warmup: {result['loaded']} ta kesh {result['ms']} ms da to'ldi")
+    return result
@@ -0,0 +1,81 @@
+import asyncio
+import hmac
+import logging
+
+from aiohttp import web
+from aiogram.types import Update
+
+from bot.config import WEBHOOK_SECRET, WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE
+from bot.loader import bot, dp
+
+logger = logging.getLogger(__name__)
+
+# Telegram update'lari shu navbatga tushadi, WEBHOOK_WORKERS ta worker qayta ishlaydi
+update_queue: asyncio.Queue | None = None
+_workers: list = []
+# Shutdown boshlangach yangi update qabul qilinmaydi (Telegram 503 dan keyin qayta yuboradi)
+accepting = True
+
+
+async def handle_webhook(request: web.Request):
+    """Telegram POST: secretni tekshiradi, navbatga qo'yadi va darhol 200 qaytaradi"""
+    if not accepting:
+        return web.Response(status=503)
+
+    token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+    if not hmac.compare_digest(token, WEBHOOK_SECRET):
+        return web.Response(status=401)
+
+    try:
+        data = await request.json()
+    except Exception:
+        return web.Response(status=400)
+
+    try:
+        update_queue.put_nowait(data)
+    except asyncio.QueueFull:
+        # Telegram 2xx bo'lmagan javobda update'ni keyinroq qayta yuboradi
+        logger.warning("Webhook navbati to'lgan (%s), update qaytarildi", update_queue.qsize())
+        return web.Response(status=503)
+    return web.Response()
+
+
+async def _worker(n: int):
+    while True:
+        data = await update_queue.get()
+        try:
+            update = Update.model_validate(data, context={"bot": bot})
+            await dp.feed_update(bot, update)
+        except Exception as e:
+            logger.exception("Webhook worker #%s: update xatosi: %s", n, e)
+        finally:
+            update_queue.task_done()
+
+
+async def start_webhook(url: str):
+    global update_queue
+    update_queue = asyncio.Queue(maxsize=WEBHOOK_QUEUE_SIZE)
+    for n in range(WEBHOOK_WORKERS):
+        _workers.append(asyncio.create_task(_worker(n)))
+
+    await bot.set_webhook(
+        url,
+        secret_token=WEBHOOK_SECRET,
+        allowed_updates=dp.resolve_used_update_types(),
+    )
+    logger.info(f"Webhook o'rnatildi: {url} ({WEBHOOK_WORKERS} worker)")
+
+
+def stop_accepting():
+    global accepting
+    accepting = False
+
+
+def queue_size() -> int:
+    return update_queue.qsize() if update_queue is not None else 0
+
+
+async def stop_webhook():
+    for task in _workers:
+        task.cancel()
+    _workers.clear()
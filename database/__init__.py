@@ -6,5 +6,13 @@ from .db import (
     get_user_stats, get_ranking_by_period, get_exchange_rate,
     set_exchange_rate, create_withdrawal, get_pending_withdrawals, update_withdrawal_status,
     get_admin_dashboard_stats, get_custom_subjects_list, add_custom_subject, remove_custom_subject,
-    check_is_admin_db, add_admin, remove_admin, get_admins_list, get_setting, set_setting
+    check_is_admin_db, add_admin, remove_admin, get_admins_list, get_setting, set_setting,
+    set_question_file_id, get_question_ids, get_questions_by_ids, get_seen_bits, save_seen_bits,
+    record_question_asked, get_question_difficulty, get_group_rank, rebuild_chat_scores,
+    fsm_get, fsm_set, fsm_delete, fsm_purge_expired, get_subject_counts,
+    close_db, save_quiz_snapshots, pop_quiz_snapshots,
+    register_tournament_chat, unregister_tournament_chat, get_tournament_chats, create_tournament,
+    get_tournament, get_scheduled_tournaments, set_tournament_status, compact_rollups,
+    ensure_user, get_user_summary, get_user_score, add_questions_batch,
+    export_questions, export_answers, export_rankings, export_withdrawals, pool_pressure
 )
@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Oddiy xotira keshi: kalit -> (muddat, qiymat).
+    Bir vaqtda kelgan bir xil so'rovlar bitta yuklashni kutadi (coalescing).
+    invalidate() dan oldin boshlangan yuklash natijasi keshga yozilmaydi
+    (to'liq tozalashda generation, bitta kalitda _loading dagi future almashadi),
+    keyingi so'rovlar esa unga qo'shilmay yangisini boshlaydi.
+    """
+
+    def __init__(self, ttl: float, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data: dict = {}
+        self._loading: dict = {}
+        self._generation = 0
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is None or item[0] < time.monotonic():
+            return default
+        return item[1]
+
+    def set(self, key, value):
+        if len(self._data) >= self.max_size and key not in self._data:
+            self._data.pop(next(iter(self._data)))
+        self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, key=_MISSING):
+        if key is _MISSING:
+            self._generation += 1
+            self._data.clear()
+            self._loading.clear()
+        else:
+            # Faqat shu kalit: boshqa kalitlarning yuklashlari saqlanib qoladi
+            self._data.pop(key, None)
+            self._loading.pop(key, None)
+
+    def discard(self, key):
+        """Tayyor yozuvni o'chiradi; davom etayotgan yuklashlarga tegmaydi"""
+        self._data.pop(key, None)
+
+    async def get_or_load(self, key, loader):
+        """loader: argumentsiz coroutine funksiya"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        pending = self._loading.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        generation = self._generation
+        try:
+            value = await loader()
+        except Exception as e:
+            future.set_exception(e)
+            # Kutayotgan bo'lmasa "exception was never retrieved" chiqmasin
+            future.exception()
+            raise
+        else:
+            if generation == self._generation and self._loading.get(key) is future:
+                self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            if self._loading.get(key) is future:
+                del self._loading[key]
+
+
+# Ma'lumot o'zgarganda chaqiriladigan hooklar: topic ("answers", "rankings", "settings", "subjects") -> callbacklar.
+# Yuqori qatlamlar (masalan bot/http_cache.py) shu orqali o'z keshlarini tozalaydi.
+_listeners: dict = {}
+
+
+def subscribe(topic: str, callback, min_interval: float = 0):
+    """
+    callback() ni topic o'zgarganda chaqiradi. min_interval > 0 bo'lsa ko'pi bilan
+    shuncha soniyada bir marta (oxirgi o'zgarish ham kechikib bo'lsa-da yetib boradi).
+    """
+    if min_interval <= 0:
+        _listeners.setdefault(topic, []).append(callback)
+        return
+
+    state = {"last": 0.0, "scheduled": False}
+
+    def fire():
+        state["scheduled"] = False
+        state["last"] = time.monotonic()
+        callback()
+
+    def throttled():
+        if state["scheduled"]:
+            return
+        wait = state["last"] + min_interval - time.monotonic()
+        if wait <= 0:
+            fire()
+            return
+        state["scheduled"] = True
+        asyncio.get_running_loop().call_later(wait, fire)
+
+    _listeners.setdefault(topic, []).append(throttled)
+
+
+def changed(topic: str):
+    for callback in _listeners.get(topic, ()):
+        callback()
@@ -1,15 +1,44 @@
+import asyncio
+import contextlib
+import functools
+import time
 import asyncpg
 import aiosqlite
 import logging
 import os
 import re
+from datetime import datetime
 from typing import Optional, Any, List, Dict
 from bot.config import DATABASE_URL
+from bot.metrics import DB_QUERIES, DB_SECONDS, DB_POOL_WAIT
+from .cache import TTLCache, subscribe, changed
 
 # Global connection handlers
 pg_pool: Optional[asyncpg.Pool] = None
 sqlite_db: Optional[str] = 'quiz_bot.db'
 DB_TYPE = 'pg'  # 'pg' or 'sqlite'
+db_connected = False
+# Pool dan ulanish olishni kutish vaqti, eksponensial o'rtacha (soniya); _acquire() yangilaydi
+pool_wait = 0.0
+
+# In-memory caches for hot, rarely changing reads (filled by bot/warmup.py at startup)
+settings_cache = TTLCache(ttl=300)
+subjects_cache = TTLCache(ttl=300)
+admins_cache = TTLCache(ttl=300)
+rankings_cache = TTLCache(ttl=30)
+# Mini App: user_id -> (user row, stats, rank); javob va tanga o'zgarganda tozalanadi
+user_summary_cache = TTLCache(ttl=10, max_size=4096)
+
+
+def _rankings_changed():
+    # Yagona throttled hook: avval kesh tozalanadi, keyin "rankings" obunachilari
+    # (HTTP kesh, live leaderboard) yangi qiymatni o'qiydi
+    rankings_cache.invalidate()
+    changed("rankings")
+
+
+# Javoblar oqimida reyting ko'pi bilan shuncha soniyada bir marta qayta hisoblanadi
+subscribe("answers", _rankings_changed, min_interval=5)
 
 # --- Logging setup ---
 logging.basicConfig(level=logging.INFO)
@@ -17,6 +46,43 @@ logger = logging.getLogger(__name__)
 
 # === ABSTRACTION LAYER ===
 
+def _instrumented(op: str):
+    """Helper chaqiruvlari soni va vaqti (/metrics); label children oldindan bog'langan"""
+    def decorator(fn):
+        children = {
+            backend: (DB_QUERIES.labels(backend, op), DB_SECONDS.labels(backend, op))
+            for backend in ('pg', 'sqlite')
+        }
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            calls, seconds = children[DB_TYPE]
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                calls.inc()
+                seconds.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+@contextlib.asynccontextmanager
+async def _acquire():
+    """pg_pool.acquire() + navbatda kutish vaqti (/metrics va bot/ratelimit.py admission uchun)"""
+    global pool_wait
+    started = time.perf_counter()
+    async with pg_pool.acquire() as conn:
+        waited = time.perf_counter() - started
+        pool_wait += (waited - pool_wait) * 0.2
+        DB_POOL_WAIT.observe(waited)
+        yield conn
+
+def pool_pressure() -> float:
+    """Pool dan ulanish kutish vaqti (soniya, EWMA); bo'sh ulanish bo'lsa yoki SQLite da 0"""
+    if DB_TYPE != 'pg' or pg_pool is None or pg_pool.get_idle_size() > 0:
+        return 0.0
+    return pool_wait
+
 async def get_connection():
     """Returns a connection context manager appropriate for the DB_TYPE"""
     pass # Not used directly, specific helpers used below
@@ -49,11 +115,12 @@ def _convert_to_sqlite(query: str, args: tuple) -> (str, tuple):
     
     return new_query, args
 
+@_instrumented('execute')
 async def execute(query: str, *args):
     global DB_TYPE, pg_pool
     try:
         if DB_TYPE == 'pg':
-            async with pg_pool.acquire() as conn:
+            async with _acquire() as conn:
                 return await conn.execute(query, *args)
         else:
             q, a = _convert_to_sqlite(query, args)
@@ -64,11 +131,48 @@ async def execute(query: str, *args):
         logger.error(f"DB Error (Execute): {e} | Query: {query}")
         raise e
 
+@_instrumented('execute_batch')
+async def execute_batch(statements: list):
+    """[(query, args), ...] ni bitta tranzaksiyada bajaradi"""
+    try:
+        if DB_TYPE == 'pg':
+            async with _acquire() as conn:
+                async with conn.transaction():
+                    for query, args in statements:
+                        await conn.execute(query, *args)
+        else:
+            async with aiosqlite.connect(sqlite_db) as db:
+                for query, args in statements:
+                    q, a = _convert_to_sqlite(query, args)
+                    await db.execute(q, a)
+                await db.commit()
+    except Exception as e:
+        logger.error(f"DB Error (Batch): {e} | Queries: {[q for q, _ in statements]}")
+        raise e
+
+@_instrumented('execute_many')
+async def execute_many(query: str, rows: list):
+    """Bitta so'rovni ko'p qator bilan, bitta tranzaksiyada (import uchun)"""
+    try:
+        if DB_TYPE == 'pg':
+            async with _acquire() as conn:
+                async with conn.transaction():
+                    await conn.executemany(query, rows)
+        else:
+            q, _ = _convert_to_sqlite(query, ())
+            async with aiosqlite.connect(sqlite_db) as db:
+                await db.executemany(q, rows)
+                await db.commit()
+    except Exception as e:
+        logger.error(f"DB Error (Many): {e} | Query: {query} | Rows: {len(rows)}")
+        raise e
+
+@_instrumented('fetch')
 async def fetch(query: str, *args):
     global DB_TYPE, pg_pool
     try:
         if DB_TYPE == 'pg':
-            async with pg_pool.acquire() as conn:
+            async with _acquire() as conn:
                 return await conn.fetch(query, *args)
         else:
             q, a = _convert_to_sqlite(query, args)
@@ -81,11 +185,12 @@ async def fetch(query: str, *args):
         logger.error(f"DB Error (Fetch): {e} | Query: {query}")
         return []
 
+@_instrumented('fetchrow')
 async def fetchrow(query: str, *args):
     global DB_TYPE, pg_pool
     try:
         if DB_TYPE == 'pg':
-            async with pg_pool.acquire() as conn:
+            async with _acquire() as conn:
                 return await conn.fetchrow(query, *args)
         else:
             q, a = _convert_to_sqlite(query, args)
@@ -98,11 +203,12 @@ async def fetchrow(query: str, *args):
         logger.error(f"DB Error (Fetchrow): {e} | Query: {query}")
         return None
 
+@_instrumented('fetchval')
 async def fetchval(query: str, *args):
     global DB_TYPE, pg_pool
     try:
         if DB_TYPE == 'pg':
-            async with pg_pool.acquire() as conn:
+            async with _acquire() as conn:
                 return await conn.fetchval(query, *args)
         else:
             q, a = _convert_to_sqlite(query, args)
@@ -115,11 +221,33 @@ async def fetchval(query: str, *args):
         logger.error(f"DB Error (Fetchval): {e} | Query: {query}")
         return None
 
+async def stream(query: str, *args, batch: int = 1000):
+    """
+    Katta natijalarni bo'laklab o'qiydi (eksport uchun): PostgreSQL da server-side
+    cursor, SQLite da fetchmany. Har safar `batch` tagacha qatorlik ro'yxat qaytadi.
+    """
+    if DB_TYPE == 'pg':
+        async with _acquire() as conn:
+            # asyncpg cursorlari faqat tranzaksiya ichida ishlaydi
+            async with conn.transaction(readonly=True):
+                cursor = await conn.cursor(query, *args)
+                while rows := await cursor.fetch(batch):
+                    yield rows
+    else:
+        q, a = _convert_to_sqlite(query, args)
+        a = tuple(x.strftime('%Y-%m-%d %H:%M:%S') if isinstance(x, datetime) else x for x in a)
+        async with aiosqlite.connect(sqlite_db) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute(q, a) as cursor:
+                while rows := await cursor.fetchmany(batch):
+                    yield rows
+
 # for INSERT RETURNING id substitute in SQLite
+@_instrumented('insert_returning_id')
 async def insert_returning_id(query: str, *args, id_column: str = 'id') -> int:
     global DB_TYPE, pg_pool
     if DB_TYPE == 'pg':
-        async with pg_pool.acquire() as conn:
+        async with _acquire() as conn:
             return await conn.fetchval(query, *args)
     else:
         # Remove RETURNING clause for SQLite and require explicit commit + lastrowid
@@ -133,9 +261,16 @@ async def insert_returning_id(query: str, *args, id_column: str = 'id') -> int:
             return cursor.lastrowid
 
 # === DASTLABKI INITSIALIZATSIYA ===
-async def init_db():
-    """Ma'lumotlar bazasini yaratish va jadvallarni sozlash (PG -> SQLite Fallback)"""
-    global pg_pool, DB_TYPE
+# Bump when the schema in create_schema() changes; while the marker stored in
+# settings matches, startup skips all CREATE/ALTER checks
+SCHEMA_VERSION = '10'
+
+async def connect_db():
+    """PostgreSQL pool yoki SQLite fallback (bir marta)"""
+    global pg_pool, DB_TYPE, db_connected
+
+    if db_connected:
+        return
 
     # 1. Try PostgreSQL
     if DATABASE_URL:
@@ -151,7 +286,42 @@ async def init_db():
         DB_TYPE = 'sqlite'
 
     logger.info(f"💾 Using Database: {DB_TYPE}")
+    db_connected = True
+
+async def close_db(timeout: float = 10):
+    """Pool ni yopadi (SQLite ulanishlari har so'rovda ochilib-yopiladi)"""
+    global pg_pool, db_connected
+    if pg_pool is not None:
+        try:
+            await asyncio.wait_for(pg_pool.close(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("⚠️ PostgreSQL pool o'z vaqtida yopilmadi, majburan yopiladi")
+            pg_pool.terminate()
+        pg_pool = None
+    db_connected = False
+
+async def table_exists(table: str) -> bool:
+    if DB_TYPE == 'sqlite':
+        val = await fetchval("SELECT name FROM sqlite_master WHERE type = 'table' AND name = $1", table)
+    else:
+        val = await fetchval("SELECT to_regclass($1)::text", table)
+    return val is not None
+
+async def get_schema_version():
+    if not await table_exists('settings'):
+        return None
+    return await fetchval("SELECT value FROM settings WHERE key = 'schema_version'")
+
+async def init_db(force: bool = False):
+    """Ma'lumotlar bazasini yaratish va jadvallarni sozlash (PG -> SQLite Fallback)"""
+    await connect_db()
+    if not force and await get_schema_version() == SCHEMA_VERSION:
+        logger.info(f"✅ Database schema v{SCHEMA_VERSION} up to date, checks skipped.")
+        return
+    await create_schema()
+    await set_setting('schema_version', SCHEMA_VERSION)
 
+async def create_schema():
     # Create Tables
     # Note: Using abstraction functions allows single definition, 
     # but CREATE TABLE syntax differs enough that we rely on _convert_to_sqlite's basic replacement
@@ -231,9 +401,193 @@ async def init_db():
         created_at TIMESTAMP DEFAULT NOW()
     )''')
 
+    # Per-chat "already asked" bitmap over question ids (see bot/question_bank.py)
+    # subject = '*' for mixed quizzes
+    blob = 'BYTEA' if DB_TYPE == 'pg' else 'BLOB'
+    await execute(f'''CREATE TABLE IF NOT EXISTS chat_seen_questions (
+        chat_id BIGINT,
+        subject TEXT,
+        bits {blob},
+        updated_at TIMESTAMP DEFAULT NOW(),
+        PRIMARY KEY (chat_id, subject)
+    )''')
+
+    # Per-question counters, updated as answers come in (no aggregate scans)
+    await execute('''CREATE TABLE IF NOT EXISTS question_stats (
+        question_id INTEGER PRIMARY KEY,
+        asked INTEGER DEFAULT 0,
+        answered INTEGER DEFAULT 0,
+        correct INTEGER DEFAULT 0,
+        latency_total_ms BIGINT DEFAULT 0
+    )''')
+    await ensure_column('user_answers', 'question_id', 'INTEGER')
+    await ensure_column('user_answers', 'answer_ms', 'INTEGER')
+
+    # Per-chat leaderboard, maintained together with user_answers (see save_user_answer)
+    await execute('''CREATE TABLE IF NOT EXISTS chat_user_scores (
+        chat_id BIGINT,
+        user_id BIGINT,
+        score INTEGER DEFAULT 0,
+        answers INTEGER DEFAULT 0,
+        last_played TIMESTAMP DEFAULT NOW(),
+        PRIMARY KEY (chat_id, user_id)
+    )''')
+    await execute("CREATE INDEX IF NOT EXISTS idx_chat_user_scores_rank ON chat_user_scores (chat_id, score DESC)")
+
+    # Keyset pagination (search_questions, get_ranking_by_period, get_pending_withdrawals)
+    await execute("CREATE INDEX IF NOT EXISTS idx_users_score ON users (total_score DESC, user_id)")
+    await execute("CREATE INDEX IF NOT EXISTS idx_questions_subject_id ON questions (subject, id)")
+    await execute("CREATE INDEX IF NOT EXISTS idx_withdrawals_status_id ON withdrawals (status, id)")
+
+    # aiogram FSM state/data for admin wizards (see bot/fsm_storage.py); expires_at is unix time
+    await execute('''CREATE TABLE IF NOT EXISTS fsm_storage (
+        key TEXT PRIMARY KEY,
+        state TEXT,
+        data TEXT,
+        expires_at DOUBLE PRECISION
+    )''')
+
+    # Active quiz state saved on shutdown and resumed on the next start (see bot/shutdown.py)
+    await execute('''CREATE TABLE IF NOT EXISTS quiz_snapshots (
+        chat_id BIGINT PRIMARY KEY,
+        data TEXT,
+        created_at TIMESTAMP DEFAULT NOW()
+    )''')
+
+    # Scheduled tournaments (see bot/tournament.py); start_at is unix time, report is JSON
+    await execute('''CREATE TABLE IF NOT EXISTS tournaments (
+        id SERIAL PRIMARY KEY,
+        start_at DOUBLE PRECISION NOT NULL,
+        subject TEXT,
+        questions_count INTEGER DEFAULT 20,
+        seconds INTEGER DEFAULT 15,
+        status TEXT DEFAULT 'scheduled',
+        report TEXT,
+        created_by BIGINT,
+        created_at TIMESTAMP DEFAULT NOW()
+    )''')
+    await execute('''CREATE TABLE IF NOT EXISTS tournament_chats (
+        chat_id BIGINT PRIMARY KEY,
+        title TEXT,
+        registered_at TIMESTAMP DEFAULT NOW()
+    )''')
+
+    # Telegram file_id of an uploaded question image (see bot/media.py)
+    await ensure_column('questions', 'image_file_id', 'TEXT')
+
+    # chat_user_scores starts empty on databases that predate it: fill it from
+    # user_answers once, later answers keep it up to date
+    if await fetchval("SELECT value FROM settings WHERE key = 'chat_scores_backfilled'") is None:
+        await rebuild_chat_scores()
+        await set_setting('chat_scores_backfilled', '1')
+
     logger.info("✅ Database tables checked/created.")
 
 
+async def column_exists(table: str, column: str) -> bool:
+    if DB_TYPE == 'sqlite':
+        rows = await fetch(f"PRAGMA table_info({table})")
+        return any(r['name'] == column for r in rows)
+    val = await fetchval('''
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = $1 AND column_name = $2
+    ''', table, column)
+    return val is not None
+
+async def ensure_column(table: str, column: str, ddl: str):
+    """CREATE TABLE IF NOT EXISTS eski jadvallarga yangi ustun qo'shmaydi, shuning uchun alohida"""
+    if not await column_exists(table, column):
+        await execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+        logger.info(f"🧩 Ustun qo'shildi: {table}.{column}")
+
+
+# === FSM STORAGE ===
+async def fsm_get(key: str):
+    return await fetchrow("SELECT state, data, expires_at FROM fsm_storage WHERE key = $1", key)
+
+async def fsm_set(key: str, state: Optional[str], data: str, expires_at: float):
+    if DB_TYPE == 'sqlite':
+        await execute("INSERT OR REPLACE INTO fsm_storage (key, state, data, expires_at) VALUES (?, ?, ?, ?)", key, state, data, expires_at)
+    else:
+        await execute('''
+            INSERT INTO fsm_storage (key, state, data, expires_at) VALUES ($1, $2, $3, $4)
+            ON CONFLICT (key) DO UPDATE SET state = EXCLUDED.state, data = EXCLUDED.data, expires_at = EXCLUDED.expires_at
+        ''', key, state, data, expires_at)
+
+async def fsm_delete(key: str):
+    await execute("DELETE FROM fsm_storage WHERE key = $1", key)
+
+async def fsm_purge_expired(now: float):
+    await execute("DELETE FROM fsm_storage WHERE expires_at < $1", now)
+
+
+# === QUIZ SNAPSHOTS ===
+async def save_quiz_snapshots(snapshots: dict):
+    """chat_id -> JSON matn; bitta tranzaksiyada"""
+    if DB_TYPE == 'sqlite':
+        sql = "INSERT OR REPLACE INTO quiz_snapshots (chat_id, data) VALUES ($1, $2)"
+    else:
+        sql = '''INSERT INTO quiz_snapshots (chat_id, data) VALUES ($1, $2)
+            ON CONFLICT (chat_id) DO UPDATE SET data = EXCLUDED.data, created_at = NOW()'''
+    await execute_batch([(sql, (chat_id, data)) for chat_id, data in snapshots.items()])
+
+async def pop_quiz_snapshots():
+    rows = await fetch("SELECT chat_id, data FROM quiz_snapshots")
+    if rows:
+        await execute("DELETE FROM quiz_snapshots")
+    return rows
+
+
+# === TOURNAMENTS ===
+async def register_tournament_chat(chat_id: int, title: Optional[str]):
+    await execute('''
+        INSERT INTO tournament_chats (chat_id, title) VALUES ($1, $2)
+        ON CONFLICT (chat_id) DO UPDATE SET title = EXCLUDED.title
+    ''', chat_id, title)
+
+async def unregister_tournament_chat(chat_id: int):
+    await execute("DELETE FROM tournament_chats WHERE chat_id = $1", chat_id)
+
+async def get_tournament_chats():
+    rows = await fetch("SELECT chat_id FROM tournament_chats ORDER BY registered_at")
+    return [r['chat_id'] for r in rows]
+
+async def create_tournament(start_at: float, subject: Optional[str], questions_count: int, seconds: int,
+                            created_by: Optional[int] = None) -> int:
+    query = '''INSERT INTO tournaments (start_at, subject, questions_count, seconds, created_by)
+        VALUES ($1, $2, $3, $4, $5) RETURNING id'''
+    return await insert_returning_id(query, start_at, subject, questions_count, seconds, created_by)
+
+async def get_tournament(tournament_id: int):
+    return await fetchrow("SELECT * FROM tournaments WHERE id = $1", tournament_id)
+
+async def get_scheduled_tournaments():
+    return await fetch("SELECT * FROM tournaments WHERE status = 'scheduled' ORDER BY start_at")
+
+async def set_tournament_status(tournament_id: int, status: str, report: Optional[str] = None):
+    if report is None:
+        await execute("UPDATE tournaments SET status = $1 WHERE id = $2", status, tournament_id)
+    else:
+        await execute("UPDATE tournaments SET status = $1, report = $2 WHERE id = $3", status, report, tournament_id)
+
+
+# === COMPACTION ===
+async def compact_rollups(now: float):
+    """
+    Kunlik tozalash: eskirgan FSM yozuvlari va quiz snapshotlari, crash'dan qolib
+    ketgan ochiq sessiyalar va javobsiz yopilgan sessiyalar.
+    Hisoblagich jadvallari (question_stats, chat_user_scores) inkremental, ularga tegilmaydi.
+    """
+    await execute_batch([
+        ("DELETE FROM fsm_storage WHERE expires_at < $1", (now,)),
+        ("DELETE FROM quiz_snapshots WHERE created_at < NOW() - INTERVAL '1 days'", ()),
+        ("UPDATE quiz_sessions SET is_active = 0 WHERE is_active = 1 AND created_at < NOW() - INTERVAL '1 days'", ()),
+        ('''DELETE FROM quiz_sessions
+            WHERE is_active = 0 AND created_at < NOW() - INTERVAL '1 days'
+              AND NOT EXISTS (SELECT 1 FROM user_answers ua WHERE ua.session_id = quiz_sessions.session_id)''', ()),
+    ])
+
+
 # === ADMIN MANAGEMENT ===
 async def add_admin(user_id: int):
     # Ensure user exists in users table first if needed, but foreign key constraint is not strictly enforced here for flexibility
@@ -244,20 +598,24 @@ async def add_admin(user_id: int):
         await execute("INSERT OR IGNORE INTO admins (user_id) VALUES (?)", user_id)
     else:
         await execute("INSERT INTO admins (user_id) VALUES ($1) ON CONFLICT DO NOTHING", user_id)
+    admins_cache.invalidate()
 
 async def remove_admin(user_id: int):
     await execute("DELETE FROM admins WHERE user_id = $1", user_id)
+    admins_cache.invalidate()
 
-async def get_admins_list():
+async def _load_admin_ids():
     rows = await fetch("SELECT user_id FROM admins")
-    return [r['user_id'] for r in rows]
+    return frozenset(r['user_id'] for r in rows)
+
+async def get_admins_list():
+    return sorted(await admins_cache.get_or_load('ids', _load_admin_ids))
 
 async def check_is_admin_db(user_id: int):
-    val = await fetchval("SELECT user_id FROM admins WHERE user_id = $1", user_id)
-    return val is not None
+    return user_id in await admins_cache.get_or_load('ids', _load_admin_ids)
 
 async def get_setting(key: str, default: str = None):
-    val = await fetchval("SELECT value FROM settings WHERE key = $1", key)
+    val = await settings_cache.get_or_load(key, lambda: fetchval("SELECT value FROM settings WHERE key = $1", key))
     return val if val is not None else default
 
 async def set_setting(key: str, value: str):
@@ -268,12 +626,17 @@ async def set_setting(key: str, value: str):
             INSERT INTO settings (key, value) VALUES ($1, $2)
             ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value
         ''', key, str(value))
+    settings_cache.invalidate(key)
+    changed("settings")
 
 
 # === SUBJECTS FUNKSIYALARI ===
-async def get_custom_subjects_list():
+async def _load_subjects():
     rows = await fetch("SELECT name FROM subjects")
-    return [r['name'] for r in rows]
+    return tuple(r['name'] for r in rows)
+
+async def get_custom_subjects_list():
+    return list(await subjects_cache.get_or_load('all', _load_subjects))
 
 async def add_custom_subject(name: str):
     # ON CONFLICT DO NOTHING is Postgres syntax
@@ -282,9 +645,13 @@ async def add_custom_subject(name: str):
         await execute("INSERT OR IGNORE INTO subjects (name) VALUES (?)", name)
     else:
         await execute("INSERT INTO subjects (name) VALUES ($1) ON CONFLICT DO NOTHING", name)
+    subjects_cache.invalidate()
+    changed("subjects")
 
 async def remove_custom_subject(name: str):
     await execute("DELETE FROM subjects WHERE name = $1", name)
+    subjects_cache.invalidate()
+    changed("subjects")
 
 # === USER FUNKSIYALARI ===
 async def get_or_create_user(user_id: int, username: str=None, first_name: str=None, last_name: str=None):
@@ -328,42 +695,96 @@ async def close_session(session_id: int):
     logger.info(f"🔴 Sessiya yopildi: ID={session_id}")
 
 # === ANSWER / SCORE FUNKSIYALARI ===
-async def save_user_answer(session_id: int, user_id: int, question_number: int, is_correct: bool):
-    await get_or_create_user(user_id)
+async def save_user_answer(session_id: int, user_id: int, question_number: int, is_correct: bool,
+                           question_id: Optional[int] = None, answer_ms: Optional[int] = None,
+                           chat_id: Optional[int] = None):
+    """
+    Javobni saqlaydi. user_answers, users, question_stats va chat_user_scores
+    bitta tranzaksiyada yangilanadi.
+    """
     score = 1 if is_correct else 0
+    if chat_id is None:
+        chat_id = await fetchval("SELECT chat_id FROM quiz_sessions WHERE session_id = $1", session_id)
     
     existing = await fetchrow('''
         SELECT is_correct, score FROM user_answers
         WHERE session_id = $1 AND user_id = $2 AND question_number = $3
     ''', session_id, user_id, question_number)
     
-    score_diff = 0
+    # Foydalanuvchi bo'lmasa yaratiladi (ism-familiya handlerda get_or_create_user orqali yoziladi)
+    statements = [
+        ("INSERT INTO users (user_id) VALUES ($1) ON CONFLICT (user_id) DO NOTHING", (user_id,)),
+    ]
+    new_answer = 0
     if existing:
         # SQLite returns Row object, can be indexed by name or integer
         # AsyncPG returns Record, also flex.
-        # Ensure we handle checking correctly
-        old_is_correct = existing['is_correct']
         old_score = existing['score']
         
-        await execute('''
+        statements.append(('''
             UPDATE user_answers
             SET is_correct = $1, score = $2
             WHERE session_id = $3 AND user_id = $4 AND question_number = $5
-        ''', 1 if is_correct else 0, score, session_id, user_id, question_number)
+        ''', (1 if is_correct else 0, score, session_id, user_id, question_number)))
         score_diff = score - old_score
     else:
-        await execute('''
-            INSERT INTO user_answers (session_id, user_id, question_number, is_correct, score)
-            VALUES ($1, $2, $3, $4, $5)
-        ''', session_id, user_id, question_number, 1 if is_correct else 0, score)
+        statements.append(('''
+            INSERT INTO user_answers (session_id, user_id, question_number, is_correct, score, question_id, answer_ms)
+            VALUES ($1, $2, $3, $4, $5, $6, $7)
+        ''', (session_id, user_id, question_number, 1 if is_correct else 0, score, question_id, answer_ms)))
         score_diff = score
+        new_answer = 1
+
+        if question_id is not None:
+            statements.append(('''
+                INSERT INTO question_stats (question_id, answered, correct, latency_total_ms)
+                VALUES ($1, 1, $2, $3)
+                ON CONFLICT (question_id) DO UPDATE
+                SET answered = question_stats.answered + 1,
+                    correct = question_stats.correct + EXCLUDED.correct,
+                    latency_total_ms = question_stats.latency_total_ms + EXCLUDED.latency_total_ms
+            ''', (question_id, score, answer_ms or 0)))
 
     if score_diff != 0:
-        await execute('''
+        statements.append(('''
             UPDATE users
             SET total_score = total_score + $1, coins = coins + $2
             WHERE user_id = $3
-        ''', score_diff, score_diff, user_id)
+        ''', (score_diff, score_diff, user_id)))
+
+    if chat_id is not None and (score_diff != 0 or new_answer):
+        statements.append(('''
+            INSERT INTO chat_user_scores (chat_id, user_id, score, answers, last_played)
+            VALUES ($1, $2, $3, $4, NOW())
+            ON CONFLICT (chat_id, user_id) DO UPDATE
+            SET score = chat_user_scores.score + EXCLUDED.score,
+                answers = chat_user_scores.answers + EXCLUDED.answers,
+                last_played = EXCLUDED.last_played
+        ''', (chat_id, user_id, score_diff, new_answer)))
+
+    await execute_batch(statements)
+    user_summary_cache.invalidate(user_id)
+    changed("answers")
+    return score_diff
+
+async def record_question_asked(question_id: int, times: int = 1):
+    await execute('''
+        INSERT INTO question_stats (question_id, asked) VALUES ($1, $2)
+        ON CONFLICT (question_id) DO UPDATE SET asked = question_stats.asked + EXCLUDED.asked
+    ''', question_id, times)
+
+async def get_question_difficulty(subject: Optional[str] = None):
+    """(id, answered, correct) har bir savol uchun; statistikasi yo'q savollar answered = 0"""
+    if subject:
+        return await fetch('''
+            SELECT q.id, COALESCE(s.answered, 0) AS answered, COALESCE(s.correct, 0) AS correct
+            FROM questions q LEFT JOIN question_stats s ON s.question_id = q.id
+            WHERE q.subject = $1
+        ''', subject)
+    return await fetch('''
+        SELECT q.id, COALESCE(s.answered, 0) AS answered, COALESCE(s.correct, 0) AS correct
+        FROM questions q LEFT JOIN question_stats s ON s.question_id = q.id
+    ''')
 
 # === REYTING / STATISTIKA FUNKSIYALARI ===
 async def get_session_results(session_id: int):
@@ -392,6 +813,10 @@ async def get_user_rank(user_id: int):
         return count + 1
     return None
 
+async def get_user_score(user_id: int):
+    """total_score; foydalanuvchi yo'q bo'lsa None (ensure_user dan farqli, qator yaratmaydi)"""
+    return await fetchval('SELECT total_score FROM users WHERE user_id = $1', user_id)
+
 # === SAVOL QO‘SHISH ===
 async def add_question(subject: str, question: str, options: list, correct_option_id: int, created_by: Optional[int] = None, image_url: Optional[str] = None):
     if len(options) != 4:
@@ -407,7 +832,19 @@ async def add_question(subject: str, question: str, options: list, correct_optio
     
     logger.info(f"➕ Yangi savol qo‘shildi: {subject} | {question}")
 
-async def search_questions(text: str = "", subject: Optional[str] = None, question_id: Optional[int] = None):
+async def add_questions_batch(rows: list, created_by: Optional[int] = None):
+    """rows: [(subject, question, [4 variant], correct_option_id), ...] — bitta tranzaksiya"""
+    await execute_many('''
+        INSERT INTO questions (subject, question, option1, option2, option3, option4, correct_option_id, created_by)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+    ''', [(s, q, o[0], o[1], o[2], o[3], c, created_by) for s, q, o, c in rows])
+
+async def set_question_file_id(question_id: int, file_id: str):
+    await execute("UPDATE questions SET image_file_id = $1 WHERE id = $2", file_id, question_id)
+
+async def search_questions(text: str = "", subject: Optional[str] = None, question_id: Optional[int] = None,
+                           limit: Optional[int] = None, before_id: Optional[int] = None):
+    """Yangilari birinchi (id DESC); keyingi sahifa: before_id = oldingi sahifaning oxirgi id si"""
     query = "SELECT id, subject, question, option1, option2, option3, option4, correct_option_id FROM questions WHERE 1=1"
     args = []
     i = 1
@@ -427,6 +864,16 @@ async def search_questions(text: str = "", subject: Optional[str] = None, questi
         query += f" AND question ILIKE ${i}" 
         args.append(f"%{text}%")
         i += 1
+
+    if before_id is not None:
+        query += f" AND id < ${i}"
+        args.append(before_id)
+        i += 1
+
+    query += " ORDER BY id DESC"
+    if limit:
+        query += f" LIMIT ${i}"
+        args.append(limit)
         
     return await fetch(query, *args)
 
@@ -457,26 +904,62 @@ async def delete_question(question_id: int):
 async def get_questions(subject: Optional[str] = None, limit: int = 20):
     if subject:
         rows = await fetch('''
-            SELECT id, subject, question, option1, option2, option3, option4, correct_option_id, image_url
+            SELECT id, subject, question, option1, option2, option3, option4, correct_option_id, image_url, image_file_id
             FROM questions WHERE subject = $1 ORDER BY RANDOM() LIMIT $2
         ''', subject, limit)
     else:
         rows = await fetch('''
-            SELECT id, subject, question, option1, option2, option3, option4, correct_option_id, image_url
+            SELECT id, subject, question, option1, option2, option3, option4, correct_option_id, image_url, image_file_id
             FROM questions ORDER BY RANDOM() LIMIT $1
         ''', limit)
 
-    return [
-        {
-            "id": row['id'],
-            "subject": row['subject'],
-            "question": row['question'],
-            "options": [row['option1'], row['option2'], row['option3'], row['option4']],
-            "correct_option_id": row['correct_option_id'],
-            "image_url": row['image_url']
-        }
-        for row in rows
-    ]
+    return [_question_dict(row) for row in rows]
+
+def _question_dict(row) -> dict:
+    return {
+        "id": row['id'],
+        "subject": row['subject'],
+        "question": row['question'],
+        "options": [row['option1'], row['option2'], row['option3'], row['option4']],
+        "correct_option_id": row['correct_option_id'],
+        "image_url": row['image_url'],
+        "image_file_id": row['image_file_id']
+    }
+
+async def get_question_ids(subject: Optional[str] = None):
+    if subject:
+        rows = await fetch("SELECT id FROM questions WHERE subject = $1 ORDER BY id", subject)
+    else:
+        rows = await fetch("SELECT id FROM questions ORDER BY id")
+    return [r['id'] for r in rows]
+
+async def get_questions_by_ids(ids: list):
+    """Savollarni berilgan id tartibida qaytaradi"""
+    if not ids:
+        return []
+    placeholders = ", ".join(f"${i}" for i in range(1, len(ids) + 1))
+    rows = await fetch(f'''
+        SELECT id, subject, question, option1, option2, option3, option4, correct_option_id, image_url, image_file_id
+        FROM questions WHERE id IN ({placeholders})
+    ''', *ids)
+    by_id = {row['id']: _question_dict(row) for row in rows}
+    return [by_id[i] for i in ids if i in by_id]
+
+async def get_seen_bits(chat_id: int, subject: str):
+    row = await fetchrow("SELECT bits FROM chat_seen_questions WHERE chat_id = $1 AND subject = $2", chat_id, subject)
+    return bytes(row['bits']) if row and row['bits'] is not None else None
+
+async def save_seen_bits(chat_id: int, subject: str, bits: bytes):
+    if DB_TYPE == 'sqlite':
+        await execute(
+            "INSERT OR REPLACE INTO chat_seen_questions (chat_id, subject, bits, updated_at) VALUES (?, ?, ?, CURRENT_TIMESTAMP)",
+            chat_id, subject, bits
+        )
+    else:
+        await execute('''
+            INSERT INTO chat_seen_questions (chat_id, subject, bits, updated_at) VALUES ($1, $2, $3, NOW())
+            ON CONFLICT (chat_id, subject) DO UPDATE SET bits = EXCLUDED.bits, updated_at = EXCLUDED.updated_at
+        ''', chat_id, subject, bits)
 
 async def get_questions_count(subject: Optional[str] = None):
     if subject:
@@ -484,43 +967,117 @@ async def get_questions_count(subject: Optional[str] = None):
     else:
         return await fetchval('SELECT COUNT(*) FROM questions')
 
+async def get_subject_counts():
+    rows = await fetch("SELECT subject, COUNT(*) AS cnt FROM questions GROUP BY subject")
+    return {r['subject']: r['cnt'] for r in rows}
+
 async def get_group_rating(chat_id: int, limit: int = 10):
+    # chat_user_scores (chat_id, score DESC) indeksi bo'yicha
     return await fetch('''
         SELECT 
             u.user_id, 
             u.username, 
             u.first_name, 
-            SUM(ua.score) AS group_score
-        FROM user_answers ua
-        JOIN users u ON ua.user_id = u.user_id
-        JOIN quiz_sessions qs ON ua.session_id = qs.session_id
-        WHERE qs.chat_id = $1
-        GROUP BY u.user_id, u.username, u.first_name
-        ORDER BY group_score DESC
+            cs.score AS group_score
+        FROM chat_user_scores cs
+        JOIN users u ON cs.user_id = u.user_id
+        WHERE cs.chat_id = $1
+        ORDER BY cs.score DESC
         LIMIT $2
     ''', chat_id, limit)
 
+async def get_group_rank(chat_id: int, user_id: int):
+    score = await fetchval("SELECT score FROM chat_user_scores WHERE chat_id = $1 AND user_id = $2", chat_id, user_id)
+    if score is None:
+        return None
+    count = await fetchval("SELECT COUNT(*) FROM chat_user_scores WHERE chat_id = $1 AND score > $2", chat_id, score)
+    return count + 1
+
+async def rebuild_chat_scores():
+    """chat_user_scores ni butun tarixdan qayta hisoblaydi (backfill)"""
+    await execute_batch([
+        ("DELETE FROM chat_user_scores", ()),
+        ('''
+            INSERT INTO chat_user_scores (chat_id, user_id, score, answers, last_played)
+            SELECT qs.chat_id, ua.user_id, SUM(ua.score), COUNT(*), MAX(qs.created_at)
+            FROM user_answers ua
+            JOIN quiz_sessions qs ON ua.session_id = qs.session_id
+            WHERE qs.chat_id IS NOT NULL
+            GROUP BY qs.chat_id, ua.user_id
+        ''', ()),
+    ])
+    count = await fetchval("SELECT COUNT(*) FROM chat_user_scores")
+    logger.info(f"♻️ chat_user_scores qayta hisoblandi: {count} qator")
+    return count
+
 async def get_top_users(limit=10):
     return await fetch("SELECT user_id, username, coins FROM users ORDER BY coins DESC LIMIT $1", limit)
 
 async def reset_all_coins():
     await execute("UPDATE users SET coins = 0")
+    user_summary_cache.invalidate()
 
 async def get_user_stats(user_id: int):
-    correct = await fetchval("SELECT COUNT(*) FROM user_answers WHERE user_id = $1 AND is_correct = 1", user_id)
-    incorrect = await fetchval("SELECT COUNT(*) FROM user_answers WHERE user_id = $1 AND is_correct = 0", user_id)
-    return {"total": correct + incorrect, "correct": correct, "incorrect": incorrect}
+    row = await fetchrow(
+        "SELECT COUNT(*) AS total, COALESCE(SUM(is_correct), 0) AS correct FROM user_answers WHERE user_id = $1",
+        user_id
+    )
+    total, correct = int(row['total']), int(row['correct'])
+    return {"total": total, "correct": correct, "incorrect": total - correct}
+
+async def ensure_user(user_id: int):
+    """Foydalanuvchi qatorini qaytaradi; yo'q bo'lsa yaratadi (mavjud ismni o'chirmaydi)"""
+    await execute("INSERT INTO users (user_id) VALUES ($1) ON CONFLICT (user_id) DO NOTHING", user_id)
+    return await fetchrow('SELECT * FROM users WHERE user_id = $1', user_id)
 
-async def get_ranking_by_period(period: str = "all", limit: int = 10):
+async def _load_user_summary(user_id: int):
+    row = await ensure_user(user_id)
+    stats, higher = await asyncio.gather(
+        get_user_stats(user_id),
+        fetchval('SELECT COUNT(*) FROM users WHERE total_score > $1', row['total_score'])
+    )
+    return row, stats, higher + 1
+
+async def get_user_summary(user_id: int):
+    """(user row, stats, rank) — Mini App uchun, qisqa muddatli keshda"""
+    return await user_summary_cache.get_or_load(user_id, lambda: _load_user_summary(user_id))
+
+async def get_ranking_by_period(period: str = "all", limit: int = 10, after: Optional[tuple] = None):
+    """
+    after: oldingi sahifaning oxirgi (score, user_id) kaliti. Tartib: score DESC, user_id ASC.
+    Faqat birinchi sahifa 30 soniya keshda turadi (Mini App har ochilganda qayta hisoblamaslik uchun).
+    """
+    if after is not None:
+        return await _load_ranking(period, limit, after)
+    return await rankings_cache.get_or_load((period, limit), lambda: _load_ranking(period, limit))
+
+async def _load_ranking(period: str, limit: int, after: Optional[tuple] = None):
     if period == "all":
+        # idx_users_score (total_score DESC, user_id) bo'yicha: chuqur sahifa ham birinchisidek arzon
+        if after is None:
+            return await fetch('''
+                SELECT user_id, username, first_name, total_score 
+                FROM users 
+                ORDER BY total_score DESC, user_id
+                LIMIT $1
+            ''', limit)
+        # Shart "total_score <= X AND (...)" shaklida: tashqi AND indeksga diapazon
+        # chegarasini beradi (OR ko'rinishida planner butun indeksni o'qishi mumkin)
         return await fetch('''
-            SELECT user_id, username, first_name, total_score 
-            FROM users 
-            ORDER BY total_score DESC 
-            LIMIT $1
-        ''', limit)
+            SELECT user_id, username, first_name, total_score
+            FROM users
+            WHERE total_score <= $1 AND (total_score < $2 OR user_id > $3)
+            ORDER BY total_score DESC, user_id
+            LIMIT $4
+        ''', after[0], after[0], after[1], limit)
     else:
         interval = "7 days" if period == "week" else "1 month"
+        # Davr yig'indisi har sahifada qayta hisoblanadi; kalit HAVING da solishtiriladi.
+        # SQLite da $n -> ? bo'ladi, shuning uchun parametrlar matndagi tartibda
+        having, args = "", [limit]
+        if after:
+            having = "HAVING SUM(ua.score) <= $1 AND (SUM(ua.score) < $2 OR u.user_id > $3)"
+            args = [after[0], after[0], after[1], limit]
         
         # We use explicit string formatting for interval to let _convert_to_sqlite handle regex
         query = f'''
@@ -530,13 +1087,14 @@ async def get_ranking_by_period(period: str = "all", limit: int = 10):
             JOIN quiz_sessions qs ON ua.session_id = qs.session_id
             WHERE qs.created_at >= NOW() - INTERVAL '{interval}'
             GROUP BY u.user_id, u.username, u.first_name
-            ORDER BY period_score DESC
-            LIMIT {limit}
+            {having}
+            ORDER BY period_score DESC, u.user_id
+            LIMIT ${len(args)}
         '''
-        return await fetch(query)
+        return await fetch(query, *args)
 
 async def get_exchange_rate():
-    val = await fetchval("SELECT value FROM settings WHERE key = 'exchange_rate'")
+    val = await get_setting('exchange_rate')
     return float(val) if val else 100.0
 
 async def set_exchange_rate(rate: float):
@@ -549,6 +1107,8 @@ async def set_exchange_rate(rate: float):
             INSERT INTO settings (key, value) VALUES ('exchange_rate', $1)
             ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value
         ''', str(rate))
+    settings_cache.invalidate('exchange_rate')
+    changed("settings")
 
 async def create_withdrawal(user_id: int, coins: int, money: float):
     current_coins = await fetchval("SELECT coins FROM users WHERE user_id = $1", user_id)
@@ -561,20 +1121,67 @@ async def create_withdrawal(user_id: int, coins: int, money: float):
         "INSERT INTO withdrawals (user_id, amount_coins, amount_money) VALUES ($1, $2, $3)", 
         user_id, coins, money
     )
+    user_summary_cache.invalidate(user_id)
     return True, "So'rov muvaffaqiyatli yuborildi."
 
-async def get_pending_withdrawals():
-    return await fetch('''
+async def get_pending_withdrawals(limit: Optional[int] = None, after_id: Optional[int] = None):
+    """Eskilari birinchi (id ASC); keyingi sahifa: after_id = oldingi sahifaning oxirgi id si"""
+    query = '''
         SELECT w.id, w.user_id, u.username, w.amount_coins, w.amount_money, w.created_at
         FROM withdrawals w
         JOIN users u ON w.user_id = u.user_id
-        WHERE w.status = 'pending'
+        WHERE w.status = 'pending' AND w.id > $1
+        ORDER BY w.id
+    '''
+    if limit:
+        return await fetch(query + " LIMIT $2", after_id or 0, limit)
+    return await fetch(query, after_id or 0)
+
+# === EKSPORT (database.stream orqali, xotirada faqat bitta batch) ===
+def export_questions(subject: Optional[str] = None):
+    query = '''
+        SELECT id, subject, question, option1, option2, option3, option4,
+               correct_option_id, image_url, created_by, created_at
+        FROM questions
+    '''
+    if subject:
+        return stream(query + " WHERE subject = $1 ORDER BY id", subject)
+    return stream(query + " ORDER BY id")
+
+def export_answers(since: datetime, until: datetime):
+    # user_answers da vaqt yo'q: sessiya boshlangan vaqt bo'yicha filtrlanadi
+    return stream('''
+        SELECT ua.id, ua.session_id, qs.chat_id, qs.created_at AS session_started,
+               ua.user_id, ua.question_number, ua.question_id, ua.is_correct, ua.score, ua.answer_ms
+        FROM user_answers ua
+        JOIN quiz_sessions qs ON ua.session_id = qs.session_id
+        WHERE qs.created_at >= $1 AND qs.created_at < $2
+        ORDER BY ua.id
+    ''', since, until)
+
+def export_rankings():
+    return stream('''
+        SELECT ROW_NUMBER() OVER (ORDER BY total_score DESC, user_id) AS rank,
+               user_id, username, first_name, last_name, total_score, coins
+        FROM users
+        ORDER BY total_score DESC, user_id
     ''')
 
+def export_withdrawals(status: Optional[str] = None):
+    query = '''
+        SELECT w.id, w.user_id, u.username, w.amount_coins, w.amount_money, w.status, w.created_at
+        FROM withdrawals w
+        LEFT JOIN users u ON w.user_id = u.user_id
+    '''
+    if status:
+        return stream(query + " WHERE w.status = $1 ORDER BY w.id", status)
+    return stream(query + " ORDER BY w.id")
+
 async def update_withdrawal_status(withdrawal_id: int, status: str):
     if status == 'rejected':
         row = await fetchrow("SELECT user_id, amount_coins FROM withdrawals WHERE id = $1", withdrawal_id)
         if row:
             await execute("UPDATE users SET coins = coins + $1 WHERE user_id = $2", row['amount_coins'], row['user_id'])
+            user_summary_cache.invalidate(row['user_id'])
     
     await execute("UPDATE withdrawals SET status = $1 WHERE id = $2", status, withdrawal_id)
\ No newline at end of file
@@ -1,6 +1,9 @@
 import asyncio
 from bot.config import BOT_TOKEN 
-from database import add_question, get_questions_count, init_db
+from database import add_question, get_subject_counts, init_db, get_setting, set_setting
+
+# Bump when INITIAL_QUESTIONS changes so existing deployments re-check the seed
+SEED_VERSION = '1'
 
 INITIAL_QUESTIONS = {
     "english": [
@@ -93,11 +96,16 @@ INITIAL_QUESTIONS = {
     ]
 }
 
-async def init_questions():
-    """Boshlang'ich savollarni qo'shish"""
-    await init_db()
+async def init_questions(init: bool = True):
+    """Boshlang'ich savollarni qo'shish (init=False: baza allaqachon ochilgan, startup dan)"""
+    if init:
+        await init_db()
+    if await get_setting('seed_version') == SEED_VERSION:
+        return
+
+    counts = await get_subject_counts()
     for subject, questions in INITIAL_QUESTIONS.items():
-        count = await get_questions_count(subject)
+        count = counts.get(subject, 0)
         if count == 0:
             print(f"{subject.capitalize()} fani uchun savollar qo'shilmoqda...")
             for q_text, options, correct_id in questions:
@@ -105,6 +113,7 @@ async def init_questions():
             print(f"{subject.capitalize()}: {len(questions)} ta savol qo'shildi ✓")
         else:
             print(f"{subject.capitalize()}: {count} ta savol allaqachon mavjud")
+    await set_setting('seed_version', SEED_VERSION)
 
 if __name__ == "__main__":
     asyncio.run(init_questions())
@@ -1,3 +1,7 @@
+import time
+# Measured before the heavy imports, for the startup report
+PROCESS_STARTED = time.monotonic()
+
 import asyncio
 import os
 import logging
@@ -9,25 +13,49 @@ from bot.loader import bot, dp
 from bot.handlers import router as main_router
 from bot.utils import get_all_subjects
 from database import (
-    init_db, get_user_stats, get_or_create_user, get_user_rank,
+    init_db, get_user_summary,
     get_ranking_by_period, get_exchange_rate, create_withdrawal,
     get_group_rating, get_admin_dashboard_stats, search_questions,
-    delete_question, add_question, get_pending_withdrawals, update_withdrawal_status,
+    delete_question, add_question, add_questions_batch, get_pending_withdrawals, update_withdrawal_status,
     set_exchange_rate, get_custom_subjects_list, add_custom_subject, remove_custom_subject,
     check_is_admin_db, add_admin, remove_admin, get_admins_list, get_setting, set_setting
 )
-from bot.config import ADMIN_IDS
+from bot.config import (
+    ADMIN_IDS, BOT_MODE, WEBHOOK_BASE_URL, WEBHOOK_PATH, WEB_ROOT, STATIC_DEV,
+    ADMIN_PAGE_SIZE, RANKINGS_PAGE_SIZE, RATE_LIMIT_ENABLED
+)
+from bot.webhook import handle_webhook, start_webhook
+from bot.pipeline import pipeline
+from bot.http_cache import response_cache
+from bot.metrics import http_middleware, bind_routes, handle_metrics
+from bot.profiler import loop_monitor, handle_profile, handle_stalls
+from bot.ratelimit import rate_limiter
+from bot.pagination import decode_cursor, page, page_limit
+from bot.static import StaticAssets
+from bot.live import live_hub
+from bot import importer
+from bot.export import handle_export
+from bot.importer import parse_txt_line
+from bot.question_bank import invalidate_index
+from bot.startup import PhaseReport
+from bot.shutdown import shutdown, resume_quizzes
+from bot.scheduler import start_scheduler
+from bot.warmup import warmup
+from init_questions import init_questions
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # --- WEB HANDLERS ---
+# Xotiradan, oldindan siqilgan holda (main() da yuklanadi)
+static_assets = StaticAssets(WEB_ROOT, dev=STATIC_DEV)
+
 async def handle_index(request):
-    return web.FileResponse('./web/index.html')
+    return static_assets.response(request, 'index.html')
 
 async def handle_admin(request):
-    return web.FileResponse('./web/admin.html')
+    return static_assets.response(request, 'admin.html')
 
 def get_user_id_from_header(request):
     uid = request.headers.get("X-User-ID")
@@ -41,23 +69,42 @@ async def is_admin(request):
     if str(uid) in ADMIN_IDS: return True
     return await check_is_admin_db(uid)
 
+class AppState:
+    """
+    Jarayon holati: main() da app muzlashidan oldin bitta obyekt qo'yiladi,
+    keyin faqat atributlari o'zgaradi (ishga tushgan app ga yangi kalit yozilmaydi).
+    """
+
+    def __init__(self, imports_done: float, ready: bool):
+        self.imports_done = imports_done
+        self.ready = ready
+        self.startup_report = None
+        self.polling = None
+        self.warmup = None
+
+
+APP_STATE = web.AppKey("state", AppState)
+
+# --- HEALTH ---
+async def health_live(request):
+    return web.json_response({"alive": True})
+
+async def health_ready(request):
+    """Baza ochilgan va keshlar isitilgan bo'lsa 200"""
+    state = request.app[APP_STATE]
+    report = state.startup_report
+    data = {"ready": state.ready, "startup": report.as_dict() if report else None}
+    return web.json_response(data, status=200 if data["ready"] else 503)
+
 # --- CLIENT API ---
-async def api_user_stats(request):
-    uid = get_user_id_from_header(request)
-    if not uid:
-        return web.json_response({"error": "Unauthorized"}, status=401)
-    
-    row = await get_or_create_user(uid) 
-    if not row:
-         return web.json_response({"error": "User not found"}, status=404)
-    
-    stats = await get_user_stats(uid)
-    rank = await get_user_rank(uid)
-    
-    name = row[2]
+# Payload builderlar: alohida endpointlar va /api/bootstrap birgalikda ishlatadi
+async def user_payload(uid: int) -> dict:
+    row, stats, rank = await get_user_summary(uid)
+
+    name = row[2] or ""
     if row[3]: name += f" {row[3]}"
-    
-    data = {
+
+    return {
         "user": {
             "id": row[0],
             "name": name,
@@ -68,26 +115,77 @@ async def api_user_stats(request):
         "stats": stats,
         "rank": rank
     }
-    return web.json_response(data)
 
+def ranking_item(r) -> dict:
+    name = r[2] or f"User {r[0]}"
+    if r[1]: name = f"@{r[1]}"
+    return {"name": name, "score": r[3]}
+
+async def rankings_page(period: str, limit: int = RANKINGS_PAGE_SIZE, after: tuple | None = None) -> tuple:
+    # Kalit: (score, user_id) — get_ranking_by_period tartibi bilan bir xil
+    rows = await get_ranking_by_period(period, limit=limit + 1, after=after)
+    rows, next_cursor = page(rows, limit, lambda r: (r[3], r[0]))
+    return [ranking_item(r) for r in rows], next_cursor
+
+async def rankings_payload(period: str) -> list:
+    items, _ = await rankings_page(period)
+    return items
+
+async def exchange_payload() -> dict:
+    return {"rate": await get_exchange_rate()}
+
+async def api_user_stats(request):
+    uid = get_user_id_from_header(request)
+    if not uid:
+        return web.json_response({"error": "Unauthorized"}, status=401)
+    return web.json_response(await user_payload(uid))
+
+@response_cache.cached(ttl=30, tags=("rankings",))
 async def api_rankings(request):
-    period = request.query.get("period", "all")
-    rows = await get_ranking_by_period(period, limit=20)
-    
-    results = []
-    for r in rows:
-        name = r[2] or f"User {r[0]}"
-        if r[1]: name = f"@{r[1]}"
-        
-        results.append({
-            "name": name,
-            "score": r[3]
-        })
-    return web.json_response(results)
+    return web.json_response(await rankings_payload(request.query.get("period", "all")))
 
+@response_cache.cached(ttl=30, tags=("rankings",))
+async def api_rankings_page(request):
+    """?period=all|week|month&limit=&cursor= -> {"items": [...], "next": cursor | null}"""
+    try:
+        after = decode_cursor(request.query.get("cursor"), int, int)
+    except ValueError:
+        return web.json_response({"error": "Invalid cursor"}, status=400)
+    limit = page_limit(request.query, RANKINGS_PAGE_SIZE)
+    items, next_cursor = await rankings_page(request.query.get("period", "all"), limit, after)
+    return web.json_response({"items": items, "next": next_cursor})
+
+@response_cache.cached(ttl=300, tags=("settings",))
 async def api_exchange_info(request):
-    rate = await get_exchange_rate()
-    return web.json_response({"rate": rate})
+    return web.json_response(await exchange_payload())
+
+BOOTSTRAP_FIELDS = ("user", "stats", "rank", "top", "exchange")
+
+async def api_bootstrap(request):
+    """
+    Mini App birinchi ekrani uchun bitta so'rov: ?fields=user,stats,rank,top,exchange&period=all
+    Tanlangan qismlar keshlardan parallel olinadi.
+    """
+    fields = request.query.get("fields")
+    fields = set(fields.split(",")) & set(BOOTSTRAP_FIELDS) if fields else set(BOOTSTRAP_FIELDS)
+
+    jobs = {}
+    if fields & {"user", "stats", "rank"}:
+        uid = get_user_id_from_header(request)
+        if not uid:
+            return web.json_response({"error": "Unauthorized"}, status=401)
+        jobs["summary"] = user_payload(uid)
+    if "top" in fields:
+        jobs["top"] = rankings_payload(request.query.get("period", "all"))
+    if "exchange" in fields:
+        jobs["exchange"] = exchange_payload()
+
+    results = dict(zip(jobs, await asyncio.gather(*jobs.values())))
+    data = {f: results["summary"][f] for f in ("user", "stats", "rank") if f in fields}
+    for f in ("top", "exchange"):
+        if f in results:
+            data[f] = results[f]
+    return web.json_response(data)
 
 async def api_exchange_request(request):
     uid = get_user_id_from_header(request)
@@ -129,6 +227,7 @@ async def api_admin_stats(request):
     stats = await get_admin_dashboard_stats()
     return web.json_response(stats)
 
+@response_cache.cached(ttl=300, tags=("subjects",), guard=is_admin, private=True)
 async def api_admin_subjects(request):
     if not await is_admin(request): return web.json_response({"error": "Forbidden"}, status=403)
     
@@ -162,6 +261,7 @@ async def api_admin_add_question(request):
             correct_option_id=data['correct_option'], # 0-3
             created_by=get_user_id_from_header(request)
         )
+        invalidate_index(data['subject'])
         return web.json_response({"success": True})
     except Exception as e:
         logger.error(f"Error adding question: {e}")
@@ -173,39 +273,50 @@ async def api_admin_bulk_txt(request):
     subject = data.get('subject')
     text = data.get('text', '')
     
-    lines = [l.strip() for l in text.split('\n') if l.strip()]
-    added = 0
+    # Format: Question | v1, v2, v3, v4 | answer (1-4)
+    rows = []
     errors = 0
-    
-    for line in lines:
-        # Format: Question | v1, v2, v3, v4 | answer (1-4)
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
         try:
-            parts = [p.strip() for p in line.split('|')]
-            if len(parts) < 3: raise ValueError("Invalid format")
-            
-            q_text = parts[0]
-            opts = [o.strip() for o in parts[1].split(',')]
-            
-            # Answer can be index 1-4 or the text itself? Protocol says 1-4.
-            # If user provides text, we might want to match. But let's assume index for simplicity as per admin.py
-            ans_raw = parts[2]
-            if ans_raw.isdigit():
-                correct = int(ans_raw) - 1
-            else:
-                # Try to find index
-                correct = -1
-                # TODO: advanced matching if needed
-                
-            if len(opts) != 4 or not (0 <= correct <= 3):
-                raise ValueError("Options or answer invalid")
-                
-            await add_question(subject, q_text, opts, correct, get_user_id_from_header(request))
-            added += 1
-        except:
+            rows.append(parse_txt_line(line, subject))
+        except ValueError:
             errors += 1
-            
+
+    added = 0
+    created_by = get_user_id_from_header(request)
+    if rows:
+        try:
+            await add_questions_batch(rows, created_by)
+            added = len(rows)
+        except Exception as e:
+            # Batch bitta tranzaksiya: bitta yomon qator hammasini rad etadi,
+            # shuning uchun qatorma-qator qayta yoziladi (avvalgi xatti-harakat)
+            logger.warning("bulk_txt batch xato (%s), qatorma-qator yoziladi", e)
+            for row in rows:
+                try:
+                    await add_question(*row, created_by)
+                    added += 1
+                except Exception:
+                    errors += 1
+    invalidate_index(subject)
     return web.json_response({"added": added, "errors": errors})
 
+async def api_admin_import(request):
+    """Katta fayllar uchun: body oqim bilan o'qiladi, 500 talik batch'larda yoziladi (bot/importer.py)"""
+    if not await is_admin(request): return web.json_response({"error": "Forbidden"}, status=403)
+    return await importer.handle_import(request, get_user_id_from_header(request))
+
+async def api_admin_import_status(request):
+    if not await is_admin(request): return web.json_response({"error": "Forbidden"}, status=403)
+    return await importer.handle_status(request)
+
+async def api_admin_import_events(request):
+    if not await is_admin(request): return web.json_response({"error": "Forbidden"}, status=403)
+    return await importer.handle_events(request)
+
 async def api_admin_bulk_pairs(request):
     if not await is_admin(request): return web.json_response({"error": "Forbidden"}, status=403)
     data = await request.json()
@@ -282,18 +393,27 @@ async def api_admin_bulk_pairs(request):
         else:
             errors += 1
             
+    invalidate_index(subject)
     return web.json_response({"added": added, "errors": errors})
 
 async def api_admin_search(request):
+    """?q=&subject=&limit=&cursor= -> {"items": [...], "next": cursor | null}, yangilari birinchi"""
     if not await is_admin(request): return web.json_response({"error": "Forbidden"}, status=403)
     
     q = request.query.get('q', '')
     subj = request.query.get('subject')
+    try:
+        after = decode_cursor(request.query.get('cursor'), int)
+    except ValueError:
+        return web.json_response({"error": "Invalid cursor"}, status=400)
+    limit = page_limit(request.query, ADMIN_PAGE_SIZE)
     
     # Try to parse 'q' as ID if it's digit
     qid = int(q) if q.isdigit() else None
     
-    rows = await search_questions(text=q, subject=subj if subj else None, question_id=qid)
+    rows = await search_questions(text=q, subject=subj if subj else None, question_id=qid,
+                                  limit=limit + 1, before_id=after[0] if after else None)
+    rows, next_cursor = page(rows, limit, lambda r: (r[0],))
     
     res = []
     for r in rows:
@@ -305,19 +425,28 @@ async def api_admin_search(request):
             "options": [r[3], r[4], r[5], r[6]],
             "correct_option_id": r[7]
         })
-    return web.json_response(res)
+    return web.json_response({"items": res, "next": next_cursor})
 
 async def api_admin_delete_question(request):
     if not await is_admin(request): return web.json_response({"error": "Forbidden"}, status=403)
     qid = request.query.get('id')
     if qid and qid.isdigit():
         await delete_question(int(qid))
+        invalidate_index()
         return web.json_response({"success": True})
     return web.json_response({"error": "Invalid ID"})
 
 async def api_admin_withdrawals(request):
+    """?limit=&cursor= -> {"items": [...], "next": cursor | null}, eskilari birinchi"""
     if not await is_admin(request): return web.json_response({"error": "Forbidden"}, status=403)
-    rows = await get_pending_withdrawals()
+    try:
+        after = decode_cursor(request.query.get('cursor'), int)
+    except ValueError:
+        return web.json_response({"error": "Invalid cursor"}, status=400)
+    limit = page_limit(request.query, ADMIN_PAGE_SIZE)
+
+    rows = await get_pending_withdrawals(limit=limit + 1, after_id=after[0] if after else None)
+    rows, next_cursor = page(rows, limit, lambda r: (r[0],))
     res = []
     for r in rows:
         # id, user_id, username, coins, money, date
@@ -329,7 +458,11 @@ async def api_admin_withdrawals(request):
             "amount_money": r[4],
             "created_at": r[5]
         })
-    return web.json_response(res)
+    return web.json_response({"items": res, "next": next_cursor}, dumps=lambda d: json.dumps(d, default=str))
+
+async def api_admin_export(request):
+    if not await is_admin(request): return web.json_response({"error": "Forbidden"}, status=403)
+    return await handle_export(request)
 
 async def api_admin_withdrawal_decision(request):
     if not await is_admin(request): return web.json_response({"error": "Forbidden"}, status=403)
@@ -396,26 +529,79 @@ async def api_admin_manage_admins(request):
             return web.json_response({"success": True})
         return web.json_response({"error": "Invalid ID"})
 
+async def api_admin_pipeline(request):
+    if not await is_admin(request): return web.json_response({"error": "Forbidden"}, status=403)
+    return web.json_response(pipeline.snapshot())
+
+async def api_admin_profile(request):
+    if not await is_admin(request): return web.json_response({"error": "Forbidden"}, status=403)
+    return await handle_profile(request)
+
+async def api_admin_loop_stalls(request):
+    if not await is_admin(request): return web.json_response({"error": "Forbidden"}, status=403)
+    return await handle_stalls(request)
+
 
 # --- APP SETUP ---
 async def on_startup(app):
-    await init_db()
-    
-    # Try init questions
-    try:
-        from init_questions import init_questions
-        await init_questions()
-    except Exception:
-        pass
-        
-    dp.include_router(main_router)
-    
-    # Start bot polling in background
-    asyncio.create_task(dp.start_polling(bot))
-    logger.info("Bot polling started in background.")
+    state = app[APP_STATE]
+    report = PhaseReport(PROCESS_STARTED, title="Startup")
+    report.add("imports", state.imports_done - PROCESS_STARTED)
+    state.startup_report = report
+
+    # Kritik: baza va sxema (versiya belgisi mos bo'lsa tekshiruvlarsiz)
+    async with report.phase("database"):
+        await init_db()
+
+    async with report.phase("routers"):
+        dp.include_router(main_router)
+
+    if BOT_MODE == "webhook":
+        # Route allaqachon ulangan; set_webhook tarmoq so'rovi, serverni kutdirmaydi
+        report.background("webhook", start_webhook(WEBHOOK_BASE_URL.rstrip('/') + WEBHOOK_PATH))
+    else:
+        # Start bot polling in background; SIGTERM is handled by aiohttp (on_shutdown)
+        state.polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, close_bot_session=False))
+        logger.info("Bot polling started in background.")
+
+    # Oldingi jarayon to'xtashda saqlagan quizlar
+    report.background("resume_quizzes", resume_quizzes())
 
-async def main():
-    app = web.Application()
+    # Haftalik reyting, compaction va rejalashtirilgan turnirlar
+    report.background("scheduler", start_scheduler())
+
+    # Kritik emas: boshlang'ich savollar (seed_version belgisi bilan)
+    seed = report.background("seed_questions", init_questions(init=False))
+
+    # Keshlar isitilgach readiness 200 qaytaradi
+    async def warm():
+        await asyncio.wait({seed})
+        state.warmup = await warmup()
+        state.ready = True
+    report.background("warmup", warm())
+    report.log()
+
+async def on_shutdown(app):
+    app[APP_STATE].ready = False
+    await shutdown()
+
+async def start_loop_monitor(app):
+    loop_monitor.start()
+
+async def stop_loop_monitor(app):
+    loop_monitor.stop()
+
+async def main(start_bot: bool = True):
+    """start_bot=False: faqat web/API (benchmark va testlar uchun, bazani chaqiruvchi o'zi ochadi)"""
+    # metrika -> rate limit / load shedding -> javob keshi
+    middlewares = [http_middleware]
+    if RATE_LIMIT_ENABLED:
+        middlewares.append(rate_limiter.middleware)
+    middlewares.append(response_cache.middleware)
+    app = web.Application(middlewares=middlewares)
+    app[APP_STATE] = AppState(imports_done=time.monotonic(), ready=not start_bot)
+    static_assets.load()
+    live_hub.leaderboard_loader = lambda: rankings_payload("all")
     
     cors = aiohttp_cors.setup(app, defaults={
         "*": aiohttp_cors.ResourceOptions(
@@ -428,12 +614,20 @@ async def main():
     # Routes
     app.router.add_get('/', handle_index)
     app.router.add_get('/admin', handle_admin)  # NEW ADMIN ROUTE
-    app.router.add_static('/web/', path='./web', name='web')
+    app.router.add_get('/web/{name}', static_assets.handle, name='web')
+    
+    # Health (Railway healthcheck / load balancer)
+    app.router.add_get('/health/live', health_live)
+    app.router.add_get('/health/ready', health_ready)
+    app.router.add_get('/metrics', handle_metrics)
     
     # API Client
     app.router.add_get('/api/user/stats', api_user_stats)
     app.router.add_get('/api/rankings', api_rankings)
+    app.router.add_get('/api/rankings/page', api_rankings_page)
     app.router.add_get('/api/exchange/info', api_exchange_info)
+    app.router.add_get('/api/bootstrap', api_bootstrap)
+    app.router.add_get('/api/live', live_hub.handle)
     app.router.add_post('/api/exchange/request', api_exchange_request)
     
     # API Admin
@@ -445,11 +639,15 @@ async def main():
     app.router.add_post('/api/admin/questions/add', api_admin_add_question)
     app.router.add_post('/api/admin/questions/bulk_txt', api_admin_bulk_txt)
     app.router.add_post('/api/admin/questions/bulk_pairs', api_admin_bulk_pairs)
+    app.router.add_post('/api/admin/questions/import', api_admin_import)
+    app.router.add_get('/api/admin/import/{job_id}', api_admin_import_status)
+    app.router.add_get('/api/admin/import/{job_id}/events', api_admin_import_events)
     app.router.add_get('/api/admin/questions/search', api_admin_search)
     app.router.add_delete('/api/admin/questions/delete', api_admin_delete_question)
     
     app.router.add_get('/api/admin/withdrawals', api_admin_withdrawals)
     app.router.add_post('/api/admin/withdrawals/decision', api_admin_withdrawal_decision)
+    app.router.add_get('/api/admin/export/{kind}', api_admin_export)
     
     app.router.add_get('/api/admin/rate', api_admin_rate)
     app.router.add_post('/api/admin/rate', api_admin_rate)
@@ -459,10 +657,26 @@ async def main():
     app.router.add_post('/api/admin/helpers', api_admin_manage_admins)
     app.router.add_delete('/api/admin/helpers', api_admin_manage_admins)
     
+    app.router.add_get('/api/admin/pipeline', api_admin_pipeline)
+    app.router.add_get('/api/admin/profile', api_admin_profile)
+    app.router.add_get('/api/admin/loop/stalls', api_admin_loop_stalls)
+    
     for route in list(app.router.routes()):
         cors.add(route)
-    
-    app.on_startup.append(on_startup)
+
+    # Telegram updates (webhook mode); not a browser route, so no CORS
+    if BOT_MODE == "webhook":
+        app.router.add_post(WEBHOOK_PATH, handle_webhook)
+
+    # Har route uchun metrika label'lari va rate limit sinfi oldindan bog'lanadi
+    bind_routes(app)
+    rate_limiter.bind_routes(app)
+    app.on_startup.append(start_loop_monitor)
+    app.on_cleanup.append(stop_loop_monitor)
+    
+    if start_bot:
+        app.on_startup.append(on_startup)
+        app.on_shutdown.append(on_shutdown)
     
     logger.info("Starting Web Server on port 8080...")
     return app
@@ -0,0 +1,4 @@
+import os
+
+# bot.config import paytida BOT_TOKEN talab qiladi
+os.environ.setdefault("BOT_TOKEN", "123:test")
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("asyncpg")
+pytest.importorskip("aiosqlite")
+pytest.importorskip("dotenv")
+
+from database.cache import TTLCache  # noqa: E402
+
+
+def test_load_started_before_invalidate_is_not_stored():
+    cache = TTLCache(ttl=60)
+    release = asyncio.Event()
+    loads = []
+
+    async def loader():
+        loads.append(len(loads))
+        if len(loads) == 1:
+            await release.wait()
+            return "stale"
+        return "fresh"
+
+    async def scenario():
+        first = asyncio.create_task(cache.get_or_load("k", loader))
+        await asyncio.sleep(0)
+        cache.invalidate()
+        # Invalidate dan keyingi so'rov eski yuklashga qo'shilmaydi
+        assert await cache.get_or_load("k", loader) == "fresh"
+        release.set()
+        assert await first == "stale"
+        assert cache.get("k") == "fresh"
+
+    asyncio.run(scenario())
+    assert len(loads) == 2
+
+
+def test_concurrent_loads_are_coalesced():
+    cache = TTLCache(ttl=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return 42
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == [42] * 5
+    assert len(calls) == 1
+
+
+def test_key_invalidate_keeps_other_loads():
+    cache = TTLCache(ttl=60)
+    release = asyncio.Event()
+
+    async def slow():
+        await release.wait()
+        return "b"
+
+    async def scenario():
+        other = asyncio.create_task(cache.get_or_load("b", slow))
+        await asyncio.sleep(0)
+        cache.invalidate("a")
+        release.set()
+        await other
+
+    asyncio.run(scenario())
+    assert cache.get("b") == "b"
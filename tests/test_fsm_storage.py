@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiogram")
+pytest.importorskip("asyncpg")
+pytest.importorskip("aiosqlite")
+pytest.importorskip("dotenv")
+
+from aiogram.fsm.storage.base import StorageKey  # noqa: E402
+
+import bot.fsm_storage as fsm_storage  # noqa: E402
+
+KEY = StorageKey(bot_id=1, chat_id=2, user_id=3)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """fsm_* helperlari o'rniga xotiradagi jadval; reads - fsm_get chaqiruvlari soni"""
+    rows = {}
+    calls = {"reads": 0}
+
+    async def fsm_get(key):
+        calls["reads"] += 1
+        return rows.get(key)
+
+    async def fsm_set(key, state, data, expires_at):
+        rows[key] = {"state": state, "data": data, "expires_at": expires_at}
+
+    async def fsm_delete(key):
+        rows.pop(key, None)
+
+    monkeypatch.setattr(fsm_storage, "fsm_get", fsm_get)
+    monkeypatch.setattr(fsm_storage, "fsm_set", fsm_set)
+    monkeypatch.setattr(fsm_storage, "fsm_delete", fsm_delete)
+    return rows, calls
+
+
+def test_unknown_key_is_read_once(db):
+    _, calls = db
+    storage = fsm_storage.DbStorage()
+
+    async def scenario():
+        assert await storage.get_state(KEY) is None
+        assert await storage.get_state(KEY) is None
+        assert await storage.get_data(KEY) == {}
+
+    asyncio.run(scenario())
+    assert calls["reads"] == 1
+
+
+def test_cleared_state_stays_cached(db):
+    rows, calls = db
+    storage = fsm_storage.DbStorage()
+
+    async def scenario():
+        await storage.set_state(KEY, "Admin:waiting")
+        assert await storage.get_state(KEY) == "Admin:waiting"
+        await storage.set_state(KEY, None)
+        assert await storage.get_state(KEY) is None
+
+    asyncio.run(scenario())
+    assert rows == {}
+    assert calls["reads"] == 1  # faqat birinchi set_state
+
+
+def test_cached_miss_expires(db, monkeypatch):
+    rows, calls = db
+    storage = fsm_storage.DbStorage()
+    monkeypatch.setattr(fsm_storage, "MISS_TTL", -1)
+
+    async def scenario():
+        assert await storage.get_state(KEY) is None
+        # Boshqa instansiya yozdi
+        rows[fsm_storage._key(KEY)] = {"state": "Admin:waiting", "data": "{}", "expires_at": 1e12}
+        return await storage.get_state(KEY)
+
+    assert asyncio.run(scenario()) == "Admin:waiting"
+    assert calls["reads"] == 2
+
+
+def test_expired_state_is_deleted(db):
+    rows, _ = db
+    rows[fsm_storage._key(KEY)] = {"state": "Admin:waiting", "data": "{}", "expires_at": 1}
+    storage = fsm_storage.DbStorage()
+
+    assert asyncio.run(storage.get_state(KEY)) is None
+    assert rows == {}
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("asyncpg")
+pytest.importorskip("aiosqlite")
+pytest.importorskip("dotenv")
+
+from aiohttp import web  # noqa: E402
+from aiohttp.test_utils import TestClient, TestServer  # noqa: E402
+
+from bot.http_cache import ResponseCache, etag_matches  # noqa: E402
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"x", "abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"abd"', '"abc"')
+    assert not etag_matches("", '"abc"')
+
+
+def _serve(scenario, ok: bool = True):
+    cache = ResponseCache()
+    calls = []
+
+    @cache.cached(ttl=60)
+    async def handler(request):
+        calls.append(1)
+        if not ok:
+            return web.json_response({"error": "busy"}, status=503, headers={"Retry-After": "3"})
+        return web.json_response({"n": 1})
+
+    async def run():
+        app = web.Application(middlewares=[cache.middleware])
+        app.router.add_get("/x", handler)
+        async with TestClient(TestServer(app)) as client:
+            return await scenario(client)
+
+    return asyncio.run(run()), calls
+
+
+def test_etag_and_304():
+    async def scenario(client):
+        first = await client.get("/x")
+        etag = first.headers["ETag"]
+        second = await client.get("/x", headers={"If-None-Match": etag})
+        return first.status, await first.json(), second.status
+
+    (first, body, second), calls = _serve(scenario)
+    assert (first, body, second) == (200, {"n": 1}, 304)
+    assert len(calls) == 1
+
+
+def test_errors_are_not_cached_and_keep_headers():
+    async def scenario(client):
+        responses = [await client.get("/x") for _ in range(2)]
+        return [(r.status, r.headers.get("Retry-After"), "ETag" in r.headers) for r in responses]
+
+    result, calls = _serve(scenario, ok=False)
+    assert result == [(503, "3", False)] * 2
+    assert len(calls) == 2
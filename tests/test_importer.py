@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("asyncpg")
+pytest.importorskip("aiosqlite")
+pytest.importorskip("dotenv")
+
+import bot.importer as importer  # noqa: E402
+
+
+def reader(*chunks):
+    """read_chunk() o'rnida: chunklarni ketma-ket, oxirida b"" qaytaradi"""
+    pending = list(chunks)
+
+    async def read_chunk():
+        return pending.pop(0) if pending else b""
+    return read_chunk
+
+
+def collect(read_chunk, job):
+    async def scenario():
+        return [line async for line in importer.iter_lines(read_chunk, job)]
+    return asyncio.run(scenario())
+
+
+def test_iter_lines_joins_chunks():
+    job = importer.ImportJob("job-00001", None)
+    lines = collect(reader(b"a|b\nc", b"d\n", b"tail"), job)
+    assert lines == [b"a|b", b"cd", b"tail"]
+    assert job.bytes == len(b"a|b\ncd\ntail")
+
+
+def test_iter_lines_skips_long_line(monkeypatch):
+    monkeypatch.setattr(importer, "MAX_LINE", 8)
+    job = importer.ImportJob("job-00002", None)
+    lines = collect(reader(b"ok\n" + b"x" * 10, b"x" * 10, b"xx\nnext\nlast"), job)
+    # Uzun qator None bilan belgilanadi, keyingi qatorlar yo'qolmaydi
+    assert lines == [b"ok", None, b"next", b"last"]
+
+
+def test_iter_lines_long_line_at_eof(monkeypatch):
+    monkeypatch.setattr(importer, "MAX_LINE", 4)
+    job = importer.ImportJob("job-00003", None)
+    assert collect(reader(b"a\n" + b"x" * 10), job) == [b"a", None]
+
+
+def test_parse_txt_line():
+    assert importer.parse_txt_line("2+2? | 1, 2, 3, 4 | 4", "math") == ("math", "2+2?", ["1", "2", "3", "4"], 3)
+    for line, subject in [
+        ("2+2? | 1, 2, 3, 4", "math"),
+        ("2+2? | 1, 2, 3 | 1", "math"),
+        ("2+2? | 1, 2, 3, 4 | 5", "math"),
+        ("2+2? | 1, 2, 3, 4 | 1", None),
+    ]:
+        with pytest.raises(ValueError):
+            importer.parse_txt_line(line, subject)
+
+
+def test_parse_ndjson_line():
+    row = importer.parse_ndjson_line('{"question": "Q", "options": [1, 2, 3, 4], "answer": 2, "subject": " Math "}', None)
+    assert row == ("math", "Q", ["1", "2", "3", "4"], 1)
+    row = importer.parse_ndjson_line('{"question": "Q", "options": ["a", "b", "c", "d"], "correct_option": 0}', "bio")
+    assert row == ("bio", "Q", ["a", "b", "c", "d"], 0)
+    for line in [
+        "[1, 2]",
+        '{"question": "Q", "options": ["a", "b"], "correct_option": 0}',
+        '{"question": "Q", "options": ["a", "b", "c", "d"], "correct_option": 4}',
+        '{"options": ["a", "b", "c", "d"], "correct_option": 0}',
+    ]:
+        with pytest.raises(ValueError):
+            importer.parse_ndjson_line(line, "bio")
+
+
+def test_failed_batch_is_retried_per_row(monkeypatch):
+    added = []
+
+    async def add_questions_batch(rows, created_by):
+        raise RuntimeError("batch rejected")
+
+    async def add_question(subject, question, options, correct, created_by):
+        if question == "bad":
+            raise RuntimeError("bad row")
+        added.append(question)
+
+    monkeypatch.setattr(importer, "add_questions_batch", add_questions_batch)
+    monkeypatch.setattr(importer, "add_question", add_question)
+    monkeypatch.setattr(importer, "invalidate_index", lambda subject=None: None)
+
+    job = importer.ImportJob("job-00004", "math")
+    body = b"a | 1, 2, 3, 4 | 1\nbad | 1, 2, 3, 4 | 1\nc | 1, 2, 3, 4 | 1\n"
+    asyncio.run(importer.run_import(job, reader(body), "txt", None))
+
+    assert added == ["a", "c"]
+    assert job.added == 2
+    assert job.failed == 1
+    assert job.errors[0]["line"] == 2
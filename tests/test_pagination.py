@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("asyncpg")
+pytest.importorskip("aiosqlite")
+pytest.importorskip("dotenv")
+
+import database.db as db  # noqa: E402
+from bot.config import MAX_PAGE_SIZE  # noqa: E402
+from bot.pagination import decode_cursor, encode_cursor, page, page_limit  # noqa: E402
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(120, 7)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, int, int) == (120, 7)
+    assert decode_cursor(None, int, int) is None
+    assert decode_cursor("", int) is None
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    encode_cursor(1),           # elementlar soni boshqa
+    encode_cursor("1", 2),      # tur boshqa
+    encode_cursor(True, 2),     # bool int emas
+    encode_cursor({"a": 1}),
+])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, int, int)
+
+
+def test_page():
+    rows = [{"id": i} for i in range(4)]
+    assert page(rows[:3], 3, lambda r: (r["id"],)) == (rows[:3], None)
+    shown, cursor = page(rows, 3, lambda r: (r["id"],))
+    assert shown == rows[:3]
+    assert decode_cursor(cursor, int) == (2,)
+
+
+def test_page_limit():
+    assert page_limit({}, 20) == 20
+    assert page_limit({"limit": "abc"}, 20) == 20
+    assert page_limit({"limit": "0"}, 20) == 1
+    assert page_limit({"limit": "100000"}, 20) == MAX_PAGE_SIZE
+
+
+@pytest.fixture
+def sqlite(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_TYPE", "sqlite")
+    monkeypatch.setattr(db, "sqlite_db", str(tmp_path / "quiz.db"))
+    asyncio.run(db.create_schema())
+
+
+def test_ranking_keyset_with_equal_scores(sqlite):
+    # Bir xil ballar sahifa chegarasiga tushadi: user_id bo'yicha davom etadi
+    scores = {1: 50, 2: 30, 3: 30, 4: 30, 5: 30, 6: 10, 7: 0}
+
+    async def scenario():
+        for user_id, score in scores.items():
+            await db.execute("INSERT INTO users (user_id, username, first_name, total_score) VALUES ($1, $2, $3, $4)",
+                             user_id, f"u{user_id}", f"U{user_id}", score)
+        seen, after = [], None
+        while True:
+            rows = await db._load_ranking("all", 3, after)
+            seen += [row["user_id"] for row in rows]
+            if len(rows) < 3:
+                return seen
+            after = (rows[-1]["total_score"], rows[-1]["user_id"])
+
+    assert asyncio.run(scenario()) == [1, 2, 3, 4, 5, 6, 7]
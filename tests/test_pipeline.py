@@ -0,0 +1,99 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("aiogram")
+pytest.importorskip("dotenv")
+
+from bot.pipeline import UpdatePipeline  # noqa: E402
+
+POLL = SimpleNamespace(poll_answer=object())
+COMMAND = SimpleNamespace(poll_answer=None)
+
+
+def make_pipeline(max_waiting=10, max_depth=None):
+    return UpdatePipeline(concurrency=1, limits={}, max_waiting=max_waiting, max_depth=max_depth or {})
+
+
+def test_poll_answers_go_first():
+    pipeline = make_pipeline()
+    order = []
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def blocker(event, data):
+            await gate.wait()
+
+        async def handler(event, data):
+            order.append(data["name"])
+
+        first = asyncio.create_task(pipeline(blocker, COMMAND, {}))
+        await asyncio.sleep(0)
+        tasks = [
+            asyncio.create_task(pipeline(handler, COMMAND, {"name": "command"})),
+            asyncio.create_task(pipeline(handler, POLL, {"name": "poll"})),
+        ]
+        await asyncio.sleep(0)
+        assert pipeline.total_waiting == 2
+        gate.set()
+        await asyncio.gather(first, *tasks)
+
+    asyncio.run(scenario())
+    assert order == ["poll", "command"]
+    assert pipeline.total_running == 0
+
+
+def test_commands_shed_before_polls():
+    pipeline = make_pipeline(max_waiting=1, max_depth={"poll": 2})
+    handled = []
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def blocker(event, data):
+            await gate.wait()
+
+        async def handler(event, data):
+            handled.append(data["name"])
+
+        first = asyncio.create_task(pipeline(blocker, COMMAND, {}))
+        await asyncio.sleep(0)
+        tasks = [asyncio.create_task(pipeline(handler, POLL, {"name": f"poll{i}"})) for i in range(3)]
+        tasks.append(asyncio.create_task(pipeline(handler, COMMAND, {"name": "command"})))
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(first, *tasks)
+
+    asyncio.run(scenario())
+    # Umumiy navbat to'lgan: buyruq tashlanadi; poll faqat o'z chuqurligida (2) to'xtaydi
+    assert handled == ["poll0", "poll1"]
+    assert pipeline.stats["poll"]["dropped"] == 1
+    assert pipeline.stats["command"]["dropped"] == 1
+
+
+def test_cancelled_waiter_leaves_queue():
+    pipeline = make_pipeline()
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def blocker(event, data):
+            await gate.wait()
+
+        async def handler(event, data):
+            pass
+
+        first = asyncio.create_task(pipeline(blocker, COMMAND, {}))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(pipeline(handler, COMMAND, {}))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        assert pipeline.total_waiting == 0
+        gate.set()
+        await first
+
+    asyncio.run(scenario())
+    assert pipeline.total_running == 0
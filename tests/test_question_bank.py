@@ -0,0 +1,112 @@
+import asyncio
+from array import array
+
+import pytest
+
+pytest.importorskip("asyncpg")
+pytest.importorskip("aiosqlite")
+pytest.importorskip("dotenv")
+
+import bot.question_bank as bank  # noqa: E402
+
+
+def test_seen_set_round_trip():
+    seen = bank.SeenSet()
+    for qid in (0, 7, 8, 1000):
+        seen.add(qid)
+    loaded = bank.SeenSet.load(seen.dump())
+    assert all(qid in loaded for qid in (0, 7, 8, 1000))
+    assert not any(qid in loaded for qid in (1, 9, 999, 5000))
+    assert len(loaded.bits) == 1000 // 8 + 1
+
+
+def test_seen_set_bad_blob():
+    assert 1 not in bank.SeenSet.load(None)
+    assert bank.SeenSet.load(b"not zlib").bits == bytearray()
+
+
+def test_sample_unseen_skips_seen_and_excluded():
+    ids = array('l', range(1, 101))
+    seen = bank.SeenSet()
+    for qid in range(1, 91):
+        seen.add(qid)
+    picked = bank._sample_unseen(ids, seen, 8, {91, 92})
+    assert len(picked) == 8
+    assert len(set(picked)) == 8
+    assert set(picked) <= set(range(93, 101))
+
+
+def test_sample_unseen_returns_what_is_left():
+    ids = array('l', range(1, 11))
+    seen = bank.SeenSet()
+    for qid in range(1, 9):
+        seen.add(qid)
+    assert sorted(bank._sample_unseen(ids, seen, 5, set())) == [9, 10]
+
+
+def test_pick_questions_rotates_when_exhausted(monkeypatch):
+    stored = {}
+
+    async def get_question_ids(subject):
+        return [1, 2, 3]
+
+    async def get_seen_bits(chat_id, key):
+        return stored.get((chat_id, key))
+
+    async def save_seen_bits(chat_id, key, blob):
+        stored[(chat_id, key)] = blob
+
+    async def get_questions_by_ids(ids):
+        return [{"id": qid} for qid in ids]
+
+    monkeypatch.setattr(bank, "get_question_ids", get_question_ids)
+    monkeypatch.setattr(bank, "get_seen_bits", get_seen_bits)
+    monkeypatch.setattr(bank, "save_seen_bits", save_seen_bits)
+    monkeypatch.setattr(bank, "get_questions_by_ids", get_questions_by_ids)
+    monkeypatch.setattr(bank, "_index", {})
+
+    async def scenario():
+        first = await bank.pick_questions(1, "math", 2)
+        second = await bank.pick_questions(1, "math", 2)
+        return [q["id"] for q in first], [q["id"] for q in second]
+
+    first, second = asyncio.run(scenario())
+    # Ikkinchi quiz avval qolgan bitta savolni oladi, keyin bitmap tozalanadi
+    assert len(set(first)) == 2
+    assert ({1, 2, 3} - set(first)) <= set(second)
+    assert len(set(second)) == 2
+    seen = bank.SeenSet.load(stored[(1, "math")])
+    assert sorted(qid for qid in (1, 2, 3) if qid in seen) == sorted(second)
+
+
+def test_difficulty_of():
+    assert bank.difficulty_of(bank.MIN_ANSWERS - 1, 0) == "medium"
+    assert bank.difficulty_of(20, 15) == "easy"
+    assert bank.difficulty_of(20, 10) == "medium"
+    assert bank.difficulty_of(20, 7) == "hard"
+
+
+def test_parse_difficulty():
+    assert bank.parse_difficulty("Qiyin") is bank.DIFFICULTY_MIXES["hard"]
+    assert bank.parse_difficulty("mix") is bank.DIFFICULTY_MIXES["mix"]
+    assert bank.parse_difficulty("unknown") is None
+    assert bank.parse_difficulty(None) is None
+
+
+def test_sample_mix_follows_shares(monkeypatch):
+    buckets = {
+        "easy": array('l', range(1, 21)),
+        "medium": array('l', range(21, 41)),
+        "hard": array('l', range(41, 44)),
+    }
+
+    async def difficulty_buckets(subject):
+        return buckets
+
+    monkeypatch.setattr(bank, "difficulty_buckets", difficulty_buckets)
+    picked = asyncio.run(bank._sample_mix("math", bank.SeenSet(), 10, bank.DIFFICULTY_MIXES["hard"]))
+    # hard: 6 ta kerak, guruhda 3 ta bor; qolganini pick_questions umumiy bankdan to'ldiradi
+    assert sum(qid <= 20 for qid in picked) == 1
+    assert sum(21 <= qid <= 40 for qid in picked) == 3
+    assert sorted(qid for qid in picked if qid > 40) == [41, 42, 43]
+    assert len(set(picked)) == len(picked) == 7
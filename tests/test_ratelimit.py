@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiogram")
+pytest.importorskip("asyncpg")
+pytest.importorskip("aiosqlite")
+pytest.importorskip("dotenv")
+
+from aiohttp import web  # noqa: E402
+from aiohttp.test_utils import TestClient, TestServer, make_mocked_request  # noqa: E402
+
+import bot.ratelimit as ratelimit  # noqa: E402
+
+LIMITS = {"user": (1.0, 2), "read": (1.0, 2), "admin": (1.0, 2), "write": (1.0, 2)}
+
+
+class _Transport:
+    def __init__(self, peer):
+        self.peer = peer
+
+    def get_extra_info(self, name, default=None):
+        return (self.peer, 12345) if name == "peername" else default
+
+
+def test_take_spends_and_refills():
+    limiter = ratelimit.RateLimiter(LIMITS)
+    assert limiter.take("user", "k", 0.0) == 0
+    assert limiter.take("user", "k", 0.0) == 0
+    assert limiter.take("user", "k", 0.0) == pytest.approx(1.0)
+    assert limiter.take("user", "k", 0.5) == pytest.approx(0.5)
+    assert limiter.take("user", "k", 1.0) == 0
+    # Ko'paytma bilan burst ham kattalashadi
+    assert all(limiter.take("user", "ip", 0.0, scale=3) == 0 for _ in range(6))
+    assert limiter.take("user", "ip", 0.0, scale=3) > 0
+
+
+def test_sweep_drops_only_full_buckets():
+    limiter = ratelimit.RateLimiter(LIMITS)
+    limiter.take("user", "old", 0.0)
+    limiter.take("read", "new", 5.0)
+    limiter.sweep(6.0)  # idle = burst / rate = 2 s
+    assert limiter.buckets["user"] == {}
+    assert list(limiter.buckets["read"]) == ["new"]
+    assert limiter.size == 1
+
+
+def test_bucket_cap():
+    limiter = ratelimit.RateLimiter(LIMITS, max_buckets=2)
+    assert limiter.take("user", "a", 0.0) == 0
+    assert limiter.take("user", "b", 0.0) == 0
+    assert limiter.take("user", "c", 0.0) is None
+    # Mavjud kalitlar ishlayveradi; eskilar to'lgach joy bo'shaydi
+    assert limiter.take("user", "a", 0.0) == 0
+    assert limiter.take("user", "c", 10.0) == 0
+    assert limiter.size == 1
+
+
+@pytest.mark.parametrize("mode, expected", [
+    ("", [("uid:42", 1)]),
+    ("remote", [("127.0.0.1", 10), ("127.0.0.1:42", 1)]),
+    ("forwarded", [("10.0.0.9", 10), ("10.0.0.9:42", 1)]),
+])
+def test_client_keys(monkeypatch, mode, expected):
+    monkeypatch.setattr(ratelimit, "RATE_CLIENT_IP", mode)
+    monkeypatch.setattr(ratelimit, "RATE_IP_SCALE", 10)
+    headers = {"X-User-ID": "42", "X-Forwarded-For": "1.2.3.4, 10.0.0.9"}
+    request = make_mocked_request("GET", "/api/user/stats", headers=headers,
+                                  transport=_Transport("127.0.0.1"))
+    assert ratelimit.client_keys(request) == expected
+
+
+def test_anonymous_not_limited_without_client_ip(monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_CLIENT_IP", "")
+    request = make_mocked_request("GET", "/api/leaderboard", transport=_Transport("127.0.0.1"))
+    assert ratelimit.client_keys(request) == []
+
+
+def run_requests(limiter, path, count, headers=None):
+    async def ok(request):
+        return web.json_response({"ok": True})
+
+    async def scenario():
+        app = web.Application(middlewares=[limiter.middleware])
+        app.router.add_get("/api/user/stats", ok)
+        app.router.add_get("/api/admin/stats", ok)
+        limiter.bind_routes(app)
+        async with TestClient(TestServer(app)) as client:
+            return [(await client.get(path, headers=headers)).status for _ in range(count)]
+    return asyncio.run(scenario())
+
+
+def test_middleware_limits_per_user(monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_CLIENT_IP", "")
+    monkeypatch.setattr(ratelimit.RateLimiter, "overload", staticmethod(lambda: None))
+    limiter = ratelimit.RateLimiter(LIMITS)
+    assert run_requests(limiter, "/api/user/stats", 3, {"X-User-ID": "1"}) == [200, 200, 429]
+    # Boshqa foydalanuvchi umumiy router IP si sabab cheklanmaydi
+    assert run_requests(limiter, "/api/user/stats", 1, {"X-User-ID": "2"}) == [200]
+
+
+def test_middleware_full_buckets_503(monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_CLIENT_IP", "")
+    monkeypatch.setattr(ratelimit.RateLimiter, "overload", staticmethod(lambda: None))
+    limiter = ratelimit.RateLimiter(LIMITS, max_buckets=1)
+    run_requests(limiter, "/api/user/stats", 1, {"X-User-ID": "1"})
+    assert run_requests(limiter, "/api/user/stats", 1, {"X-User-ID": "2"}) == [503]
+
+
+def test_overload_sheds_user_routes_not_admin(monkeypatch):
+    monkeypatch.setattr(ratelimit.RateLimiter, "overload", staticmethod(lambda: "loop_lag"))
+    limiter = ratelimit.RateLimiter(LIMITS)
+    assert run_requests(limiter, "/api/user/stats", 1, {"X-User-ID": "1"}) == [503]
+    assert run_requests(limiter, "/api/admin/stats", 1) == [200]
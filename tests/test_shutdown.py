@@ -0,0 +1,74 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("aiogram")
+pytest.importorskip("asyncpg")
+pytest.importorskip("aiosqlite")
+pytest.importorskip("dotenv")
+
+import bot.shutdown as shutdown  # noqa: E402
+
+
+def make_quiz(current=1, sent=True, **extra):
+    poll_ids = {"p0": {"question_num": 0}}
+    if sent:
+        poll_ids["p1"] = {"question_num": 1}
+    return {
+        "active": True,
+        "session_id": 9,
+        "current_question": current,
+        "questions": [{"id": 1}, {"id": 2}, {"id": 3}],
+        "poll_ids": poll_ids,
+        "seconds": 20,
+        "quorum": None,
+        "participants": {5},
+        "scores": {5: {"name": "Ali", "correct": 1, "answered": {0, 1}, "latency": 1.5}},
+        "advance": asyncio.Event(),
+        **extra,
+    }
+
+
+def round_trip(quiz):
+    return shutdown._restore(1, json.loads(json.dumps(shutdown._quiz_snapshot(quiz))))
+
+
+def test_snapshot_round_trip():
+    restored = round_trip(make_quiz(sent=False))
+    assert restored["current_question"] == 1
+    assert restored["scores"] == {5: {"name": "Ali", "correct": 1, "answered": {0, 1}, "latency": 1.5}}
+    assert restored["participants"] == {5}
+    assert restored["active"] and isinstance(restored["advance"], asyncio.Event)
+
+
+def test_resume_skips_already_sent_poll():
+    assert round_trip(make_quiz(sent=True))["current_question"] == 2
+
+
+def test_snapshot_quizzes_skips_tournaments(monkeypatch):
+    saved = {}
+
+    async def save_quiz_snapshots(snapshots):
+        saved.update(snapshots)
+
+    monkeypatch.setattr(shutdown, "save_quiz_snapshots", save_quiz_snapshots)
+    monkeypatch.setattr(shutdown, "active_quizzes", {
+        1: make_quiz(),
+        2: make_quiz(tournament_id=7),
+        3: make_quiz(active=False),
+    })
+    monkeypatch.setattr(shutdown, "quiz_tasks", {})
+
+    async def scenario():
+        task = asyncio.create_task(asyncio.sleep(10))
+        shutdown.quiz_tasks[1] = task
+        count = await shutdown.snapshot_quizzes()
+        await asyncio.sleep(0)
+        return count, task
+
+    count, task = asyncio.run(scenario())
+    assert count == 1
+    assert list(saved) == [1]
+    assert task.cancelled()
+    assert not shutdown.active_quizzes[2]["active"]
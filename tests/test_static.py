@@ -0,0 +1,65 @@
+import asyncio
+import gzip
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("asyncpg")
+pytest.importorskip("dotenv")
+
+from aiohttp import web  # noqa: E402
+from aiohttp.test_utils import make_mocked_request  # noqa: E402
+
+from bot.static import IMMUTABLE, REVALIDATE, StaticAssets  # noqa: E402
+
+SCRIPT = b"console.log('quiz');\n" * 200
+
+
+@pytest.fixture
+def assets(tmp_path):
+    (tmp_path / "app.js").write_bytes(SCRIPT)
+    (tmp_path / "index.html").write_text('<script src="/web/app.js"></script>')
+    static = StaticAssets(str(tmp_path))
+    static.load()
+    return static
+
+
+def get(static, name, query="", **headers):
+    request = make_mocked_request("GET", f"/web/{name}{query}", headers=headers, match_info={"name": name})
+    return asyncio.run(static.handle(request))
+
+
+def test_html_links_versioned_urls(assets):
+    html = assets.assets["index.html"].variants["identity"][0].decode()
+    assert f'/web/app.js?v={assets.assets["app.js"].digest}' in html
+
+
+def test_gzip_variant(assets):
+    asset = assets.assets["app.js"]
+    body, etag = asset.variants["gzip"]
+    assert gzip.decompress(body) == SCRIPT
+    assert etag != asset.variants["identity"][1]
+    assert asset.pick("deflate, gzip;q=0.8") == "gzip"
+    assert asset.pick("") == "identity"
+
+
+def test_versioned_url_is_immutable(assets):
+    digest = assets.assets["app.js"].digest
+    resp = get(assets, "app.js", f"?v={digest}", **{"Accept-Encoding": "gzip"})
+    assert resp.headers["Cache-Control"] == IMMUTABLE
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert resp.headers["Vary"] == "Accept-Encoding"
+    assert get(assets, "app.js", "?v=old").headers["Cache-Control"] == REVALIDATE
+
+
+def test_etag_revalidation(assets):
+    etag = get(assets, "app.js").headers["ETag"]
+    resp = get(assets, "app.js", **{"If-None-Match": etag})
+    assert resp.status == 304
+    assert resp.body is None
+
+
+def test_hidden_or_missing_files(assets):
+    for name in (".env", "missing.js"):
+        with pytest.raises(web.HTTPNotFound):
+            get(assets, name)